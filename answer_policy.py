@@ -0,0 +1,103 @@
+import threading
+from typing import Dict, Any, List, Optional
+
+TEMPLATE = "template"
+NO_CONTEXT = "no_context"
+GENERATE = "generate"
+
+class AnswerPolicy:
+    """Decide how much work a question needs from its retrieval scores.
+
+    * ``template``: the top passage is a confident match (cosine score at
+      least ``confidence_threshold``) for a short, self-contained item, so
+      it is returned through ``answer_template`` without running the model.
+    * ``no_context``: every passage scores below ``context_floor``, so the
+      model is prompted without context (a shorter prompt, nothing packed).
+    * ``generate``: the normal retrieve-then-generate path.
+
+    Generation times are tracked per prompt kind so every early exit can be
+    logged with the time it saved, measured against recent requests.
+    """
+    
+    def __init__(self, confidence_threshold: float = 0.75, context_floor: float = 0.25,
+                 faq_max_words: int = 80, answer_template: str = "{content}", enabled: bool = True):
+        self.confidence_threshold = confidence_threshold
+        self.context_floor = context_floor
+        self.faq_max_words = faq_max_words
+        self.answer_template = answer_template
+        self.enabled = enabled
+        
+        self._lock = threading.Lock()
+        self._average_seconds: Dict[str, Optional[float]] = {GENERATE: None, NO_CONTEXT: None}
+        self.decisions = {TEMPLATE: 0, NO_CONTEXT: 0, GENERATE: 0}
+        self.seconds_saved = 0.0
+    
+    def is_faq_item(self, passage: Dict[str, Any]) -> bool:
+        """A whole (unchunked) knowledge item short enough to stand as an answer."""
+        whole_item = passage.get('parent_id', passage['id']) == passage['id']
+        return whole_item and len(passage.get('content', '').split()) <= self.faq_max_words
+    
+    def decide(self, passages: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Return ``{'action', 'passage', 'top_score'}`` for retrieved ``passages`` (best first)."""
+        scores = [passage['score'] for passage in passages if passage.get('score') is not None]
+        top_score = max(scores) if scores else None
+        top = passages[0] if passages else None
+        
+        if not self.enabled:
+            action = GENERATE
+        elif top is not None and top.get('score') is not None and top['score'] >= self.confidence_threshold \
+                and self.is_faq_item(top):
+            action = TEMPLATE
+        elif len(scores) == len(passages) and (top_score is None or top_score < self.context_floor):
+            # Every passage has a similarity score and none clears the floor
+            action = NO_CONTEXT
+        else:
+            action = GENERATE
+        
+        with self._lock:
+            self.decisions[action] += 1
+        return {'action': action, 'passage': top, 'top_score': top_score}
+    
+    def render(self, passage: Dict[str, Any]) -> str:
+        return self.answer_template.format(title=passage.get('title', ''), content=passage.get('content', ''))
+    
+    def record_generation(self, action: str, seconds: float, smoothing: float = 0.2):
+        """Fold one measured generation time into the running average for ``action``."""
+        with self._lock:
+            average = self._average_seconds.get(action)
+            self._average_seconds[action] = seconds if average is None else (
+                (1 - smoothing) * average + smoothing * seconds
+            )
+    
+    def log_decision(self, decision: Dict[str, Any], question: str, elapsed: float):
+        """Print the decision with the time it saved compared with full generation."""
+        action = decision['action']
+        if action == GENERATE:
+            return
+        
+        with self._lock:
+            full = self._average_seconds[GENERATE]
+            baseline = full if action == TEMPLATE else (
+                full - self._average_seconds[NO_CONTEXT]
+                if full is not None and self._average_seconds[NO_CONTEXT] is not None else None
+            )
+            if baseline is not None:
+                self.seconds_saved += max(baseline, 0.0)
+        
+        score = decision['top_score']
+        score_text = f"{score:.2f}" if score is not None else "n/a"
+        saved_text = f"~{max(baseline, 0.0):.2f}s saved" if baseline is not None else "savings not measured yet"
+        if action == TEMPLATE:
+            print(f"Answer policy: templated answer from '{decision['passage']['title']}' "
+                  f"(score {score_text}) in {elapsed:.3f}s, {saved_text} - {question!r}")
+        else:
+            print(f"Answer policy: no context (top score {score_text} < {self.context_floor}), "
+                  f"{saved_text} - {question!r}")
+    
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'decisions': dict(self.decisions),
+                'seconds_saved': self.seconds_saved,
+                'average_generation_seconds': dict(self._average_seconds)
+            }
\ No newline at end of file
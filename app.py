@@ -2,6 +2,8 @@ import streamlit as st
 import time
 from basketball_chatbot import BasketballChatbot
 from config import Config
+import model_registry
+from inference_precision import configure_threads
 import os
 
 # Page configuration
@@ -52,19 +54,35 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
+@st.cache_resource(show_spinner="Loading models...")
+def warm_up_models():
+    """Load and warm the shared models once per server process."""
+    configure_threads(Config.TORCH_THREADS)
+    model_registry.warm_up()
+    return True
+
+@st.cache_resource(show_spinner="Preparing quick answers...")
+def precompute_answers():
+    """Refresh the precomputed answers once per server process, before sessions load them."""
+    # Only regenerates answers whose retrieved knowledge changed since they were saved
+    BasketballChatbot().precompute_answers()
+    return True
+
 def initialize_chatbot():
     """Initialize the basketball chatbot."""
     try:
         config = Config()
         
         # Check if required environment variables are set
-        if not config.PINECONE_API_KEY or not config.PINECONE_ENVIRONMENT:
+        uses_pinecone = config.VECTOR_BACKEND.lower() == "pinecone"
+        if uses_pinecone and (not config.PINECONE_API_KEY or not config.PINECONE_ENVIRONMENT):
             st.error("⚠️ Pinecone API key and environment not configured. Please set them in your environment variables.")
             st.info("You can still use the chatbot with basic responses, but vector search will be disabled.")
             return None
         
-        chatbot = BasketballChatbot()
-        return chatbot
+        warm_up_models()
+        precompute_answers()
+        return BasketballChatbot()
     except Exception as e:
         st.error(f"Error initializing chatbot: {e}")
         return None
@@ -92,10 +110,20 @@ def main():
         if st.button("🔄 Refresh Knowledge Base"):
             with st.spinner("Refreshing knowledge base..."):
                 try:
-                    chatbot = initialize_chatbot()
+                    # Reuse this session's chatbot instead of loading a new one
+                    if "chatbot" not in st.session_state or st.session_state.chatbot is None:
+                        st.session_state.chatbot = initialize_chatbot()
+                    chatbot = st.session_state.chatbot
                     if chatbot:
-                        chatbot.setup_knowledge_base()
-                        st.success("Knowledge base refreshed successfully!")
+                        stats = chatbot.setup_knowledge_base()
+                        if stats is None:
+                            st.error("Error refreshing knowledge base; see the server log for details")
+                        else:
+                            st.success(
+                                "Knowledge base refreshed successfully! "
+                                f"({stats['added']} added, {stats['deleted']} removed, "
+                                f"{stats['unchanged']} unchanged)"
+                            )
                     else:
                         st.error("Could not initialize chatbot")
                 except Exception as e:
@@ -104,14 +132,10 @@ def main():
         # Quick actions
         st.markdown('<div class="sidebar-header">🚀 Quick Actions</div>', unsafe_allow_html=True)
         
-        if st.button("📋 Basketball Rules"):
-            st.session_state.quick_question = "What are the basic rules of basketball?"
-        
-        if st.button("👥 Player Positions"):
-            st.session_state.quick_question = "What are the different player positions in basketball?"
-        
-        if st.button("📊 Statistics"):
-            st.session_state.quick_question = "What are the most important basketball statistics?"
+        # Answers to these are precomputed, so they come back instantly
+        for label, question in Config.QUICK_ACTIONS.items():
+            if st.button(label):
+                st.session_state.quick_question = question
         
         # Information
         st.markdown('<div class="sidebar-header">ℹ️ About</div>', unsafe_allow_html=True)
@@ -184,22 +208,33 @@ def main():
                 # Add user message
                 st.session_state.messages.append({"role": "user", "content": user_input})
                 
-                # Generate response
-                with st.spinner("🏀 Analyzing your question..."):
-                    try:
-                        if st.session_state.chatbot:
-                            response = st.session_state.chatbot.generate_response(user_input)
-                        else:
-                            response = "I'm sorry, but I'm currently unable to process your request. Please check your configuration and try again."
-                        
-                        # Add bot response
-                        st.session_state.messages.append({"role": "assistant", "content": response})
-                        
-                        # Rerun to display new messages
-                        st.rerun()
-                        
-                    except Exception as e:
-                        st.error(f"Error generating response: {e}")
+                # Generate response, rendering it incrementally as tokens arrive
+                with chat_container:
+                    placeholder = st.empty()
+                placeholder.markdown("🏀 Analyzing your question...")
+                
+                try:
+                    if st.session_state.chatbot:
+                        response = ""
+                        for text in st.session_state.chatbot.generate_response_stream(user_input):
+                            response += text
+                            placeholder.markdown(f"""
+                            <div class="chat-message bot-message">
+                                <strong>🏀 Basketball Bot:</strong> {response}
+                            </div>
+                            """, unsafe_allow_html=True)
+                        response = response.strip()
+                    else:
+                        response = "I'm sorry, but I'm currently unable to process your request. Please check your configuration and try again."
+                    
+                    # Add bot response
+                    st.session_state.messages.append({"role": "assistant", "content": response})
+                    
+                    # Rerun to display new messages
+                    st.rerun()
+                    
+                except Exception as e:
+                    st.error(f"Error generating response: {e}")
     
     with col2:
         # Quick tips and information
@@ -221,15 +256,7 @@ def main():
         # Example questions
         st.markdown('<div class="sidebar-header">❓ Example Questions</div>', unsafe_allow_html=True)
         
-        example_questions = [
-            "What is a pick and roll?",
-            "How do you calculate field goal percentage?",
-            "What are the responsibilities of a point guard?",
-            "What is zone defense?",
-            "How many points is a three-pointer worth?"
-        ]
-        
-        for question in example_questions:
+        for question in Config.EXAMPLE_QUESTIONS:
             if st.button(question, key=f"example_{question}"):
                 st.session_state.quick_question = question
                 st.rerun()
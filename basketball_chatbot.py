@@ -1,88 +1,530 @@
-from langchain.llms import HuggingFacePipeline
-from transformers import AutoTokenizer, AutoModelForCausalLM, pipeline
-from typing import List, Dict, Any
-import torch
+import time
+from contextlib import nullcontext
+from typing import List, Dict, Any, Iterator, Optional
+from threading import Event, Lock, Thread
 from config import Config
+import model_registry
+import metrics
 from vector_store import VectorStore
 from basketball_knowledge import BasketballKnowledgeBase
+from chunking import TextChunker
+from response_cache import SemanticResponseCache
+from context_budget import ContextBudgeter
+from answer_policy import AnswerPolicy, TEMPLATE, NO_CONTEXT
+from precomputed_answers import PrecomputedAnswers
+from reranker import Reranker
+from stats_engine import StatsEngine
+from inference_precision import configure_threads
+
+# (answers file, knowledge version) pairs whose precomputed answers are being or have
+# been revalidated, so the sessions of one process revalidate each version once
+_revalidated_versions = set()
+_revalidation_lock = Lock()
 
 class BasketballChatbot:
     """Main basketball analysis chatbot using LangChain and Hugging Face."""
     
+    FALLBACK_RESPONSE = ("I'm having trouble processing your question. "
+                         "Please try asking about basketball rules, positions, or strategies.")
+    
     def __init__(self):
         self.config = Config()
         self.vector_store = VectorStore()
         self.knowledge_base = BasketballKnowledgeBase()
+        self.chunker = TextChunker()
+        self.response_cache = None
+        if self.config.RESPONSE_CACHE_ENABLED:
+            self.response_cache = SemanticResponseCache(
+                threshold=self.config.RESPONSE_CACHE_THRESHOLD,
+                ttl_seconds=self.config.RESPONSE_CACHE_TTL,
+                max_entries=self.config.RESPONSE_CACHE_SIZE,
+                dimension=self.config.VECTOR_DIMENSION
+            )
+        self.answer_policy = AnswerPolicy(
+            confidence_threshold=self.config.ANSWER_CONFIDENCE_THRESHOLD,
+            context_floor=self.config.ANSWER_CONTEXT_FLOOR,
+            faq_max_words=self.config.FAQ_MAX_WORDS,
+            answer_template=self.config.FAQ_ANSWER_TEMPLATE,
+            enabled=self.config.ANSWER_POLICY_ENABLED
+        )
+        self.reranker = None
+        if self.config.RERANK_ENABLED:
+            self.reranker = Reranker(
+                self.config.RERANKER_MODEL,
+                time_budget_ms=self.config.RERANK_TIME_BUDGET_MS,
+                cache_size=self.config.RERANK_CACHE_SIZE
+            )
+        self.precomputed_answers = None
+        self.revalidation = None  # Background revalidation of stale precomputed answers
+        if self.config.PRECOMPUTE_ANSWERS:
+            self.precomputed_answers = PrecomputedAnswers(self.config.PRECOMPUTED_ANSWERS_PATH)
+        # Optional semaphore bounding concurrent generations (set by server.py); only
+        # the generation step holds it, so cached and templated answers never wait
+        self.generation_slots = None
+        self.stats_engine = None
+        if self.config.STATS_ENABLED:
+            self.stats_engine = StatsEngine(
+                box_score_paths=self.config.BOX_SCORES_PATH,
+                leaderboard_size=self.config.STATS_LEADERBOARD_SIZE,
+                leader_min_minutes_share=self.config.STATS_LEADER_MIN_MINUTES_SHARE
+            )
         self._initialize_model()
     
     def _initialize_model(self):
-        """Initialize the Hugging Face model."""
+        """Initialize the Hugging Face model.
+        
+        The model is shared through model_registry, so only the first
+        chatbot in a process pays the load time.
+        """
         try:
             print("Loading Hugging Face model...")
             
-            # Use a smaller, more accessible model
-            model_name = "microsoft/DialoGPT-medium"
+            configure_threads(self.config.TORCH_THREADS)
+            generator = model_registry.get_generation_model(
+                self.config.GENERATION_MODEL, self.config.INFERENCE_PRECISION
+            )
+            self.tokenizer = generator.tokenizer
+            self.model = generator.model
+            self.pipe = generator.pipe
+            self.llm = generator.llm
+            self.budgeter = ContextBudgeter(
+                self.tokenizer,
+                context_window=self.config.CONTEXT_WINDOW,
+                max_new_tokens=self.config.MAX_NEW_TOKENS,
+                min_score=self.config.CONTEXT_MIN_SCORE,
+                redundancy_threshold=self.config.CONTEXT_REDUNDANCY_THRESHOLD
+            )
             
-            self.tokenizer = AutoTokenizer.from_pretrained(model_name)
-            self.model = AutoModelForCausalLM.from_pretrained(model_name)
+            self.prefix_cache = None
+            if self.config.PREFIX_CACHE_ENABLED:
+                self.prefix_cache = model_registry.get_prefix_cache(
+                    self.config.GENERATION_MODEL,
+                    self.config.INFERENCE_PRECISION,
+                    max_mb=self.config.PREFIX_CACHE_MAX_MB,
+                    min_tokens=self.config.PREFIX_CACHE_MIN_TOKENS
+                )
             
-            self.pipe = pipeline(
-                "text-generation",
-                model=self.model,
-                tokenizer=self.tokenizer,
-                max_length=512,
-                temperature=0.7
-            )
+            self.scheduler = None
+            if self.config.GENERATION_BATCHING:
+                self.scheduler = model_registry.get_generation_scheduler(
+                    self.config.GENERATION_MODEL,
+                    self._generation_kwargs(),
+                    max_batch_size=self.config.GENERATION_MAX_BATCH_SIZE,
+                    max_wait_ms=self.config.GENERATION_MAX_WAIT_MS,
+                    precision=self.config.INFERENCE_PRECISION,
+                    prefix_cache=self.prefix_cache
+                )
             
-            self.llm = HuggingFacePipeline(pipeline=self.pipe)
+            if self.config.WARM_UP_MODELS:
+                model_registry.warm_up(self.config.EMBEDDING_MODEL, self.config.GENERATION_MODEL,
+                                       self.config.INFERENCE_PRECISION)
             print("Model loaded successfully!")
             
         except Exception as e:
             print(f"Error loading model: {e}")
             raise
     
-    def setup_knowledge_base(self):
-        """Set up the basketball knowledge base."""
+    def setup_knowledge_base(self) -> Optional[Dict[str, Any]]:
+        """Set up the basketball knowledge base.
+        
+        Only items that are new or changed since the last run are embedded,
+        and items that were removed from the knowledge base are deleted.
+        Returns the sync stats, or ``None`` if the setup failed.
+        """
         try:
             print("Setting up basketball knowledge base...")
             knowledge_items = self.knowledge_base.get_all_basketball_knowledge()
-            self.vector_store.add_basketball_knowledge(knowledge_items)
+            chunks = self.chunker.chunk_items(knowledge_items)
+            stats = self.vector_store.sync_basketball_knowledge(chunks)
+            self.precompute_answers()
             print("Knowledge base setup complete!")
+            return stats
         except Exception as e:
             print(f"Error setting up knowledge base: {e}")
+            return None
+    
+    def precompute_answers(self, questions: Optional[List[str]] = None) -> Dict[str, Any]:
+        """Answer the canonical questions ahead of time so they can be served instantly.
+        
+        An existing answer is kept while retrieval for its question still
+        returns the same passages (IDs are content hashes), so only answers
+        whose underlying knowledge changed are regenerated. New answers are
+        generated concurrently through the batching scheduler when enabled.
+        """
+        if self.precomputed_answers is None:
+            return {}
+        
+        canonical = questions is None
+        questions = self.config.CANONICAL_QUESTIONS if canonical else questions
+        start_time = time.perf_counter()
+        model_name = self.config.GENERATION_MODEL
+        knowledge_version = self.vector_store.knowledge_version
+        reused = 0
+        pending = []
+        
+        for question in questions:
+            if self._answer_statistics(question):
+                continue
+            try:
+                passage_ids = [passage['id'] for passage in self._retrieve(question)]
+                if self.precomputed_answers.is_current(question, passage_ids, model_name):
+                    self.precomputed_answers.confirm(question, knowledge_version)
+                    reused += 1
+                    continue
+                plan = self._plan_answer(question)
+                if 'answer' in plan:
+                    answer = plan['answer']
+                elif self.scheduler:
+                    answer = self.scheduler.submit(plan['prompt'], plan['segments'])
+                else:
+                    with self._generation_slot():
+                        answer = self._generate(plan['prompt'], plan['segments'])
+                pending.append((question, passage_ids, answer))
+            except Exception as e:
+                print(f"Error precomputing answer for {question!r}: {e}")
+        
+        generated = 0
+        for question, passage_ids, answer in pending:
+            try:
+                if not isinstance(answer, str):
+                    answer = answer.result()
+                if answer:
+                    self.precomputed_answers.put(question, answer, passage_ids, model_name,
+                                                 knowledge_version)
+                    generated += 1
+            except Exception as e:
+                print(f"Error precomputing answer for {question!r}: {e}")
+        
+        if canonical:
+            self.precomputed_answers.retain(questions)
+        self.precomputed_answers.save()
+        elapsed = time.perf_counter() - start_time
+        print(f"Precomputed answers: {generated} generated, {reused} still current ({elapsed:.2f}s)")
+        return {'generated': generated, 'reused': reused, 'seconds': elapsed}
+    
+    def _answer_statistics(self, question: str) -> Optional[str]:
+        """The stats engine's exact answer to a numeric question, or ``None``."""
+        if self.stats_engine is None:
+            return None
+        try:
+            with metrics.stage("stats"):
+                answer = self.stats_engine.answer(question)
+        except Exception as e:
+            metrics.record_error("stats")
+            print(f"Error answering statistics question: {e}")
+            return None
+        if answer:
+            metrics.increment("answers_total", action="stats")
+        return answer
+    
+    @metrics.timed("get_relevant_context")
+    def get_relevant_context(self, question: str, query_embedding: Optional[List[float]] = None) -> str:
+        """Get relevant context from vector database.
+        
+        The best passages are packed into whatever is left of CONTEXT_WINDOW
+        after the prompt template, the question and MAX_NEW_TOKENS of answer,
+        so the prompt never has to be truncated by the model.
+        """
+        return self._pack_context(question, self._retrieve(question, query_embedding))
+    
+    def _retrieve(self, question: str, query_embedding: Optional[List[float]] = None) -> List[Dict[str, Any]]:
+        """Retrieve candidate passages, reranked by the cross-encoder when enabled."""
+        try:
+            if self.reranker is None:
+                return self.vector_store.search(
+                    question, top_k=self.config.CONTEXT_CANDIDATES, query_embedding=query_embedding
+                )
+            
+            candidates = self.vector_store.search(
+                question, top_k=self.config.RERANK_CANDIDATES, query_embedding=query_embedding
+            )
+            with metrics.stage("rerank"):
+                return self.reranker.rerank(question, candidates, self.config.RERANK_TOP_K)
+        except Exception as e:
+            metrics.record_error("retrieve")
+            print(f"Error getting context: {e}")
+            return []
     
-    def get_relevant_context(self, question: str) -> str:
-        """Get relevant context from vector database."""
+    @metrics.timed("prompt_assembly")
+    def _pack_context(self, question: str, passages: List[Dict[str, Any]]) -> str:
         try:
-            similar_items = self.vector_store.search_similar(question, top_k=3)
-            context_parts = [f"{item['title']}: {item['content']}" for item in similar_items]
-            return "\n\n".join(context_parts)
+            packed = self.budgeter.pack(passages, prompt_overhead=self._build_prompt(question, ""))
+            metrics.observe("context_tokens", packed['tokens'], buckets=metrics.TOKEN_BUCKETS)
+            return packed['context']
         except Exception as e:
+            metrics.record_error("prompt_assembly")
             print(f"Error getting context: {e}")
             return ""
     
+    def _plan_answer(self, question: str, query_embedding: Optional[List[float]] = None) -> Dict[str, Any]:
+        """Retrieve passages and let the answer policy choose how to answer.
+        
+        The returned decision carries either a ready ``answer`` (templated
+        from a confident FAQ-style match) or the ``prompt`` to generate from,
+        along with the ``segments`` it was joined from.
+        """
+        passages = self._retrieve(question, query_embedding)
+        decision = self.answer_policy.decide(passages)
+        
+        if decision['action'] == TEMPLATE:
+            decision['answer'] = self.answer_policy.render(decision['passage'])
+            return decision
+        
+        context = "" if decision['action'] == NO_CONTEXT else self._pack_context(question, passages)
+        decision['segments'] = self._prompt_segments(question, context)
+        decision['prompt'] = "".join(decision['segments'])
+        return decision
+    
+    def _precomputed_answer(self, question: str) -> Optional[str]:
+        """The precomputed answer to ``question`` if it is valid for the current index.
+        
+        Once the index changes, stored answers are skipped until they are
+        revalidated: the first miss on a stale answer re-runs
+        ``precompute_answers`` in the background, which keeps the answers
+        whose passages are unchanged and regenerates the rest. Other
+        chatbots pick the results up from the saved file.
+        """
+        if self.precomputed_answers is None:
+            return None
+        knowledge_version = self.vector_store.knowledge_version
+        answer = self.precomputed_answers.get(question, knowledge_version)
+        metrics.record_cache("precomputed", int(bool(answer)), int(not answer))
+        
+        if answer is None and question in self.precomputed_answers:
+            key = (self.config.PRECOMPUTED_ANSWERS_PATH or id(self.precomputed_answers), knowledge_version)
+            with _revalidation_lock:
+                if key in _revalidated_versions:
+                    return None
+                _revalidated_versions.add(key)
+            self.revalidation = Thread(target=self.precompute_answers, name="precompute-revalidate",
+                                       daemon=True)
+            self.revalidation.start()
+        return answer
+    
+    def _generation_slot(self):
+        """Context manager holding one of ``generation_slots`` (if set) while generating."""
+        return self.generation_slots if self.generation_slots is not None else nullcontext()
+    
+    def _generate(self, prompt: str, segments: Optional[List[str]] = None) -> str:
+        if self.scheduler:
+            # Batched with prompts from other concurrent callers
+            return self.scheduler.generate(prompt, segments=segments)
+        
+        if self.prefix_cache and segments:
+            return self.prefix_cache.generate_text(segments, **self._generation_kwargs())
+        
+        response = self.llm(prompt)
+        
+        if isinstance(response, dict):
+            response = response.get('generated_text', '')
+        
+        if prompt in response:
+            response = response.replace(prompt, '').strip()
+        return response
+    
+    @metrics.timed("generate_response", root=True)
     def generate_response(self, question: str) -> str:
-        """Generate a response to a user question."""
+        """Generate a response to a user question.
+        
+        Near-duplicate questions are answered from the semantic response
+        cache; the query embedding used for the lookup is reused for
+        retrieval on a miss. Without the cache the question is only embedded
+        if retrieval needs it. The answer policy may then answer from a
+        confident FAQ-style match without generating, or drop context that
+        scores too low to help. Canonical questions are answered from
+        their precomputed answers, and numeric statistics questions
+        (formulas, worked examples, player values and leaders) by the
+        stats engine.
+        
+        Each stage is timed in ``metrics`` and the request is traced as one
+        breakdown (see ``metrics.stage``).
+        """
         try:
-            context = self.get_relevant_context(question)
+            statistics = self._answer_statistics(question)
+            if statistics:
+                return statistics
             
-            prompt = f"""
-You are a basketball expert. Use this context to answer: {context}
-
-Question: {question}
-
-Answer:"""
+            precomputed = self._precomputed_answer(question)
+            if precomputed:
+                return precomputed
+            
+            start_time = time.perf_counter()
+            query_embedding = None
+            knowledge_version = self.vector_store.knowledge_version
             
-            response = self.llm(prompt)
+            if self.response_cache:
+                query_embedding = self.vector_store.create_embeddings([question])[0]
+                cached = self.response_cache.lookup(query_embedding, knowledge_version)
+                metrics.record_cache("response", int(bool(cached)), int(not cached))
+                if cached:
+                    return cached['answer']
             
-            if isinstance(response, dict):
-                response = response.get('generated_text', '')
+            plan = self._plan_answer(question, query_embedding)
+            metrics.increment("answers_total", action=plan['action'])
+            if 'answer' in plan:
+                response = plan['answer']
+            else:
+                with self._generation_slot():
+                    generation_start = time.perf_counter()
+                    with metrics.stage("generation"):
+                        response = self._generate(plan['prompt'], plan['segments'])
+                self.answer_policy.record_generation(plan['action'], time.perf_counter() - generation_start)
+                metrics.observe("generated_tokens", len(self.tokenizer.encode(response)),
+                                buckets=metrics.TOKEN_BUCKETS)
+            self.answer_policy.log_decision(plan, question, time.perf_counter() - start_time)
             
-            if prompt in response:
-                response = response.replace(prompt, '').strip()
+            if self.response_cache and response:
+                self.response_cache.store(question, query_embedding, response, knowledge_version)
             
             return response
             
         except Exception as e:
+            metrics.record_error("generate_response")
             print(f"Error generating response: {e}")
-            return "I'm having trouble processing your question. Please try asking about basketball rules, positions, or strategies." 
\ No newline at end of file
+            return self.FALLBACK_RESPONSE
+    
+    def generate_response_stream(self, question: str, cancelled: Optional[Event] = None) -> Iterator[str]:
+        """Generate a response to a user question, yielding text as it is decoded.
+        
+        Generation feeds a transformers TextIteratorStreamer, so the first
+        words can be shown long before the full answer is ready. With the
+        batching scheduler enabled the prompt is queued there and runs in a
+        batch of its own; otherwise it runs on a background thread. Statistics, precomputed, cached and
+        templated answers are yielded in one piece. Setting ``cancelled``,
+        or closing the generator, stops generation at the next token and
+        frees its generation slot; a cancelled answer is not cached.
+        """
+        try:
+            statistics = self._answer_statistics(question)
+            if statistics:
+                yield statistics
+                return
+            
+            precomputed = self._precomputed_answer(question)
+            if precomputed:
+                yield precomputed
+                return
+            
+            start_time = time.perf_counter()
+            query_embedding = None
+            knowledge_version = self.vector_store.knowledge_version
+            
+            if self.response_cache:
+                query_embedding = self.vector_store.create_embeddings([question])[0]
+                cached = self.response_cache.lookup(query_embedding, knowledge_version)
+                metrics.record_cache("response", int(bool(cached)), int(not cached))
+                if cached:
+                    yield cached['answer']
+                    return
+            
+            plan = self._plan_answer(question, query_embedding)
+            metrics.increment("answers_total", action=plan['action'])
+        except Exception as e:
+            metrics.record_error("generate_response_stream")
+            print(f"Error preparing response: {e}")
+            yield self.FALLBACK_RESPONSE
+            return
+        
+        if 'answer' in plan:
+            self.answer_policy.log_decision(plan, question, time.perf_counter() - start_time)
+            if self.response_cache:
+                self.response_cache.store(question, query_embedding, plan['answer'], knowledge_version)
+            yield plan['answer']
+            return
+        
+        from transformers import StoppingCriteriaList, TextIteratorStreamer
+        
+        streamer = TextIteratorStreamer(self.tokenizer, skip_prompt=True, skip_special_tokens=True)
+        cancelled = cancelled or Event()
+        stopping_criteria = StoppingCriteriaList([lambda input_ids, scores, **kwargs: cancelled.is_set()])
+        errors = []
+        queued = []
+        
+        def run_generation():
+            try:
+                with self._generation_slot():
+                    if self.scheduler:
+                        # Queued with the batched prompts, so the model runs one generate() at a time
+                        queued.append(self.scheduler.submit(plan['prompt'], plan['segments'], streamer=streamer,
+                                                            stopping_criteria=stopping_criteria))
+                        queued[0].result()
+                    elif self.prefix_cache:
+                        self.prefix_cache.generate(plan['segments'], streamer=streamer,
+                                                   stopping_criteria=stopping_criteria, **self._generation_kwargs())
+                    else:
+                        inputs = self.tokenizer(plan['prompt'], return_tensors="pt")
+                        self.model.generate(**inputs, streamer=streamer, stopping_criteria=stopping_criteria,
+                                            **self._generation_kwargs())
+            except Exception as e:
+                errors.append(e)
+                streamer.end()
+        
+        generation_start = time.perf_counter()
+        thread = Thread(target=run_generation, daemon=True)
+        thread.start()
+        
+        parts = []
+        try:
+            for text in streamer:
+                if text:
+                    if not parts:
+                        metrics.observe("stage_seconds", time.perf_counter() - generation_start,
+                                        stage="first_token")
+                    parts.append(text)
+                    yield text
+        except GeneratorExit:
+            cancelled.set()
+            for future in queued:
+                future.cancel()  # Skipped if it has not started yet
+            raise
+        thread.join()
+        metrics.observe("stage_seconds", time.perf_counter() - generation_start, stage="generation")
+        if cancelled.is_set():
+            return
+        
+        if errors:
+            metrics.record_error("generate_response_stream")
+            print(f"Error generating response: {errors[0]}")
+            if not parts:
+                yield self.FALLBACK_RESPONSE
+            return
+        
+        self.answer_policy.record_generation(plan['action'], time.perf_counter() - generation_start)
+        self.answer_policy.log_decision(plan, question, time.perf_counter() - start_time)
+        
+        response = "".join(parts).strip()
+        if self.response_cache and response:
+            self.response_cache.store(question, query_embedding, response, knowledge_version)
+    
+    def _build_prompt(self, question: str, context: str) -> str:
+        """Assemble the generation prompt from retrieved context and the question."""
+        return "".join(self._prompt_segments(question, context))
+    
+    def _prompt_segments(self, question: str, context: str) -> List[str]:
+        """Split the prompt into preamble, context and question.
+        
+        The preamble is shared by every prompt and the context by every
+        question that retrieves the same passages, so the prefix cache can
+        reuse their attention states. Segments start with their leading
+        space so tokenizing them separately matches tokenizing the whole.
+        """
+        return [
+            "\nYou are a basketball expert. Use this context to answer:",
+            f" {context}",
+            f"\n\nQuestion: {question}\n\nAnswer:"
+        ]
+    
+    def _generation_kwargs(self) -> Dict[str, Any]:
+        """Generation settings shared by every path that calls the model directly.
+        
+        Decoding is greedy unless ``DO_SAMPLE`` is set; sampling settings are
+        only passed when they apply, so transformers does not warn about them.
+        """
+        kwargs = {
+            'max_new_tokens': self.config.MAX_NEW_TOKENS,
+            'do_sample': self.config.DO_SAMPLE,
+            'pad_token_id': self.tokenizer.eos_token_id
+        }
+        if self.config.DO_SAMPLE:
+            kwargs.update(temperature=self.config.TEMPERATURE, top_p=self.config.TOP_P)
+        return kwargs 
\ No newline at end of file
@@ -6,7 +6,7 @@ class BasketballKnowledgeBase:
     
     def __init__(self):
         self.basketball_data = []
-        
+    
     def get_basketball_rules(self) -> List[Dict[str, str]]:
         """Get basic basketball rules and regulations."""
         return [
@@ -61,4 +61,12 @@ class BasketballKnowledgeBase:
         knowledge = self.get_all_basketball_knowledge()
         with open(filename, 'w', encoding='utf-8') as f:
             json.dump(knowledge, f, indent=2, ensure_ascii=False)
-        print(f"Basketball knowledge saved to {filename}") 
\ No newline at end of file
+        print(f"Basketball knowledge saved to {filename}")
+    
+    def load_knowledge_from_file(self, filename: str = "basketball_knowledge.json") -> List[Dict[str, str]]:
+        """Load basketball knowledge previously written by save_knowledge_to_file."""
+        with open(filename, 'r', encoding='utf-8') as f:
+            knowledge = json.load(f)
+        self.basketball_data = knowledge
+        print(f"Loaded {len(knowledge)} basketball knowledge items from {filename}")
+        return knowledge 
\ No newline at end of file
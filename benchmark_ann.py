@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Recall/latency benchmark for the approximate (IVF) vector index
+This script compares IVFBackend against exact LocalBackend search so you can
+pick IVF_NLIST / IVF_NPROBE settings for a given corpus size.
+"""
+
+import argparse
+import json
+import time
+import numpy as np
+from config import Config
+from vector_backends import LocalBackend, IVFBackend
+
+def make_corpus(size: int, dimension: int, clusters: int, seed: int = 0) -> np.ndarray:
+    """Create clustered unit vectors that look like sentence embeddings."""
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(clusters, dimension)).astype(np.float32)
+    labels = rng.integers(0, clusters, size=size)
+    vectors = centers[labels] + 1.5 * rng.normal(size=(size, dimension)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+def load_vectors(backend, vectors: np.ndarray, batch_size: int = 1000):
+    """Insert vectors incrementally, the same way VectorStore upserts them."""
+    for start in range(0, len(vectors), batch_size):
+        backend.upsert([
+            {'id': str(start + i), 'values': values, 'metadata': {}}
+            for i, values in enumerate(vectors[start:start + batch_size])
+        ])
+
+def time_queries(search, queries: np.ndarray, k: int):
+    """Run every query and return (results, latencies in milliseconds)."""
+    results, latencies = [], []
+    for query in queries:
+        start = time.perf_counter()
+        matches = search(query, k)
+        latencies.append((time.perf_counter() - start) * 1000)
+        results.append([match['id'] for match in matches])
+    return results, np.asarray(latencies)
+
+def recall_at_k(approximate, exact) -> float:
+    """Fraction of the exact top-k IDs that the approximate search also returned."""
+    hits = sum(len(set(a) & set(e)) for a, e in zip(approximate, exact))
+    total = sum(len(e) for e in exact)
+    return hits / total if total else 1.0
+
+def summarize(latencies: np.ndarray) -> dict:
+    return {
+        'mean_ms': float(latencies.mean()),
+        'p50_ms': float(np.percentile(latencies, 50)),
+        'p99_ms': float(np.percentile(latencies, 99)),
+    }
+
+def run_benchmark(size: int, queries: int, k: int, nlist: int, nprobes, clusters: int, seed: int = 0) -> dict:
+    config = Config()
+    dimension = config.VECTOR_DIMENSION
+    
+    # Draw queries from the same topic clusters as the corpus
+    vectors = make_corpus(size + queries, dimension, clusters, seed)
+    corpus, query_vectors = vectors[:size], vectors[size:]
+    
+    exact = LocalBackend(config, path="")
+    load_vectors(exact, corpus)
+    
+    start = time.perf_counter()
+    ivf = IVFBackend(config, path="", nlist=nlist)
+    load_vectors(ivf, corpus)
+    if not ivf.is_trained:
+        ivf.train()
+    build_seconds = time.perf_counter() - start
+    
+    exact_results, exact_latencies = time_queries(exact.query, query_vectors, k)
+    report = {
+        'size': size,
+        'dimension': dimension,
+        'k': k,
+        'nlist': nlist,
+        'ivf_build_seconds': build_seconds,
+        'exact': summarize(exact_latencies),
+        'ivf': [],
+    }
+    
+    for nprobe in nprobes:
+        results, latencies = time_queries(
+            lambda query, top_k: ivf.query(query, top_k, nprobe=nprobe), query_vectors, k
+        )
+        row = {'nprobe': nprobe, 'recall_at_k': recall_at_k(results, exact_results)}
+        row.update(summarize(latencies))
+        row['speedup'] = report['exact']['mean_ms'] / row['mean_ms'] if row['mean_ms'] else 0.0
+        report['ivf'].append(row)
+    
+    return report
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark IVF recall@k against exact search")
+    parser.add_argument("--size", type=int, default=100000, help="Number of vectors in the corpus")
+    parser.add_argument("--queries", type=int, default=200, help="Number of queries to run")
+    parser.add_argument("--k", type=int, default=10, help="Top-k to retrieve")
+    parser.add_argument("--nlist", type=int, default=Config.IVF_NLIST, help="Number of IVF cells")
+    parser.add_argument("--nprobe", type=int, nargs="+", default=[1, 2, 4, 8, 16, 32],
+                        help="nprobe values to sweep")
+    parser.add_argument("--clusters", type=int, default=500, help="Topic clusters in the synthetic corpus")
+    parser.add_argument("--json", dest="json_path", help="Also write the report to this JSON file")
+    args = parser.parse_args()
+    
+    print("🏀 IVF Recall Benchmark")
+    print("=" * 50)
+    report = run_benchmark(args.size, args.queries, args.k, args.nlist, args.nprobe, args.clusters)
+    
+    print(f"Corpus: {report['size']} x {report['dimension']}, k={report['k']}, nlist={report['nlist']}")
+    print(f"IVF build time: {report['ivf_build_seconds']:.2f}s")
+    print(f"Exact search:  mean {report['exact']['mean_ms']:.3f} ms, p99 {report['exact']['p99_ms']:.3f} ms")
+    print()
+    print(f"{'nprobe':>7} {'recall@k':>9} {'mean ms':>9} {'p50 ms':>9} {'p99 ms':>9} {'speedup':>8}")
+    for row in report['ivf']:
+        print(f"{row['nprobe']:>7} {row['recall_at_k']:>9.3f} {row['mean_ms']:>9.3f} "
+              f"{row['p50_ms']:>9.3f} {row['p99_ms']:>9.3f} {row['speedup']:>7.1f}x")
+    
+    if args.json_path:
+        with open(args.json_path, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        print(f"\nReport saved to {args.json_path}")
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Latency / memory / drift benchmark for the generation model's precision modes
+Runs the same prompts through the fp32, bf16 and int8 versions of
+Config.GENERATION_MODEL with greedy decoding and compares each mode with fp32.
+"""
+
+import argparse
+import copy
+import json
+import time
+import numpy as np
+from config import Config
+import model_registry
+from inference_precision import PRECISIONS, configure_threads, convert_precision, model_size_mb
+
+def build_prompts(questions):
+    return [f"\nYou are a basketball expert.\n\nQuestion: {question}\n\nAnswer:" for question in questions]
+
+def generate_all(model, tokenizer, prompts, max_new_tokens: int):
+    """Greedy-decode each prompt; return (new token ids per prompt, latencies in ms)."""
+    import torch
+    
+    outputs, latencies = [], []
+    for prompt in prompts:
+        inputs = tokenizer(prompt, return_tensors="pt")
+        start = time.perf_counter()
+        with torch.no_grad():
+            sequence = model.generate(
+                input_ids=inputs['input_ids'],
+                attention_mask=inputs['attention_mask'],
+                max_new_tokens=max_new_tokens,
+                do_sample=False,
+                pad_token_id=tokenizer.eos_token_id
+            )[0]
+        latencies.append((time.perf_counter() - start) * 1000)
+        outputs.append(sequence[inputs['input_ids'].shape[1]:].tolist())
+    return outputs, np.asarray(latencies)
+
+def token_agreement(candidate, reference) -> float:
+    """Fraction of reference token positions the candidate reproduces exactly."""
+    total = sum(len(r) for r in reference)
+    same = sum(sum(a == b for a, b in zip(c, r)) for c, r in zip(candidate, reference))
+    return same / total if total else 1.0
+
+def run_benchmark(model_name: str, modes, prompts, max_new_tokens: int, threads: int) -> dict:
+    configure_threads(threads)
+    base = model_registry.get_generation_model(model_name)
+    tokenizer = base.tokenizer
+    
+    report = {'model': model_name, 'prompts': len(prompts), 'max_new_tokens': max_new_tokens,
+              'threads': threads, 'modes': []}
+    reference = None
+    for mode in ["fp32"] + [mode for mode in modes if mode != "fp32"]:
+        model = base.model if mode == "fp32" else convert_precision(copy.deepcopy(base.model), mode)
+        model.eval()
+        generate_all(model, tokenizer, prompts[:1], 2)  # warm-up
+        
+        outputs, latencies = generate_all(model, tokenizer, prompts, max_new_tokens)
+        tokens = sum(len(output) for output in outputs)
+        if reference is None:
+            reference = outputs
+        
+        report['modes'].append({
+            'precision': mode,
+            'model_mb': model_size_mb(model),
+            'mean_ms': float(latencies.mean()),
+            'p50_ms': float(np.percentile(latencies, 50)),
+            'p99_ms': float(np.percentile(latencies, 99)),
+            'tokens_per_second': tokens / (latencies.sum() / 1000) if latencies.sum() else 0.0,
+            'token_agreement': token_agreement(outputs, reference),
+            'exact_match': sum(o == r for o, r in zip(outputs, reference)) / len(reference),
+            'sample': tokenizer.decode(outputs[0], skip_special_tokens=True).strip()
+        })
+    
+    fp32_ms = report['modes'][0]['mean_ms']
+    for row in report['modes']:
+        row['speedup'] = fp32_ms / row['mean_ms'] if row['mean_ms'] else 0.0
+    return report
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare fp32, bf16 and int8 generation on CPU")
+    parser.add_argument("--model", default=Config.GENERATION_MODEL, help="Hugging Face model to load")
+    parser.add_argument("--modes", nargs="+", choices=PRECISIONS, default=list(PRECISIONS),
+                        help="Precision modes to compare against fp32")
+    parser.add_argument("--max-new-tokens", type=int, default=32, help="Tokens generated per prompt")
+    parser.add_argument("--threads", type=int, default=Config.TORCH_THREADS,
+                        help="torch intra-op threads (0 = torch default)")
+    parser.add_argument("--json", dest="json_path", help="Also write the report to this JSON file")
+    args = parser.parse_args()
+    
+    print("🏀 Inference Precision Benchmark")
+    print("=" * 50)
+    prompts = build_prompts(Config.CANONICAL_QUESTIONS)
+    report = run_benchmark(args.model, args.modes, prompts, args.max_new_tokens, args.threads)
+    
+    print(f"Model: {report['model']}, {report['prompts']} prompts x {report['max_new_tokens']} new tokens")
+    print()
+    print(f"{'mode':>6} {'size MB':>8} {'mean ms':>9} {'p99 ms':>9} {'tok/s':>7} {'speedup':>8} "
+          f"{'agree':>6} {'exact':>6}")
+    for row in report['modes']:
+        print(f"{row['precision']:>6} {row['model_mb']:>8.1f} {row['mean_ms']:>9.1f} {row['p99_ms']:>9.1f} "
+              f"{row['tokens_per_second']:>7.1f} {row['speedup']:>7.2f}x {row['token_agreement']:>6.2f} "
+              f"{row['exact_match']:>6.2f}")
+    print()
+    for row in report['modes']:
+        print(f"{row['precision']}: {row['sample'][:100]!r}")
+    
+    if args.json_path:
+        with open(args.json_path, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        print(f"\nReport saved to {args.json_path}")
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
@@ -0,0 +1,204 @@
+#!/usr/bin/env python3
+"""
+Offline latency/throughput benchmark for ingestion, search and generate_response
+Everything runs in-process without network access: the local NumPy index
+stands in for Pinecone, a hashing encoder for the sentence-transformers model
+and a tiny random GPT-2 for the generation model (see local_models.py). The
+answers are meaningless, but every stage does its real work, so reports
+written with --json can be compared across commits with --compare.
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import re
+import subprocess
+import time
+from typing import List, Dict, Any
+import numpy as np
+from config import Config
+import metrics
+from basketball_knowledge import BasketballKnowledgeBase
+from local_models import use_offline_models
+from vector_store import batched
+
+def synthetic_corpus(size: int, seed: int = 0) -> List[Dict[str, str]]:
+    """``size`` distinct knowledge items built from the bundled knowledge base.
+
+    Each item is a base item plus a few sentences drawn from other items,
+    so the corpus keeps the real vocabulary while every item hashes to its
+    own vector ID.
+    """
+    base = BasketballKnowledgeBase().get_all_basketball_knowledge()
+    sentences = [s for item in base for s in re.split(r"(?<=[.!?])\s+", item['content']) if s]
+    rng = random.Random(seed)
+    
+    corpus = []
+    for i in range(size):
+        item = base[i % len(base)]
+        extra = rng.sample(sentences, k=min(3, len(sentences)))
+        corpus.append({
+            'title': f"{item['title']} {i}",
+            'content': " ".join([item['content']] + extra)
+        })
+    return corpus
+
+def make_questions(corpus: List[Dict[str, str]], count: int, seed: int = 0) -> List[str]:
+    """The canonical questions followed by questions about random corpus items."""
+    rng = random.Random(seed)
+    questions = list(Config.CANONICAL_QUESTIONS)
+    while len(questions) < count:
+        title = rng.choice(corpus)['title'].rsplit(" ", 1)[0]
+        questions.append(f"What is important about {title.lower()}?")
+    return questions[:count]
+
+def summarize(latencies_ms: List[float], seconds: float, operations: int) -> Dict[str, float]:
+    latencies = np.asarray(latencies_ms)
+    return {
+        'operations': operations,
+        'seconds': seconds,
+        'qps': operations / seconds if seconds else 0.0,
+        'mean_ms': float(latencies.mean()),
+        'p50_ms': float(np.percentile(latencies, 50)),
+        'p95_ms': float(np.percentile(latencies, 95)),
+        'p99_ms': float(np.percentile(latencies, 99))
+    }
+
+def time_calls(func, inputs) -> Dict[str, float]:
+    """Call ``func`` on each input in turn; latencies are per call."""
+    latencies = []
+    start = time.perf_counter()
+    for value in inputs:
+        call_start = time.perf_counter()
+        func(value)
+        latencies.append((time.perf_counter() - call_start) * 1000)
+    return summarize(latencies, time.perf_counter() - start, len(latencies))
+
+def bench_ingestion(chatbot, corpus: List[Dict[str, str]], batch_size: int) -> Dict[str, float]:
+    """Chunk, embed and upsert the corpus ``batch_size`` items at a time (latencies are per batch)."""
+    batches = list(batched(corpus, batch_size))
+    report = time_calls(
+        lambda batch: chatbot.vector_store.add_basketball_knowledge(chatbot.chunker.chunk_items(batch)),
+        batches
+    )
+    report['items'] = len(corpus)
+    report['items_per_second'] = len(corpus) / report['seconds'] if report['seconds'] else 0.0
+    return report
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True, cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ""
+
+def run_benchmark(corpus_size: int, queries: int, generations: int, top_k: int, batch_size: int,
+                  max_new_tokens: int, caches: bool, seed: int = 0) -> Dict[str, Any]:
+    import torch
+    
+    corpus = synthetic_corpus(corpus_size, seed)
+    questions = make_questions(corpus, max(queries, generations), seed)
+    
+    Config.MAX_NEW_TOKENS = max_new_tokens
+    Config.RESPONSE_CACHE_ENABLED = caches
+    Config.PRECOMPUTE_ANSWERS = caches
+    use_offline_models([f"{item['title']} {item['content']}" for item in corpus] + questions)
+    
+    from basketball_chatbot import BasketballChatbot
+    chatbot = BasketballChatbot()
+    metrics.reset()
+    
+    report = {
+        'commit': git_commit(),
+        'python': platform.python_version(),
+        'torch': torch.__version__,
+        'settings': {
+            'corpus_size': corpus_size,
+            'queries': queries,
+            'generations': generations,
+            'top_k': top_k,
+            'batch_size': batch_size,
+            'max_new_tokens': max_new_tokens,
+            'caches': caches,
+            'hybrid_search': Config.HYBRID_SEARCH,
+            'generation_batching': Config.GENERATION_BATCHING,
+            'inference_precision': Config.INFERENCE_PRECISION,
+            'seed': seed
+        }
+    }
+    
+    report['ingestion'] = bench_ingestion(chatbot, corpus, batch_size)
+    
+    # Warm up the lexical index and the generation path outside the timings
+    chatbot.vector_store.search(questions[0], top_k)
+    chatbot.generate_response(questions[0])
+    metrics.reset()
+    
+    report['search'] = time_calls(lambda question: chatbot.vector_store.search(question, top_k),
+                                  questions[:queries])
+    report['generate_response'] = time_calls(chatbot.generate_response, questions[:generations])
+    report['stages'] = metrics.snapshot()['histograms'].get('stage_seconds', {})
+    return report
+
+def compare(report: Dict[str, Any], baseline: Dict[str, Any]):
+    """Print how each benchmark moved relative to ``baseline``."""
+    def change(new: float, old: float) -> str:
+        return f"{(new - old) / old * 100:+7.1f}%" if old else "    n/a"
+    
+    print(f"Compared with {baseline.get('commit') or 'baseline'}:")
+    print(f"{'benchmark':>18} {'p50':>9} {'p99':>9} {'qps':>9}")
+    for name in ('ingestion', 'search', 'generate_response'):
+        if name not in baseline:
+            continue
+        new, old = report[name], baseline[name]
+        print(f"{name:>18} {change(new['p50_ms'], old['p50_ms']):>9} "
+              f"{change(new['p99_ms'], old['p99_ms']):>9} {change(new['qps'], old['qps']):>9}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline benchmark of ingestion, search and generation")
+    parser.add_argument("--corpus-size", type=int, default=2000, help="Synthetic knowledge items to ingest")
+    parser.add_argument("--queries", type=int, default=200, help="Searches to time")
+    parser.add_argument("--generations", type=int, default=20, help="generate_response calls to time")
+    parser.add_argument("--top-k", type=int, default=5, help="Results per search")
+    parser.add_argument("--batch-size", type=int, default=100, help="Items per ingestion batch")
+    parser.add_argument("--max-new-tokens", type=int, default=16, help="Tokens generated per answer")
+    parser.add_argument("--caches", action="store_true",
+                        help="Keep the response cache and precomputed answers on (off by default)")
+    parser.add_argument("--seed", type=int, default=0, help="Seed for the corpus and questions")
+    parser.add_argument("--json", dest="json_path", help="Also write the report to this JSON file")
+    parser.add_argument("--compare", dest="baseline_path", help="Report JSON from an earlier run to compare with")
+    args = parser.parse_args()
+    
+    print("🏀 Offline Pipeline Benchmark")
+    print("=" * 50)
+    report = run_benchmark(args.corpus_size, args.queries, args.generations, args.top_k, args.batch_size,
+                           args.max_new_tokens, args.caches, args.seed)
+    
+    print()
+    print(f"Commit {report['commit'] or '?'}, corpus {args.corpus_size} items")
+    print(f"{'benchmark':>18} {'ops':>6} {'qps':>9} {'mean ms':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    for name in ('ingestion', 'search', 'generate_response'):
+        row = report[name]
+        print(f"{name:>18} {row['operations']:>6} {row['qps']:>9.1f} {row['mean_ms']:>9.2f} "
+              f"{row['p50_ms']:>9.2f} {row['p95_ms']:>9.2f} {row['p99_ms']:>9.2f}")
+    print(f"Ingestion throughput: {report['ingestion']['items_per_second']:.0f} items/sec")
+    
+    print()
+    print("Time per stage (mean ms):")
+    for stage, row in sorted(report['stages'].items(), key=lambda pair: -pair[1]['sum']):
+        print(f"  {stage.split('=', 1)[-1]:<22} {row['mean'] * 1000:>9.2f} x {row['count']}")
+    
+    if args.baseline_path:
+        print()
+        with open(args.baseline_path, encoding='utf-8') as f:
+            compare(report, json.load(f))
+    
+    if args.json_path:
+        with open(args.json_path, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        print(f"\nReport saved to {args.json_path}")
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
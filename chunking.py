@@ -0,0 +1,114 @@
+import re
+from functools import lru_cache
+from typing import Dict, Any, Iterable, Iterator, List, Optional
+from config import Config
+from vector_store import knowledge_id
+
+# A "piece" is one word plus the whitespace that follows it
+PIECE_PATTERN = re.compile(r"\S+\s*")
+SENTENCE_END = re.compile(r"[.!?][\"')\]]*\s*$")
+
+class TextChunker:
+    """Split knowledge items into overlapping, token-bounded chunks.
+
+    Token counts come from tiktoken (``Config.CHUNK_ENCODING``) when it is
+    available and fall back to a word/punctuation count otherwise. Text is
+    consumed lazily word by word and at most one chunk is buffered, so both
+    the item stream and the chunk stream are generators.
+    """
+    
+    def __init__(self, chunk_size: Optional[int] = None, chunk_overlap: Optional[int] = None,
+                 encoding_name: Optional[str] = None):
+        config = Config()
+        self.chunk_size = chunk_size or config.CHUNK_SIZE
+        self.chunk_overlap = chunk_overlap if chunk_overlap is not None else config.CHUNK_OVERLAP
+        if self.chunk_overlap >= self.chunk_size:
+            raise ValueError("CHUNK_OVERLAP must be smaller than CHUNK_SIZE")
+        self._encoding = self._load_encoding(encoding_name or config.CHUNK_ENCODING)
+        self.count_tokens = lru_cache(maxsize=65536)(self._count_tokens)
+    
+    @staticmethod
+    def _load_encoding(encoding_name: str):
+        try:
+            import tiktoken
+            return tiktoken.get_encoding(encoding_name)
+        except Exception as e:
+            print(f"tiktoken unavailable ({e}); counting tokens by words instead")
+            return None
+    
+    def _count_tokens(self, text: str) -> int:
+        if self._encoding is not None:
+            return len(self._encoding.encode(text, disallowed_special=()))
+        return len(re.findall(r"\w+|[^\w\s]", text))
+    
+    def split_text(self, text: str, budget: Optional[int] = None) -> Iterator[str]:
+        """Yield chunks of at most ``budget`` tokens with CHUNK_OVERLAP tokens of overlap.
+
+        Chunks end on a sentence boundary when one falls in the second half
+        of the chunk; otherwise they end on a word boundary.
+        """
+        budget = budget or self.chunk_size
+        overlap = min(self.chunk_overlap, budget // 2)
+        pieces: List[str] = []
+        counts: List[int] = []
+        total = 0
+        
+        for match in PIECE_PATTERN.finditer(text):
+            piece = match.group()
+            count = self.count_tokens(piece)
+            
+            if pieces and total + count > budget:
+                cut = self._cut_point(pieces, counts)
+                yield "".join(pieces[:cut]).strip()
+                
+                # Carry the tail of the emitted chunk over as overlap
+                start, carried = cut, 0
+                while start > 0 and carried + counts[start - 1] <= overlap:
+                    start -= 1
+                    carried += counts[start]
+                pieces, counts = pieces[start:], counts[start:]
+                total = sum(counts)
+                
+                # Drop overlap if it would leave no room for the new piece
+                while pieces and total + count > budget:
+                    total -= counts.pop(0)
+                    pieces.pop(0)
+            
+            pieces.append(piece)
+            counts.append(count)
+            total += count
+        
+        if pieces:
+            yield "".join(pieces).strip()
+    
+    @staticmethod
+    def _cut_point(pieces: List[str], counts: List[int]) -> int:
+        total = sum(counts)
+        running = total
+        for i in range(len(pieces) - 1, 0, -1):
+            running -= counts[i]
+            if running < total / 2:
+                break
+            if SENTENCE_END.search(pieces[i - 1]):
+                return i
+        return len(pieces)
+    
+    def chunk_items(self, knowledge_items: Iterable[Dict[str, Any]]) -> Iterator[Dict[str, Any]]:
+        """Yield chunk items for each knowledge item, keeping parent metadata.
+
+        Every chunk carries ``parent_id`` (the content hash of the original
+        item), ``chunk_index`` and any extra fields of the parent, so
+        retrieval results can be traced back to their source document.
+        Items that already fit in one chunk are passed through unchanged
+        apart from those two fields.
+        """
+        for item in knowledge_items:
+            parent_id = knowledge_id(item)
+            budget = max(self.chunk_size - self.count_tokens(f"{item['title']}: "), 1)
+            
+            for index, text in enumerate(self.split_text(item['content'], budget)):
+                chunk = dict(item)
+                chunk['content'] = text
+                chunk['parent_id'] = parent_id
+                chunk['chunk_index'] = index
+                yield chunk
\ No newline at end of file
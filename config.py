@@ -11,22 +11,123 @@ class Config:
     HUGGINGFACE_API_TOKEN = os.getenv("")
     MODEL_NAME = os.getenv("MODEL_NAME", "meta-llama/Llama-3-7b-chat-hf")
     EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL", "sentence-transformers/all-MiniLM-L6-v2")
+    # Use a smaller, more accessible model for generation
+    GENERATION_MODEL = "microsoft/DialoGPT-medium"
+    WARM_UP_MODELS = True  # Run a dummy forward pass when models are first loaded
+    INFERENCE_PRECISION = os.getenv("INFERENCE_PRECISION", "fp32")  # "fp32", "bf16" or "int8"
+    TORCH_THREADS = int(os.getenv("TORCH_THREADS", "0"))  # Intra-op threads per process (0 = torch default)
+    GENERATION_BATCHING = True  # Batch concurrent generate_response calls together
+    GENERATION_MAX_BATCH_SIZE = 8  # Max prompts per batched forward pass
+    GENERATION_MAX_WAIT_MS = 10  # Max time to wait for more prompts before running a batch
+    PREFIX_CACHE_ENABLED = True  # Reuse attention KV states for shared prompt prefixes
+    PREFIX_CACHE_MAX_MB = 512  # Memory budget for cached KV states (LRU eviction beyond it)
+    PREFIX_CACHE_MIN_TOKENS = 4  # Don't cache prefixes shorter than this
     
     # Pinecone Configuration
     PINECONE_API_KEY = os.getenv("PINECONE_API_KEY")
     PINECONE_ENVIRONMENT = os.getenv("PINECONE_ENVIRONMENT")
     PINECONE_INDEX_NAME = os.getenv("PINECONE_INDEX_NAME", "basketball-analysis")
+    PINECONE_NAMESPACE = os.getenv("PINECONE_NAMESPACE", "")
     
     # Model Parameters
     MAX_LENGTH = 2048
-    TEMPERATURE = 0.7
-    TOP_P = 0.9
+    DO_SAMPLE = False  # Greedy by default, so precomputed and cached answers match fresh ones
+    TEMPERATURE = 0.7  # Only used when DO_SAMPLE is True
+    TOP_P = 0.9  # Only used when DO_SAMPLE is True
     
     # Vector Database Parameters
+    VECTOR_BACKEND = os.getenv("VECTOR_BACKEND", "pinecone")  # "pinecone", "local" or "ivf"
+    LOCAL_INDEX_PATH = os.getenv("LOCAL_INDEX_PATH", "basketball_index.npz")
+    IVF_NLIST = 256  # Number of k-means cells in the approximate index
+    IVF_NPROBE = 8  # Cells scanned per query (higher = better recall, slower)
+    IVF_TRAIN_FACTOR = 39  # Train centroids once the index holds this many vectors per cell
     VECTOR_DIMENSION = 384
     METRIC = "cosine"
+    EMBEDDING_BATCH_SIZE = 64
+    EMBEDDING_CACHE_DIR = os.getenv("EMBEDDING_CACHE_DIR", ".embedding_cache")  # Empty to disable
+    EMBEDDING_CACHE_MEMORY_ITEMS = 10000
+    EMBEDDING_CACHE_DTYPE = "float16"  # "float16" halves disk size, "float32" is lossless
+    UPSERT_BATCH_SIZE = 100
+    ENUMERATION_PAGE_SIZE = 1000  # Vectors fetched per page when scanning the index
+    KNOWLEDGE_VERSION_CHECK_SECONDS = 2.0  # How often to look for index changes made by other processes
+    
+    # Hybrid Retrieval Parameters
+    HYBRID_SEARCH = True  # Fuse BM25 term matches with dense results
+    HYBRID_CANDIDATES = 20  # Results taken from each retriever before fusion
+    RRF_K = 60  # Reciprocal-rank fusion constant
+    BM25_K1 = 1.5
+    BM25_B = 0.75
+    LEXICAL_FAST_PATH = True  # Skip the encoder when the term match is decisive (response cache off only)
+    LEXICAL_DECISIVE_RATIO = 2.0  # Best BM25 score must be this many times the runner-up
+    
+    # Response Cache Parameters
+    RESPONSE_CACHE_ENABLED = True
+    RESPONSE_CACHE_THRESHOLD = 0.95  # Min cosine similarity between questions to reuse an answer
+    RESPONSE_CACHE_TTL = 3600  # Seconds before a cached answer expires
+    RESPONSE_CACHE_SIZE = 1000  # Max cached answers (least recently used are evicted)
+    
+    # HTTP Server Parameters
+    SERVER_HOST = os.getenv("SERVER_HOST", "0.0.0.0")
+    SERVER_PORT = int(os.getenv("SERVER_PORT", "8000"))
+    SERVER_WORKERS = int(os.getenv("SERVER_WORKERS", "1"))  # Processes sharing the port
+    SERVER_THREADS = 8  # Thread pool per worker for embedding, search and generation
+    SERVER_MAX_CONCURRENT_GENERATIONS = 2  # Generations in flight per worker (at least a full batch when batching)
+    
+    # Metrics Parameters
+    METRICS_ENABLED = True  # Per-stage latency histograms and counters (see metrics.py)
+    METRICS_TRACE_HISTORY = 100  # Recent request traces kept for the JSON export
+    METRICS_SLOW_REQUEST_SECONDS = 10.0  # Print the stage breakdown of slower requests (0 = never)
+    
+    # Reranking Parameters
+    RERANK_ENABLED = False  # Rerank retrieved passages with a cross-encoder
+    RERANKER_MODEL = os.getenv("RERANKER_MODEL", "cross-encoder/ms-marco-MiniLM-L-6-v2")
+    RERANK_CANDIDATES = 20  # Passages over-fetched for the cross-encoder to score
+    RERANK_TOP_K = 3  # Passages kept after reranking
+    RERANK_TIME_BUDGET_MS = 200  # Fall back to retrieval order if scoring takes longer
+    RERANK_CACHE_SIZE = 10000  # Cached (query, passage) scores
+    
+    # Answer Policy Parameters
+    ANSWER_POLICY_ENABLED = True
+    ANSWER_CONFIDENCE_THRESHOLD = 0.75  # Top score at which a FAQ-style item is returned as the answer
+    ANSWER_CONTEXT_FLOOR = 0.25  # Below this top score the prompt gets no context at all
+    FAQ_MAX_WORDS = 80  # Longest unchunked item that can be returned verbatim
+    FAQ_ANSWER_TEMPLATE = "{content}"  # Fields: {title}, {content}
+    
+    # Statistics Parameters
+    STATS_ENABLED = True  # Answer numeric statistics questions exactly (see stats_engine.py)
+    BOX_SCORES_PATH = os.getenv("BOX_SCORES_PATH", "box_scores/*.csv")  # Player-game box-score CSVs
+    STATS_LEADERBOARD_SIZE = 5  # Players listed for "who led..." questions
+    STATS_LEADER_MIN_MINUTES_SHARE = 0.25  # Leaders need this share of the season's most minutes
+    
+    # Canonical Questions (answers are precomputed when the knowledge base is set up)
+    QUICK_ACTIONS = {
+        "📋 Basketball Rules": "What are the basic rules of basketball?",
+        "👥 Player Positions": "What are the different player positions in basketball?",
+        "📊 Statistics": "What are the most important basketball statistics?",
+    }
+    EXAMPLE_QUESTIONS = [
+        "What is a pick and roll?",
+        "How do you calculate field goal percentage?",
+        "What are the responsibilities of a point guard?",
+        "What is zone defense?",
+        "How many points is a three-pointer worth?"
+    ]
+    CANONICAL_QUESTIONS = list(QUICK_ACTIONS.values()) + EXAMPLE_QUESTIONS
+    PRECOMPUTE_ANSWERS = True
+    PRECOMPUTED_ANSWERS_PATH = os.getenv("PRECOMPUTED_ANSWERS_PATH", "precomputed_answers.json")
     
     # Basketball Analysis Parameters
     MAX_TOKENS = 1000
+    CONTEXT_WINDOW = 1024  # Generation model's max positions (prompt + answer)
+    MAX_NEW_TOKENS = 256  # Answer tokens reserved out of CONTEXT_WINDOW
+    CONTEXT_CANDIDATES = 8  # Passages retrieved before packing them into the prompt
+    CONTEXT_MIN_SCORE = 0.2  # Passages scoring below this are never put in the prompt
+    CONTEXT_REDUNDANCY_THRESHOLD = 0.8  # Word overlap above which a passage counts as a repeat
     CHUNK_SIZE = 1000
-    CHUNK_OVERLAP = 200 
\ No newline at end of file
+    CHUNK_OVERLAP = 200
+    CHUNK_ENCODING = "cl100k_base"  # tiktoken encoding used to count chunk tokens
+    
+    # Bulk Ingestion Parameters
+    INGESTION_BATCH_SIZE = 500  # Records per embed/upsert cycle
+    INGESTION_CHECKPOINT_PATH = "ingestion_checkpoint.json"
+    INGESTION_CHECKPOINT_EVERY = 10  # Batches between index saves and checkpoint updates 
\ No newline at end of file
@@ -0,0 +1,107 @@
+import re
+from typing import Dict, Any, List
+
+WORD_PATTERN = re.compile(r"\w+")
+
+class ContextBudgeter:
+    """Pack retrieved passages into a fixed prompt-token budget.
+
+    Tokens are counted with the generation model's own tokenizer. The input
+    budget is the model's context window minus the tokens reserved for the
+    answer and the tokens of the prompt template and question. Passages are
+    taken in the order given (best first). Ones scoring below ``min_score``
+    (passages without a similarity score are kept) or mostly repeating an
+    already selected passage (overlapping chunks of the same document,
+    near-duplicate items) are dropped, and the last passage that only
+    partly fits is cut at a word boundary.
+    """
+    
+    def __init__(self, tokenizer, context_window: int = 1024, max_new_tokens: int = 256,
+                 min_score: float = 0.0, redundancy_threshold: float = 0.8, min_passage_tokens: int = 32):
+        if max_new_tokens >= context_window:
+            raise ValueError("MAX_NEW_TOKENS must be smaller than CONTEXT_WINDOW")
+        self.tokenizer = tokenizer
+        self.context_window = context_window
+        self.max_new_tokens = max_new_tokens
+        self.min_score = min_score
+        self.redundancy_threshold = redundancy_threshold
+        self.min_passage_tokens = min_passage_tokens
+    
+    def count_tokens(self, text: str) -> int:
+        return len(self.tokenizer.encode(text, add_special_tokens=False))
+    
+    def input_budget(self, prompt_overhead: str) -> int:
+        """Tokens left for context once the answer and ``prompt_overhead`` are accounted for."""
+        return self.context_window - self.max_new_tokens - self.count_tokens(prompt_overhead)
+    
+    @staticmethod
+    def _format(passage: Dict[str, Any]) -> str:
+        return f"{passage['title']}: {passage['content']}"
+    
+    def _is_redundant(self, words: set, selected_words: List[set]) -> bool:
+        for other in selected_words:
+            smaller = min(len(words), len(other))
+            if smaller and len(words & other) / smaller >= self.redundancy_threshold:
+                return True
+        return False
+    
+    def _truncate(self, text: str, budget: int) -> str:
+        ids = self.tokenizer.encode(text, add_special_tokens=False)[:budget]
+        truncated = self.tokenizer.decode(ids, skip_special_tokens=True)
+        # Cut back to the last whole word so the passage does not end mid-token
+        if " " in truncated:
+            truncated = truncated.rsplit(" ", 1)[0]
+        return truncated.strip()
+    
+    def pack(self, passages: List[Dict[str, Any]], prompt_overhead: str = "",
+             separator: str = "\n\n") -> Dict[str, Any]:
+        """Select and format passages for a prompt whose non-context text is ``prompt_overhead``.
+
+        Returns the context string plus what was kept and dropped, so callers
+        can log how much of the retrieval made it into the prompt.
+        """
+        budget = self.input_budget(prompt_overhead)
+        separator_tokens = self.count_tokens(separator)
+        parts: List[str] = []
+        selected: List[Dict[str, Any]] = []
+        selected_words: List[set] = []
+        dropped = {'low_score': 0, 'redundant': 0, 'over_budget': 0}
+        used = 0
+        
+        for passage in passages:
+            score = passage.get('score')
+            if score is not None and score < self.min_score:
+                dropped['low_score'] += 1
+                continue
+            
+            words = set(WORD_PATTERN.findall(passage['content'].lower()))
+            if self._is_redundant(words, selected_words):
+                dropped['redundant'] += 1
+                continue
+            
+            text = self._format(passage)
+            cost = self.count_tokens(text) + (separator_tokens if parts else 0)
+            remaining = budget - used
+            if cost > remaining:
+                room = remaining - (separator_tokens if parts else 0)
+                if room < self.min_passage_tokens:
+                    dropped['over_budget'] += 1
+                    continue
+                text = self._truncate(text, room)
+                cost = self.count_tokens(text) + (separator_tokens if parts else 0)
+                if not text or cost > remaining:
+                    dropped['over_budget'] += 1
+                    continue
+            
+            parts.append(text)
+            selected.append(passage)
+            selected_words.append(words)
+            used += cost
+        
+        return {
+            'context': separator.join(parts),
+            'passages': selected,
+            'tokens': used,
+            'budget': max(budget, 0),
+            'dropped': dropped
+        }
\ No newline at end of file
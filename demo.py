@@ -69,8 +69,10 @@ def demo_chatbot():
             print("🏀 Basketball Bot: ", end="", flush=True)
             
             try:
-                response = chatbot.generate_response(user_input)
-                print(response)
+                # Print words as they are generated instead of waiting for the full answer
+                for text in chatbot.generate_response_stream(user_input):
+                    print(text, end="", flush=True)
+                print()
             except Exception as e:
                 print(f"Sorry, I encountered an error: {e}")
             
@@ -0,0 +1,219 @@
+import hashlib
+import json
+import os
+import re
+import threading
+import uuid
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import List, Optional, Sequence
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Windows: no cross-process locking
+    fcntl = None
+
+class EmbeddingCache:
+    """Content-addressed embedding cache with an LRU memory tier and a disk tier.
+
+    Entries are keyed by a SHA-256 of the embedding model name and the text,
+    so changing ``Config.EMBEDDING_MODEL`` never serves stale vectors. The
+    disk tier is an append-only pair of files per model: ``vectors.bin``
+    holds fixed-width rows (float16 by default) and is read through a
+    memory map, and ``keys.txt`` lists the key of each row in order.
+    
+    Several processes (server workers, the app, ``ingestion.py``) may share a
+    cache directory. Appends happen under an exclusive ``flock`` on
+    ``.lock``, after first reading the keys other processes appended, so
+    every process agrees on which row holds which key. Disk reads first pick
+    up new keys under a shared lock. ``meta.json`` carries a random epoch
+    that changes when the files are cleared and recreated, so row numbers
+    from before a ``clear`` in another process are never reused.
+    """
+    
+    def __init__(self, model_name: str, cache_dir: str, max_memory_items: int = 10000,
+                 dtype: str = "float16"):
+        self.model_name = model_name
+        self.max_memory_items = max_memory_items
+        self.dtype = np.dtype(dtype)
+        self.directory = os.path.join(cache_dir, re.sub(r"[^A-Za-z0-9_.-]+", "_", model_name))
+        self.hits = 0
+        self.misses = 0
+        
+        self._lock = threading.Lock()
+        self._memory: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._rows = {}
+        self._stored_rows = 0  # Rows of keys.txt read so far
+        self._keys_offset = 0  # Bytes of keys.txt read so far
+        self._dimension: Optional[int] = None
+        self._epoch: Optional[str] = None  # Epoch of the files the row map was read from
+        self._mmap: Optional[np.memmap] = None
+        
+        os.makedirs(self.directory, exist_ok=True)
+        self._keys_path = os.path.join(self.directory, "keys.txt")
+        self._vectors_path = os.path.join(self.directory, "vectors.bin")
+        self._meta_path = os.path.join(self.directory, "meta.json")
+        self._lock_path = os.path.join(self.directory, ".lock")
+        with self._file_lock():
+            self._refresh_rows()
+    
+    def key(self, text: str) -> str:
+        """Return the cache key for ``text`` under this cache's model."""
+        return hashlib.sha256(f"{self.model_name}\0{text}".encode("utf-8")).hexdigest()
+    
+    @contextmanager
+    def _file_lock(self, shared: bool = False):
+        """Hold the directory's cross-process lock (released when the file closes).
+        
+        Readers take it ``shared``; anything that writes the files takes it
+        exclusively.
+        """
+        with open(self._lock_path, "a") as f:
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_SH if shared else fcntl.LOCK_EX)
+            yield
+    
+    def _refresh_rows(self, writable: bool = True):
+        """Read keys appended since the last call, by this or any other process.
+        
+        Call with the file lock held, exclusively if ``writable``. The row
+        map starts over when another process cleared the files.
+        """
+        try:
+            with open(self._meta_path, encoding="utf-8") as f:
+                meta = json.load(f)
+        except FileNotFoundError:
+            self._reset_rows()
+            return
+        if meta.get("epoch") != self._epoch:
+            self._reset_rows()
+        if self._dimension is None:
+            if meta.get("dtype") != self.dtype.name:
+                # Written with another precision; start over rather than mixing rows
+                if writable:
+                    self._clear_files()
+                return
+            self._dimension = meta["dimension"]
+            self._epoch = meta.get("epoch")
+        
+        if not os.path.exists(self._keys_path):
+            return
+        # Only trust rows whose vector bytes were fully written
+        row_bytes = self._dimension * self.dtype.itemsize
+        stored_rows = os.path.getsize(self._vectors_path) // row_bytes if os.path.exists(self._vectors_path) else 0
+        with open(self._keys_path, "rb") as f:
+            f.seek(self._keys_offset)
+            for line in f:
+                if self._stored_rows >= stored_rows or not line.endswith(b"\n"):
+                    break
+                self._rows.setdefault(line.decode("utf-8").strip(), self._stored_rows)
+                self._stored_rows += 1
+                self._keys_offset += len(line)
+    
+    def _disk_vectors(self) -> Optional[np.memmap]:
+        rows = self._stored_rows
+        if rows == 0:
+            return None
+        if self._mmap is None or self._mmap.shape[0] < rows:
+            self._mmap = np.memmap(self._vectors_path, dtype=self.dtype, mode="r",
+                                   shape=(rows, self._dimension))
+        return self._mmap
+    
+    def _remember(self, key: str, vector: np.ndarray):
+        self._memory[key] = vector
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory_items:
+            self._memory.popitem(last=False)
+    
+    def get_many(self, texts: Sequence[str]) -> List[Optional[np.ndarray]]:
+        """Return the cached float32 vector for each text, or ``None`` on a miss.
+        
+        Texts missing from the memory tier are looked up on disk, after
+        reading the keys other processes appended since the last look.
+        """
+        with self._lock:
+            keys = [self.key(text) for text in texts]
+            results: List[Optional[np.ndarray]] = [self._memory.get(key) for key in keys]
+            missing = [i for i, vector in enumerate(results) if vector is None]
+            if missing:
+                with self._file_lock(shared=True):
+                    self._refresh_rows(writable=False)
+                    for i in missing:
+                        row = self._rows.get(keys[i])
+                        if row is not None:
+                            results[i] = np.asarray(self._disk_vectors()[row], dtype=np.float32)
+            
+            for key, vector in zip(keys, results):
+                if vector is None:
+                    self.misses += 1
+                else:
+                    self._remember(key, vector)
+                    self.hits += 1
+        return results
+    
+    def put_many(self, texts: Sequence[str], vectors: np.ndarray):
+        """Store freshly computed vectors in both tiers."""
+        vectors = np.asarray(vectors, dtype=np.float32)
+        if len(texts) == 0:
+            return
+        
+        with self._lock, self._file_lock():
+            self._refresh_rows()
+            if self._dimension is None:
+                self._dimension = int(vectors.shape[1])
+                self._epoch = uuid.uuid4().hex
+                with open(self._meta_path, "w", encoding="utf-8") as f:
+                    json.dump({"model": self.model_name, "dimension": self._dimension,
+                               "dtype": self.dtype.name, "epoch": self._epoch}, f)
+            
+            new_keys, new_rows = {}, []
+            for text, vector in zip(texts, vectors):
+                key = self.key(text)
+                self._remember(key, vector)
+                if key not in self._rows and key not in new_keys:
+                    new_keys[key] = len(new_rows)
+                    new_rows.append(vector)
+            
+            if new_keys:
+                # Vectors first, then keys: a crash never leaves a key without its row.
+                # Rows a crash left without a key are dropped so rows and keys stay aligned.
+                row_bytes = self._dimension * self.dtype.itemsize
+                with open(self._vectors_path, "ab") as f:
+                    f.truncate(self._stored_rows * row_bytes)
+                    f.write(np.asarray(new_rows, dtype=self.dtype).tobytes())
+                    f.flush()
+                    first_row = os.fstat(f.fileno()).st_size // row_bytes - len(new_rows)
+                with open(self._keys_path, "a", encoding="utf-8") as f:
+                    f.write("".join(f"{key}\n" for key in new_keys))
+                self._refresh_rows()
+                if self._stored_rows != first_row + len(new_rows):
+                    raise RuntimeError(f"Embedding cache {self.directory} is out of step with its keys")
+    
+    def _reset_rows(self):
+        self._rows = {}
+        self._stored_rows = 0
+        self._keys_offset = 0
+        self._dimension = None
+        self._epoch = None
+        self._mmap = None
+    
+    def _clear_files(self):
+        self._reset_rows()
+        for path in (self._keys_path, self._vectors_path, self._meta_path):
+            if os.path.exists(path):
+                os.remove(path)
+    
+    def clear(self):
+        """Drop every cached embedding for this model."""
+        with self._lock, self._file_lock():
+            self._memory.clear()
+            self._clear_files()
+    
+    def stats(self) -> dict:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "memory_items": len(self._memory),
+            "disk_items": len(self._rows),
+        }
\ No newline at end of file
@@ -0,0 +1,187 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Dict, List, Optional
+import metrics
+
+class _Request:
+    __slots__ = ('prompt', 'segments', 'stream_kwargs', 'future', 'enqueued_at')
+    
+    def __init__(self, prompt: str, segments: Optional[List[str]] = None,
+                 stream_kwargs: Optional[Dict[str, Any]] = None):
+        self.prompt = prompt
+        self.segments = segments
+        self.stream_kwargs = stream_kwargs
+        self.future: Future = Future()
+        self.enqueued_at = time.perf_counter()
+
+class GenerationScheduler:
+    """Dynamic batching of prompts from concurrent callers into one generate() call.
+
+    Callers submit prompts from any thread and block on their own future. A
+    single worker thread takes the first waiting prompt, collects more until
+    ``max_batch_size`` prompts are queued or ``max_wait_ms`` has passed, then
+    runs them as one left-padded batch and hands each caller its decoded
+    continuation. One batched forward pass costs far less than the same
+    prompts run one after another, which is what raises throughput on CPU.
+    
+    A prompt that ends up in a batch of its own is generated through
+    ``prefix_cache`` when one is given and the caller passed the prompt's
+    segments, so it skips prefill for any prefix seen before.
+    
+    Streamed prompts (``submit`` with a ``streamer``) go through the same
+    queue and worker but always run in a batch of their own, since a
+    transformers streamer follows a single sequence. The model therefore
+    only ever runs one generate() call at a time.
+    """
+    
+    def __init__(self, tokenizer, model, generation_kwargs: Dict[str, Any],
+                 max_batch_size: int = 8, max_wait_ms: float = 10, prefix_cache=None):
+        self.tokenizer = tokenizer
+        self.model = model
+        self.prefix_cache = prefix_cache
+        self.generation_kwargs = dict(generation_kwargs)
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self.pad_token_id = tokenizer.pad_token_id if tokenizer.pad_token_id is not None else tokenizer.eos_token_id
+        
+        self.batches_run = 0
+        self.prompts_run = 0
+        
+        self._queue: "queue.Queue[_Request]" = queue.Queue()
+        self._deferred: Optional[_Request] = None  # Streamed request that arrived mid-batch
+        self._closed = False
+        self._worker = threading.Thread(target=self._run, name="generation-scheduler", daemon=True)
+        self._worker.start()
+    
+    def submit(self, prompt: str, segments: Optional[List[str]] = None, streamer=None,
+               stopping_criteria=None) -> Future:
+        """Queue ``prompt`` and return a future resolving to the generated text.
+        
+        ``segments``, if given, are the pieces ``prompt`` was joined from
+        (see ``PrefixKVCache``). With a ``streamer`` the text is also fed to
+        it as it is decoded, and ``stopping_criteria`` can end generation
+        early. Cancelling the future before the prompt runs skips it.
+        """
+        if self._closed:
+            raise RuntimeError("GenerationScheduler is closed")
+        stream_kwargs = None
+        if streamer is not None:
+            stream_kwargs = {'streamer': streamer}
+            if stopping_criteria is not None:
+                stream_kwargs['stopping_criteria'] = stopping_criteria
+        request = _Request(prompt, segments, stream_kwargs)
+        self._queue.put(request)
+        return request.future
+    
+    def generate(self, prompt: str, timeout: float = None, segments: Optional[List[str]] = None) -> str:
+        """Queue ``prompt`` and wait for its generated text."""
+        return self.submit(prompt, segments).result(timeout=timeout)
+    
+    def close(self):
+        """Stop the worker once the queue is drained."""
+        self._closed = True
+        self._queue.put(None)
+        self._worker.join()
+    
+    def _collect_batch(self, first: _Request) -> List[_Request]:
+        batch = [first]
+        deadline = time.perf_counter() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            try:
+                request = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if request is None:
+                self._queue.put(None)
+                break
+            if request.stream_kwargs is not None:
+                # Runs on its own right after this batch
+                self._deferred = request
+                break
+            batch.append(request)
+        return batch
+    
+    def _run(self):
+        while True:
+            first, self._deferred = self._deferred or self._queue.get(), None
+            if first is None:
+                return
+            
+            batch = [first] if first.stream_kwargs is not None else self._collect_batch(first)
+            batch = [request for request in batch if request.future.set_running_or_notify_cancel()]
+            if not batch:
+                continue
+            first = batch[0]
+            started_at = time.perf_counter()
+            for request in batch:
+                metrics.observe("stage_seconds", started_at - request.enqueued_at, stage="generation_queue")
+            metrics.observe("generation_batch_size", len(batch), buckets=(1, 2, 4, 8, 16, 32))
+            try:
+                if first.stream_kwargs is not None:
+                    outputs = [self._generate_stream(first)]
+                elif len(batch) == 1 and first.segments and self.prefix_cache is not None:
+                    outputs = [self.prefix_cache.generate_text(first.segments, **self.generation_kwargs)]
+                    self.batches_run += 1
+                    self.prompts_run += 1
+                else:
+                    outputs = self._generate_batch([request.prompt for request in batch])
+                for request, text in zip(batch, outputs):
+                    request.future.set_result(text)
+            except Exception as e:
+                for request in batch:
+                    request.future.set_exception(e)
+                    if request.stream_kwargs is not None:
+                        request.stream_kwargs['streamer'].end()
+    
+    def _generate_stream(self, request: _Request) -> str:
+        import torch
+        
+        kwargs = dict(self.generation_kwargs, **request.stream_kwargs)
+        if request.segments and self.prefix_cache is not None:
+            new_ids = self.prefix_cache.generate(request.segments, **kwargs)
+        else:
+            inputs = self.tokenizer(request.prompt, return_tensors="pt")
+            with torch.no_grad():
+                output = self.model.generate(**inputs, **kwargs)
+            new_ids = output[0][inputs['input_ids'].shape[1]:]
+        
+        self.batches_run += 1
+        self.prompts_run += 1
+        return self.tokenizer.decode(new_ids, skip_special_tokens=True).strip()
+    
+    def _generate_batch(self, prompts: List[str]) -> List[str]:
+        import torch
+        
+        # Left-pad so every prompt ends where generation starts
+        encoded = [self.tokenizer(prompt)['input_ids'] for prompt in prompts]
+        width = max(len(ids) for ids in encoded)
+        input_ids = torch.full((len(encoded), width), self.pad_token_id, dtype=torch.long)
+        attention_mask = torch.zeros((len(encoded), width), dtype=torch.long)
+        for row, ids in enumerate(encoded):
+            input_ids[row, width - len(ids):] = torch.tensor(ids, dtype=torch.long)
+            attention_mask[row, width - len(ids):] = 1
+        
+        with torch.no_grad():
+            output = self.model.generate(
+                input_ids=input_ids,
+                attention_mask=attention_mask,
+                **self.generation_kwargs
+            )
+        
+        self.batches_run += 1
+        self.prompts_run += len(prompts)
+        return [
+            self.tokenizer.decode(sequence[width:], skip_special_tokens=True).strip()
+            for sequence in output
+        ]
+    
+    def stats(self) -> Dict[str, float]:
+        return {
+            'batches': self.batches_run,
+            'prompts': self.prompts_run,
+            'mean_batch_size': self.prompts_run / self.batches_run if self.batches_run else 0.0,
+            'queued': self._queue.qsize()
+        }
\ No newline at end of file
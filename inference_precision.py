@@ -0,0 +1,76 @@
+"""
+CPU inference precision modes for the generation model
+``fp32`` leaves the model untouched, ``bf16`` casts it to bfloat16 where the
+CPU supports it, and ``int8`` applies torch dynamic quantization to its
+linear layers (weights stored as int8, activations quantized on the fly).
+"""
+
+from typing import Optional
+
+PRECISIONS = ("fp32", "bf16", "int8")
+
+def configure_threads(num_threads: Optional[int]):
+    """Set torch intra-op parallelism; 0 or ``None`` keeps torch's default."""
+    if not num_threads:
+        return
+    import torch
+    
+    torch.set_num_threads(num_threads)
+
+def bf16_supported() -> bool:
+    """True when a bfloat16 matmul runs on this CPU."""
+    import torch
+    
+    try:
+        a = torch.ones((4, 4), dtype=torch.bfloat16)
+        return bool(torch.isfinite((a @ a).float()).all())
+    except RuntimeError:
+        return False
+
+def conv1d_to_linear(model):
+    """Replace transformers ``Conv1D`` layers (GPT-2 style) with equivalent ``nn.Linear`` layers.
+
+    ``quantize_dynamic`` only recognises ``nn.Linear``, but GPT-2-family
+    models (including DialoGPT) implement attention and MLP projections as
+    ``Conv1D``, whose weight is stored transposed.
+    """
+    import torch
+    from transformers.pytorch_utils import Conv1D
+    
+    for parent in list(model.modules()):
+        for name, child in list(parent.named_children()):
+            if isinstance(child, Conv1D):
+                in_features, out_features = child.weight.shape
+                linear = torch.nn.Linear(in_features, out_features)
+                linear.weight.data = child.weight.data.t().contiguous()
+                linear.bias.data = child.bias.data
+                setattr(parent, name, linear)
+    return model
+
+def convert_precision(model, precision: str):
+    """Return ``model`` prepared for CPU inference at ``precision`` (modifies it in place)."""
+    import torch
+    
+    if precision not in PRECISIONS:
+        raise ValueError(f"Unknown INFERENCE_PRECISION {precision!r}; use one of {', '.join(PRECISIONS)}")
+    
+    if precision == "bf16":
+        if not bf16_supported():
+            print("bfloat16 is not supported on this CPU; keeping fp32")
+            return model
+        return model.to(torch.bfloat16)
+    
+    if precision == "int8":
+        conv1d_to_linear(model)
+        return torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+    
+    return model
+
+def model_size_mb(model) -> float:
+    """Size of the model's serialized weights, counting packed int8 weights."""
+    import io
+    import torch
+    
+    buffer = io.BytesIO()
+    torch.save(model.state_dict(), buffer)
+    return buffer.tell() / (1024 * 1024)
\ No newline at end of file
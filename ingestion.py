@@ -0,0 +1,237 @@
+#!/usr/bin/env python3
+"""
+Bulk ingestion of external basketball documents
+Streams records from JSONL, CSV or HTML sources through the chunker into the
+vector database with constant memory, checkpointing progress so an
+interrupted load can be resumed.
+"""
+
+import argparse
+import glob
+import json
+import os
+import time
+from typing import Dict, Any, Iterator, Optional, Tuple
+from config import Config
+
+Record = Dict[str, Any]
+
+def _to_record(raw: Dict[str, Any], title_field: str, content_field: str, fallback_title: str) -> Optional[Record]:
+    """Map a raw row onto a knowledge item, keeping other scalar fields as metadata."""
+    content = raw.get(content_field)
+    if content is None or str(content).strip() == "" or str(content) == "nan":
+        return None
+    
+    title = raw.get(title_field)
+    record = {
+        key: value for key, value in raw.items()
+        if key not in (title_field, content_field) and isinstance(value, (str, int, float, bool))
+        and value == value  # drops NaN cells from pandas
+    }
+    record['title'] = str(title) if title not in (None, "") and str(title) != "nan" else fallback_title
+    record['content'] = str(content)
+    return record
+
+def iter_jsonl(path: str, start: int = 0, title_field: str = "title",
+               content_field: str = "content") -> Iterator[Tuple[int, Optional[Record]]]:
+    """Yield ``(position, record)`` for each line of a JSONL file, from ``start``."""
+    with open(path, encoding="utf-8") as f:
+        for position, line in enumerate(f):
+            if position < start:
+                continue
+            line = line.strip()
+            if not line:
+                yield position, None
+                continue
+            raw = json.loads(line)
+            yield position, _to_record(raw, title_field, content_field,
+                                       f"{os.path.basename(path)} #{position + 1}")
+
+def iter_csv(path: str, start: int = 0, title_field: str = "title", content_field: str = "content",
+             chunksize: int = 1000) -> Iterator[Tuple[int, Optional[Record]]]:
+    """Yield ``(position, record)`` for each CSV row, reading ``chunksize`` rows at a time."""
+    import pandas as pd
+    
+    position = start
+    reader = pd.read_csv(path, chunksize=chunksize, skiprows=range(1, start + 1))
+    for frame in reader:
+        for raw in frame.to_dict(orient="records"):
+            yield position, _to_record(raw, title_field, content_field,
+                                       f"{os.path.basename(path)} row {position + 1}")
+            position += 1
+
+def iter_html(path: str, start: int = 0, **_) -> Iterator[Tuple[int, Optional[Record]]]:
+    """Yield ``(position, record)`` for each HTML file under ``path`` (one document per file)."""
+    from bs4 import BeautifulSoup
+    
+    if os.path.isdir(path):
+        files = sorted(
+            glob.glob(os.path.join(path, "**", "*.html"), recursive=True)
+            + glob.glob(os.path.join(path, "**", "*.htm"), recursive=True)
+        )
+    else:
+        files = [path]
+    
+    for position, filename in enumerate(files):
+        if position < start:
+            continue
+        with open(filename, encoding="utf-8", errors="replace") as f:
+            soup = BeautifulSoup(f, "html.parser")
+        
+        for tag in soup(["script", "style", "nav", "header", "footer"]):
+            tag.decompose()
+        
+        heading = soup.find("h1")
+        if soup.title and soup.title.string:
+            title = soup.title.string.strip()
+        elif heading:
+            title = heading.get_text(strip=True)
+        else:
+            title = os.path.splitext(os.path.basename(filename))[0]
+        
+        body = soup.body or soup
+        content = " ".join(body.get_text(separator=" ").split())
+        yield position, _to_record({'title': title, 'content': content, 'path': filename},
+                                   'title', 'content', title)
+
+READERS = {
+    'jsonl': iter_jsonl,
+    'csv': iter_csv,
+    'html': iter_html,
+}
+
+class IngestionCheckpoint:
+    """Remembers how many records of each source have been fully ingested."""
+    
+    def __init__(self, path: str):
+        self.path = path
+        self.positions: Dict[str, int] = {}
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                self.positions = json.load(f)
+    
+    def get(self, source: str) -> int:
+        return self.positions.get(source, 0)
+    
+    def update(self, source: str, position: int):
+        """Record that every record before ``position`` is in the index."""
+        self.positions[source] = position
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.positions, f, indent=2)
+        os.replace(tmp_path, self.path)
+    
+    def reset(self, source: str):
+        self.update(source, 0)
+
+def ingest_file(path: str, file_format: str, vector_store, chunker, checkpoint: IngestionCheckpoint,
+                batch_size: int = 500, title_field: str = "title", content_field: str = "content",
+                checkpoint_every: int = 10) -> Dict[str, float]:
+    """Stream one source into the vector store, checkpointing as it goes.
+
+    Records are read lazily, chunked, embedded and upserted ``batch_size``
+    records at a time, so memory use does not depend on the size of the
+    source. Every ``checkpoint_every`` batches (and at the end) the index is
+    saved and then the checkpoint advanced, so if the process stops,
+    calling this again with the same checkpoint resumes after the last
+    saved batch. Records are tagged ``source: ingestion:<format>:<path>``,
+    which keeps knowledge-base syncs from deleting them.
+    """
+    source = f"{file_format}:{os.path.abspath(path)}"
+    record_source = f"ingestion:{source}"
+    start = checkpoint.get(source)
+    if start:
+        print(f"Resuming {path} from record {start}")
+    
+    reader = READERS[file_format](path, start=start, title_field=title_field, content_field=content_field)
+    start_time = time.perf_counter()
+    records_done = 0
+    chunks_done = 0
+    batch = []
+    batches_since_checkpoint = 0
+    last_position = start - 1
+    
+    def save_progress():
+        nonlocal batches_since_checkpoint
+        vector_store.persist()
+        checkpoint.update(source, last_position + 1)
+        batches_since_checkpoint = 0
+    
+    def flush():
+        nonlocal records_done, chunks_done, batch, batches_since_checkpoint
+        records = [dict(record, source=record_source) for record in batch if record is not None]
+        if records:
+            chunks_done += vector_store.add_basketball_knowledge(chunker.chunk_items(records),
+                                                                 persist=False)['items']
+        records_done += len(batch)
+        batch = []
+        batches_since_checkpoint += 1
+        if batches_since_checkpoint >= checkpoint_every:
+            save_progress()
+        
+        elapsed = time.perf_counter() - start_time
+        rate = records_done / elapsed if elapsed > 0 else 0.0
+        print(f"[{os.path.basename(path)}] {start + records_done} records, {chunks_done} chunks "
+              f"({rate:.1f} records/sec)")
+    
+    for position, record in reader:
+        batch.append(record)
+        last_position = position
+        if len(batch) >= batch_size:
+            flush()
+    if batch:
+        flush()
+    if batches_since_checkpoint:
+        save_progress()
+    
+    elapsed = time.perf_counter() - start_time
+    return {
+        'records': records_done,
+        'chunks': chunks_done,
+        'seconds': elapsed,
+        'records_per_second': records_done / elapsed if elapsed > 0 else 0.0
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Stream basketball documents into the vector database")
+    parser.add_argument("paths", nargs="+", help="JSONL/CSV files, HTML files or directories of HTML files")
+    parser.add_argument("--format", choices=sorted(READERS), help="Input format (default: from file extension)")
+    parser.add_argument("--checkpoint", default=Config.INGESTION_CHECKPOINT_PATH, help="Checkpoint file")
+    parser.add_argument("--batch-size", type=int, default=Config.INGESTION_BATCH_SIZE,
+                        help="Records per embed/upsert cycle")
+    parser.add_argument("--title-field", default="title", help="Field holding the document title")
+    parser.add_argument("--content-field", default="content", help="Field holding the document text")
+    parser.add_argument("--restart", action="store_true", help="Ignore saved progress and start over")
+    args = parser.parse_args()
+    
+    from vector_store import VectorStore
+    from chunking import TextChunker
+    
+    print("🏀 Basketball Document Ingestion")
+    print("=" * 50)
+    
+    vector_store = VectorStore()
+    chunker = TextChunker()
+    checkpoint = IngestionCheckpoint(args.checkpoint)
+    
+    for path in args.paths:
+        file_format = args.format
+        if file_format is None:
+            extension = os.path.splitext(path)[1].lower().lstrip(".")
+            file_format = "html" if os.path.isdir(path) or extension in ("html", "htm") else extension
+        if file_format not in READERS:
+            print(f"❌ Unsupported format for {path}; use --format")
+            continue
+        
+        if args.restart:
+            checkpoint.reset(f"{file_format}:{os.path.abspath(path)}")
+        
+        stats = ingest_file(path, file_format, vector_store, chunker, checkpoint,
+                            batch_size=args.batch_size, title_field=args.title_field,
+                            content_field=args.content_field,
+                            checkpoint_every=Config.INGESTION_CHECKPOINT_EVERY)
+        print(f"✅ {path}: {stats['records']} records -> {stats['chunks']} chunks "
+              f"in {stats['seconds']:.1f}s ({stats['records_per_second']:.1f} records/sec)")
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
@@ -0,0 +1,118 @@
+import math
+import re
+import threading
+from collections import Counter, defaultdict
+from typing import List, Dict, Any, Optional
+from vector_backends import matches_filter
+
+TOKEN_PATTERN = re.compile(r"\w+")
+STOPWORDS = frozenset("""
+a an and are as at be by can do does for from how in is it of on or the to what when where which who
+why with you your i me my we our they their this that these those there about into than then will
+""".split())
+
+def tokenize(text: str) -> List[str]:
+    """Lower-cased word terms plus bigrams of adjacent non-stopword terms.
+
+    Bigrams let multi-word basketball terms ("pick and roll" -> ``"pick roll"``)
+    outscore documents that only mention the words separately.
+    """
+    words = [word for word in TOKEN_PATTERN.findall(text.lower()) if word not in STOPWORDS]
+    return words + [f"{first} {second}" for first, second in zip(words, words[1:])]
+
+class BM25Index:
+    """In-memory BM25 inverted index over the same items as the vector index.
+
+    Postings map each term to the documents containing it with their term
+    frequency, so a query only touches documents sharing a term with it.
+    Documents are added and removed incrementally by vector ID, and results
+    use the same ``{'id', 'score', 'metadata'}`` shape as the vector backends.
+    """
+    
+    def __init__(self, k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self._lock = threading.RLock()
+        self.clear()
+    
+    def clear(self):
+        with self._lock:
+            self._postings: Dict[str, Dict[str, int]] = defaultdict(dict)
+            self._doc_terms: Dict[str, Counter] = {}
+            self._doc_lengths: Dict[str, int] = {}
+            self._metadata: Dict[str, Dict[str, Any]] = {}
+            self._total_length = 0
+    
+    def __len__(self) -> int:
+        return len(self._doc_lengths)
+    
+    def add(self, doc_id: str, text: str, metadata: Optional[Dict[str, Any]] = None):
+        """Index ``text`` under ``doc_id``, replacing any previous version."""
+        terms = Counter(tokenize(text))
+        with self._lock:
+            if doc_id in self._doc_lengths:
+                self.remove([doc_id])
+            for term, frequency in terms.items():
+                self._postings[term][doc_id] = frequency
+            self._doc_terms[doc_id] = terms
+            self._doc_lengths[doc_id] = sum(terms.values())
+            self._metadata[doc_id] = metadata or {}
+            self._total_length += self._doc_lengths[doc_id]
+    
+    def remove(self, doc_ids: List[str]):
+        with self._lock:
+            for doc_id in doc_ids:
+                terms = self._doc_terms.pop(doc_id, None)
+                if terms is None:
+                    continue
+                for term in terms:
+                    postings = self._postings[term]
+                    postings.pop(doc_id, None)
+                    if not postings:
+                        del self._postings[term]
+                self._total_length -= self._doc_lengths.pop(doc_id)
+                del self._metadata[doc_id]
+    
+    def remove_by_filter(self, metadata_filter: Dict[str, Any]):
+        with self._lock:
+            self.remove([doc_id for doc_id, metadata in self._metadata.items()
+                         if matches_filter(metadata, metadata_filter)])
+    
+    def search(self, query: str, top_k: int) -> List[Dict[str, Any]]:
+        """Return the ``top_k`` documents by BM25 score (documents scoring 0 are omitted).
+
+        Each result also carries ``coverage``: the fraction of the query's
+        word terms that occur in the document.
+        """
+        terms = Counter(tokenize(query))
+        words = {term for term in terms if ' ' not in term}
+        
+        with self._lock:
+            size = len(self._doc_lengths)
+            if size == 0 or not terms or top_k <= 0:
+                return []
+            average_length = self._total_length / size
+            
+            scores: Dict[str, float] = defaultdict(float)
+            matched_words: Dict[str, int] = defaultdict(int)
+            for term, query_frequency in terms.items():
+                postings = self._postings.get(term)
+                if not postings:
+                    continue
+                idf = math.log(1 + (size - len(postings) + 0.5) / (len(postings) + 0.5))
+                for doc_id, frequency in postings.items():
+                    norm = self.k1 * (1 - self.b + self.b * self._doc_lengths[doc_id] / average_length)
+                    scores[doc_id] += query_frequency * idf * frequency * (self.k1 + 1) / (frequency + norm)
+                    if term in words:
+                        matched_words[doc_id] += 1
+            
+            ranked = sorted(scores.items(), key=lambda pair: pair[1], reverse=True)[:top_k]
+            return [
+                {
+                    'id': doc_id,
+                    'score': score,
+                    'coverage': matched_words[doc_id] / len(words) if words else 0.0,
+                    'metadata': self._metadata[doc_id]
+                }
+                for doc_id, score in ranked
+            ]
\ No newline at end of file
@@ -0,0 +1,282 @@
+#!/usr/bin/env python3
+"""
+Load generator for the Basketball Analysis Chatbot
+Replays questions against an in-process BasketballChatbot or a running
+server.py instance and reports throughput, tail latency and error rate per
+load level, plus the level at which the system saturates.
+
+Closed loop (--concurrency): N simulated users, each asking its next question
+as soon as the previous answer arrives. Open loop (--rate): questions arrive
+as a Poisson process at a fixed rate no matter how fast they are answered, and
+latency is measured from the scheduled arrival so queueing delay is included.
+"""
+
+import argparse
+import http.client
+import json
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Any, Optional
+from urllib.parse import urlsplit
+import numpy as np
+from config import Config
+
+def load_questions(path: Optional[str]) -> List[str]:
+    """Questions from a JSONL file (``{"question": ...}`` objects or strings), else the app's canonical ones."""
+    if not path:
+        return list(Config.CANONICAL_QUESTIONS)
+    
+    questions = []
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            record = json.loads(line)
+            question = record.get('question') if isinstance(record, dict) else record
+            if isinstance(question, str) and question.strip():
+                questions.append(question.strip())
+    if not questions:
+        raise ValueError(f"No questions found in {path}")
+    return questions
+
+class LocalTarget:
+    """Calls ``generate_response`` on one shared in-process chatbot.
+    
+    Only the throwaway ``offline`` index is synced; otherwise the configured
+    index is queried as it is and never written to.
+    """
+    
+    def __init__(self, questions: List[str], offline: bool = False, caches: bool = True):
+        if not caches:
+            Config.RESPONSE_CACHE_ENABLED = False
+            Config.PRECOMPUTE_ANSWERS = False
+        if offline:
+            from local_models import use_offline_models
+            from basketball_knowledge import BasketballKnowledgeBase
+            knowledge = BasketballKnowledgeBase().get_all_basketball_knowledge()
+            use_offline_models([f"{item['title']} {item['content']}" for item in knowledge] + questions)
+        
+        from basketball_chatbot import BasketballChatbot
+        self.chatbot = BasketballChatbot()
+        if offline and self.chatbot.setup_knowledge_base() is None:
+            raise RuntimeError("Could not set up the offline knowledge base")
+    
+    def __call__(self, question: str) -> bool:
+        # The chatbot reports failures as its fallback answer rather than raising
+        return self.chatbot.generate_response(question) != self.chatbot.FALLBACK_RESPONSE
+
+class HTTPTarget:
+    """POSTs to ``/ask`` over one keep-alive connection per thread."""
+    
+    def __init__(self, url: str, timeout: float = 120):
+        parts = urlsplit(url)
+        self.host = parts.hostname or "localhost"
+        self.port = parts.port or 80
+        self.timeout = timeout
+        self._local = threading.local()
+    
+    def _connection(self) -> http.client.HTTPConnection:
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+            self._local.connection = connection
+        return connection
+    
+    def __call__(self, question: str) -> bool:
+        body = json.dumps({'question': question})
+        try:
+            connection = self._connection()
+            connection.request("POST", "/ask", body, {'Content-Type': "application/json"})
+            response = connection.getresponse()
+            response.read()
+            return response.status == 200
+        except (OSError, http.client.HTTPException):
+            self._local.connection = None
+            return False
+
+def run_closed_loop(target, questions: List[str], users: int, duration: float, seed: int = 0) -> Dict[str, Any]:
+    """``users`` threads each ask questions back to back for ``duration`` seconds."""
+    records = []
+    lock = threading.Lock()
+    deadline = time.perf_counter() + duration
+    
+    def user(index: int):
+        rng = random.Random(seed + index)
+        position = rng.randrange(len(questions))
+        while time.perf_counter() < deadline:
+            question = questions[position % len(questions)]
+            position += 1
+            start = time.perf_counter()
+            try:
+                ok = target(question)
+            except Exception:
+                ok = False
+            with lock:
+                records.append((time.perf_counter() - start, ok))
+    
+    start = time.perf_counter()
+    threads = [threading.Thread(target=user, args=(i,), daemon=True) for i in range(users)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return summarize(records, time.perf_counter() - start, offered=len(records), dropped=0)
+
+def run_open_loop(target, questions: List[str], rate: float, duration: float,
+                  max_in_flight: int = 1000, seed: int = 0) -> Dict[str, Any]:
+    """Poisson arrivals at ``rate`` per second for ``duration`` seconds.
+
+    Arrivals beyond ``max_in_flight`` outstanding requests are dropped and
+    counted as errors.
+    """
+    rng = random.Random(seed)
+    records = []
+    lock = threading.Lock()
+    in_flight = threading.Semaphore(max_in_flight)
+    
+    def call(question: str, scheduled: float):
+        try:
+            ok = target(question)
+        except Exception:
+            ok = False
+        finally:
+            in_flight.release()
+        with lock:
+            records.append((time.perf_counter() - scheduled, ok))
+    
+    offered = dropped = 0
+    start = time.perf_counter()
+    next_arrival = start
+    with ThreadPoolExecutor(max_workers=max_in_flight, thread_name_prefix="load") as executor:
+        while True:
+            next_arrival += rng.expovariate(rate)
+            if next_arrival - start >= duration:
+                break
+            delay = next_arrival - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            
+            offered += 1
+            if not in_flight.acquire(blocking=False):
+                dropped += 1
+                continue
+            executor.submit(call, rng.choice(questions), next_arrival)
+        arrival_seconds = time.perf_counter() - start
+    
+    # Throughput is measured until the backlog drains, so it falls behind the arrival rate once saturated
+    report = summarize(records, time.perf_counter() - start, offered=offered, dropped=dropped)
+    report['arrival_rate'] = offered / arrival_seconds if arrival_seconds else 0.0
+    return report
+
+def summarize(records, elapsed: float, offered: int, dropped: int) -> Dict[str, Any]:
+    latencies = np.asarray([latency for latency, _ in records]) * 1000
+    errors = sum(1 for _, ok in records if not ok) + dropped
+    completed = len(records)
+    report = {
+        'offered': offered,
+        'completed': completed,
+        'dropped': dropped,
+        'seconds': elapsed,
+        'throughput': (completed - (errors - dropped)) / elapsed if elapsed else 0.0,
+        'error_rate': errors / offered if offered else 0.0,
+    }
+    for name, q in (('p50_ms', 50), ('p95_ms', 95), ('p99_ms', 99), ('max_ms', 100)):
+        report[name] = float(np.percentile(latencies, q)) if completed else 0.0
+    return report
+
+def find_saturation(levels: List[Dict[str, Any]], open_loop: bool) -> Optional[Dict[str, Any]]:
+    """The first load level at which the system stops keeping up.
+
+    That is the first level where more than 1% of requests fail, or median
+    latency is over three times that of the lightest level (requests are
+    queueing), or throughput stops following the load. For open loop, that
+    means it falls below 90% of the arrival rate. For closed loop, it means
+    it grows by less than 10% over the previous level.
+    """
+    previous = None
+    for level in levels:
+        if level['error_rate'] > 0.01:
+            return level
+        if levels[0]['p50_ms'] and level['p50_ms'] > 3 * levels[0]['p50_ms']:
+            return level
+        if open_loop and level['throughput'] < 0.9 * level['arrival_rate']:
+            return level
+        if not open_loop and previous is not None and level['throughput'] < 1.1 * previous['throughput']:
+            return level
+        previous = level
+    return None
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay questions against the chatbot under load")
+    parser.add_argument("--questions", help="JSONL file of questions (default: the app's quick-action and "
+                                            "example questions)")
+    parser.add_argument("--url", help="Load a running server.py (e.g. http://localhost:8000) instead of "
+                                      "an in-process chatbot")
+    parser.add_argument("--offline", action="store_true",
+                        help="In-process only: use the local stand-in models and index (no network)")
+    parser.add_argument("--no-caches", dest="caches", action="store_false",
+                        help="In-process only: turn off the response cache and precomputed answers, "
+                             "so every question is retrieved and generated")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 5, 10, 50],
+                        help="Closed-loop user counts to step through")
+    parser.add_argument("--rate", type=float, nargs="+",
+                        help="Open-loop arrival rates (requests/sec) to step through instead")
+    parser.add_argument("--duration", type=float, default=30, help="Seconds per load level")
+    parser.add_argument("--max-in-flight", type=int, default=1000,
+                        help="Open loop: outstanding requests before arrivals are dropped")
+    parser.add_argument("--seed", type=int, default=0, help="Seed for question order and arrivals")
+    parser.add_argument("--json", dest="json_path", help="Also write the report to this JSON file")
+    args = parser.parse_args()
+    
+    print("🏀 Chatbot Load Test")
+    print("=" * 50)
+    questions = load_questions(args.questions)
+    target = HTTPTarget(args.url) if args.url else LocalTarget(questions, offline=args.offline,
+                                                                       caches=args.caches)
+    open_loop = bool(args.rate)
+    
+    levels = []
+    for load in (args.rate if open_loop else args.concurrency):
+        print(f"Running {load} {'req/s' if open_loop else 'users'} for {args.duration:.0f}s...")
+        if open_loop:
+            result = run_open_loop(target, questions, load, args.duration, args.max_in_flight, args.seed)
+            result['rate'] = load
+        else:
+            result = run_closed_loop(target, questions, load, args.duration, args.seed)
+            result['users'] = load
+        levels.append(result)
+    
+    print()
+    label = 'req/s' if open_loop else 'users'
+    print(f"{label:>7} {'done':>7} {'ok/s':>8} {'errors':>7} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'max ms':>9}")
+    for row in levels:
+        load = row['rate'] if open_loop else row['users']
+        print(f"{load:>7g} {row['completed']:>7} {row['throughput']:>8.2f} {row['error_rate']:>6.1%} "
+              f"{row['p50_ms']:>9.1f} {row['p95_ms']:>9.1f} {row['p99_ms']:>9.1f} {row['max_ms']:>9.1f}")
+    
+    saturation = find_saturation(levels, open_loop)
+    print()
+    if saturation is None:
+        print("No saturation within the tested levels")
+    else:
+        load = saturation['rate'] if open_loop else saturation['users']
+        print(f"Saturates at {load:g} {label} (~{saturation['throughput']:.2f} answers/sec)")
+    
+    if args.json_path:
+        report = {
+            'target': args.url or ("offline" if args.offline else "local"),
+            'mode': "open" if open_loop else "closed",
+            'duration': args.duration,
+            'questions': len(questions),
+            'levels': levels,
+            'saturation': saturation
+        }
+        with open(args.json_path, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        print(f"\nReport saved to {args.json_path}")
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
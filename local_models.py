@@ -0,0 +1,105 @@
+"""
+Offline stand-ins for the embedding and generation models
+``HashingEncoder`` replaces the sentence-transformers encoder and
+``build_tiny_generation_model`` builds a small, randomly initialised GPT-2
+with a word-level tokenizer. Neither downloads anything. Their answers are
+meaningless, but they exercise every stage of the pipeline with real tensors,
+so benchmarks and load tests can run without network access.
+"""
+
+import re
+import zlib
+from typing import Iterable, List
+import numpy as np
+from config import Config
+import model_registry
+
+EMBEDDING_MODEL_NAME = "local/hashing-encoder"
+GENERATION_MODEL_NAME = "local/tiny-gpt2"
+
+WORD_PATTERN = re.compile(r"\w+|[^\w\s]+")
+
+class HashingEncoder:
+    """Signed feature-hashing bag of words with the SentenceTransformer ``encode`` interface."""
+    
+    def __init__(self, dimension: int = 384):
+        self.dimension = dimension
+    
+    def encode(self, texts: List[str], batch_size: int = 32, **kwargs) -> np.ndarray:
+        vectors = np.zeros((len(texts), self.dimension), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for word in WORD_PATTERN.findall(text.lower()):
+                digest = zlib.crc32(word.encode('utf-8'))
+                vectors[row, digest % self.dimension] += 1.0 if digest & 0x80000000 else -1.0
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return vectors / norms
+
+class _PipelineLLM:
+    """Callable returning only the continuation, like LangChain's HuggingFacePipeline."""
+    
+    def __init__(self, pipe):
+        self.pipe = pipe
+    
+    def __call__(self, prompt: str) -> str:
+        return self.pipe(prompt, return_full_text=False)[0]['generated_text']
+
+def build_tiny_generation_model(texts: Iterable[str], n_layer: int = 2, n_embd: int = 64,
+                                seed: int = 0) -> model_registry.GenerationModel:
+    """Build a random GPT-2 whose word-level vocabulary covers ``texts``."""
+    import torch
+    from tokenizers import Tokenizer, models, pre_tokenizers
+    from transformers import PreTrainedTokenizerFast, GPT2Config, GPT2LMHeadModel, pipeline
+    
+    vocab = {'<unk>': 0, '<eos>': 1}
+    for text in texts:
+        for word in WORD_PATTERN.findall(text):
+            vocab.setdefault(word, len(vocab))
+    
+    backend = Tokenizer(models.WordLevel(vocab, unk_token='<unk>'))
+    backend.pre_tokenizer = pre_tokenizers.Whitespace()
+    tokenizer = PreTrainedTokenizerFast(tokenizer_object=backend, eos_token='<eos>', unk_token='<unk>')
+    # GPT-2 has no token types; passing them would shift its embeddings
+    tokenizer.model_input_names = ['input_ids', 'attention_mask']
+    
+    torch.manual_seed(seed)
+    model = GPT2LMHeadModel(GPT2Config(
+        vocab_size=len(vocab),
+        n_positions=Config.CONTEXT_WINDOW,
+        n_embd=n_embd,
+        n_layer=n_layer,
+        n_head=2,
+        bos_token_id=1,
+        eos_token_id=1
+    ))
+    model.eval()
+    
+    pipe = pipeline(
+        "text-generation",
+        model=model,
+        tokenizer=tokenizer,
+        max_new_tokens=Config.MAX_NEW_TOKENS,
+        temperature=0.7
+    )
+    return model_registry.GenerationModel(GENERATION_MODEL_NAME, tokenizer, model, pipe, _PipelineLLM(pipe))
+
+def use_offline_models(texts: Iterable[str]):
+    """Register the stand-in models and point ``Config`` at them and an in-memory local index.
+
+    ``texts`` (the corpus and any questions) define the generation model's
+    vocabulary; words outside it are read as ``<unk>``. Call this before
+    creating a VectorStore or BasketballChatbot.
+    """
+    texts = list(texts)
+    texts.append("You are a basketball expert. Use this context to answer: Question: Answer:")
+    
+    model_registry.register_embedding_model(EMBEDDING_MODEL_NAME, HashingEncoder(Config.VECTOR_DIMENSION))
+    model_registry.register_generation_model(GENERATION_MODEL_NAME, build_tiny_generation_model(texts))
+    
+    Config.EMBEDDING_MODEL = EMBEDDING_MODEL_NAME
+    Config.GENERATION_MODEL = GENERATION_MODEL_NAME
+    Config.VECTOR_BACKEND = "local"
+    Config.LOCAL_INDEX_PATH = ""  # keep the index in memory
+    Config.EMBEDDING_CACHE_DIR = ""
+    Config.PRECOMPUTED_ANSWERS_PATH = ""  # don't overwrite the real model's answers
+    Config.RERANK_ENABLED = False  # the cross-encoder would need a download
\ No newline at end of file
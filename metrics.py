@@ -0,0 +1,216 @@
+"""
+Process-wide latency and counter metrics for the RAG pipeline
+Stages are timed with ``stage()`` (or the ``timed()`` decorator). Each timing
+goes into a fixed-bucket histogram, which costs one bisect and a few additions
+per observation. When a request trace is active, the timing is also added to
+that trace's per-stage breakdown. Everything can be exported as Prometheus
+text or as JSON.
+"""
+
+import functools
+import os
+import threading
+import time
+from bisect import bisect_left
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Any, List, Optional, Tuple
+from config import Config
+
+PREFIX = "chatbot"
+SECONDS_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+                   1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+TOKEN_BUCKETS = (8, 16, 32, 64, 128, 256, 512, 1024, 2048)
+
+Labels = Tuple[Tuple[str, str], ...]
+
+class Histogram:
+    """Cumulative-bucket histogram with Prometheus ``le`` semantics."""
+    
+    def __init__(self, buckets=SECONDS_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)  # last slot is +Inf
+        self.count = 0
+        self.sum = 0.0
+    
+    def observe(self, value: float):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+    
+    def quantile(self, q: float) -> float:
+        """Estimate the ``q`` quantile by linear interpolation inside its bucket."""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for i, count in enumerate(self.counts):
+            if count and seen + count >= rank:
+                lower = self.buckets[i - 1] if i > 0 else 0.0
+                upper = self.buckets[i] if i < len(self.buckets) else self.buckets[-1]
+                return lower + (upper - lower) * (rank - seen) / count
+            seen += count
+        return self.buckets[-1]
+    
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            'count': self.count,
+            'sum': self.sum,
+            'mean': self.sum / self.count if self.count else 0.0,
+            'p50': self.quantile(0.50),
+            'p95': self.quantile(0.95),
+            'p99': self.quantile(0.99)
+        }
+
+_lock = threading.Lock()
+_histograms: Dict[Tuple[str, Labels], Histogram] = {}
+_counters: Dict[Tuple[str, Labels], float] = {}
+_traces: deque = deque(maxlen=Config.METRICS_TRACE_HISTORY)
+_current_trace: ContextVar[Optional[Dict[str, Any]]] = ContextVar("current_trace", default=None)
+
+def _labels(labels: Dict[str, Any]) -> Labels:
+    return tuple(sorted((name, str(value)) for name, value in labels.items()))
+
+def observe(name: str, value: float, buckets=SECONDS_BUCKETS, **labels):
+    """Add ``value`` to histogram ``name`` (created with ``buckets`` on first use)."""
+    if not Config.METRICS_ENABLED:
+        return
+    key = (name, _labels(labels))
+    with _lock:
+        histogram = _histograms.get(key)
+        if histogram is None:
+            histogram = _histograms[key] = Histogram(buckets)
+        histogram.observe(value)
+
+def increment(name: str, value: float = 1, **labels):
+    """Add ``value`` to counter ``name``."""
+    if not Config.METRICS_ENABLED:
+        return
+    key = (name, _labels(labels))
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + value
+
+def record_error(stage_name: str):
+    increment("errors_total", stage=stage_name)
+
+def record_cache(cache: str, hits: int, misses: int = 0):
+    if hits:
+        increment("cache_requests_total", hits, cache=cache, result="hit")
+    if misses:
+        increment("cache_requests_total", misses, cache=cache, result="miss")
+
+@contextmanager
+def stage(name: str, root: bool = False):
+    """Time the enclosed block as pipeline stage ``name``.
+
+    With ``root=True`` and no trace already active, the block starts a
+    request trace: stages timed inside it on the same thread are collected
+    into one breakdown, kept in the recent-trace history and printed when the
+    request takes longer than ``Config.METRICS_SLOW_REQUEST_SECONDS``.
+    Exceptions raised out of the block are counted in ``errors_total``.
+    """
+    if not Config.METRICS_ENABLED:
+        yield
+        return
+    
+    trace = _current_trace.get()
+    token = None
+    if root and trace is None:
+        trace = {'name': name, 'started_at': time.time(), 'stages': []}
+        token = _current_trace.set(trace)
+    
+    start_time = time.perf_counter()
+    failed = False
+    try:
+        yield
+    except Exception:
+        failed = True
+        record_error(name)
+        raise
+    finally:
+        elapsed = time.perf_counter() - start_time
+        observe("stage_seconds", elapsed, stage=name)
+        if token is not None:
+            _current_trace.reset(token)
+            _finish_trace(trace, elapsed, failed)
+        elif trace is not None:
+            trace['stages'].append((name, elapsed))
+
+def timed(name: str, root: bool = False):
+    """Decorator form of ``stage()``."""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with stage(name, root=root):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+def _finish_trace(trace: Dict[str, Any], elapsed: float, failed: bool):
+    trace['seconds'] = elapsed
+    trace['error'] = failed
+    with _lock:
+        _traces.append(trace)
+    
+    slow_after = Config.METRICS_SLOW_REQUEST_SECONDS
+    if slow_after and elapsed >= slow_after:
+        breakdown = ", ".join(f"{name} {seconds:.3f}s" for name, seconds in trace['stages'])
+        print(f"Slow {trace['name']} ({elapsed:.2f}s): {breakdown}")
+
+def snapshot() -> Dict[str, Any]:
+    """All metrics as a JSON-serialisable dict."""
+    def label_text(labels: Labels) -> str:
+        return ",".join(f"{name}={value}" for name, value in labels)
+    
+    with _lock:
+        histograms = {}
+        for (name, labels), histogram in sorted(_histograms.items()):
+            histograms.setdefault(name, {})[label_text(labels)] = histogram.snapshot()
+        counters = {}
+        for (name, labels), value in sorted(_counters.items()):
+            counters.setdefault(name, {})[label_text(labels)] = value
+        traces = [
+            dict(trace, stages=[{'stage': name, 'seconds': seconds} for name, seconds in trace['stages']])
+            for trace in _traces
+        ]
+    return {'pid': os.getpid(), 'histograms': histograms, 'counters': counters, 'recent_traces': traces}
+
+def to_prometheus() -> str:
+    """All metrics in the Prometheus text exposition format."""
+    def label_text(labels: Labels, extra: List[Tuple[str, str]] = ()) -> str:
+        pairs = list(labels) + list(extra)
+        if not pairs:
+            return ""
+        return "{" + ",".join(f'{name}="{value}"' for name, value in pairs) + "}"
+    
+    lines = []
+    with _lock:
+        typed = set()
+        for (name, labels), value in sorted(_counters.items()):
+            metric = f"{PREFIX}_{name}"
+            if metric not in typed:
+                lines.append(f"# TYPE {metric} counter")
+                typed.add(metric)
+            lines.append(f"{metric}{label_text(labels)} {value:g}")
+        
+        for (name, labels), histogram in sorted(_histograms.items()):
+            metric = f"{PREFIX}_{name}"
+            if metric not in typed:
+                lines.append(f"# TYPE {metric} histogram")
+                typed.add(metric)
+            cumulative = 0
+            for bound, count in zip(histogram.buckets, histogram.counts):
+                cumulative += count
+                lines.append(f"{metric}_bucket{label_text(labels, [('le', f'{bound:g}')])} {cumulative}")
+            lines.append(f"{metric}_bucket{label_text(labels, [('le', '+Inf')])} {histogram.count}")
+            lines.append(f"{metric}_sum{label_text(labels)} {histogram.sum:.6f}")
+            lines.append(f"{metric}_count{label_text(labels)} {histogram.count}")
+    return "\n".join(lines) + "\n"
+
+def reset():
+    """Forget every recorded metric (mainly for tests and benchmarks)."""
+    with _lock:
+        _histograms.clear()
+        _counters.clear()
+        _traces.clear()
\ No newline at end of file
@@ -0,0 +1,187 @@
+"""
+Process-wide registry of loaded models
+Each embedding or generation model is loaded at most once per process and
+shared by every VectorStore and BasketballChatbot, including across Streamlit
+sessions and reruns (Streamlit keeps imported modules alive between them).
+"""
+
+import threading
+import time
+from collections import defaultdict
+from typing import Any, Dict
+
+_models: Dict[str, Any] = {}
+_warmed_up = set()
+_registry_lock = threading.Lock()
+_load_locks: Dict[str, threading.Lock] = defaultdict(threading.Lock)
+
+class GenerationModel:
+    """A causal language model with its tokenizer, pipeline and LangChain wrapper."""
+    
+    def __init__(self, name: str, tokenizer, model, pipe=None, llm=None):
+        self.name = name
+        self.tokenizer = tokenizer
+        self.model = model
+        self.pipe = pipe
+        self.llm = llm
+
+def _get_or_load(key: str, loader):
+    model = _models.get(key)
+    if model is not None:
+        return model
+    
+    with _registry_lock:
+        load_lock = _load_locks[key]
+    
+    # Per-model lock: concurrent callers wait for one load instead of racing
+    with load_lock:
+        model = _models.get(key)
+        if model is None:
+            start_time = time.perf_counter()
+            model = loader()
+            _models[key] = model
+            print(f"Loaded {key} in {time.perf_counter() - start_time:.1f}s")
+        return model
+
+def get_embedding_model(name: str):
+    """Return the shared SentenceTransformer for ``name``, loading it on first use."""
+    def load():
+        from sentence_transformers import SentenceTransformer
+        return SentenceTransformer(name)
+    
+    return _get_or_load(f"embedding:{name}", load)
+
+def _generation_key(name: str, precision: str = "fp32") -> str:
+    return f"generation:{name}" if precision == "fp32" else f"generation:{name}@{precision}"
+
+def get_cross_encoder(name: str):
+    """Return the shared sentence-transformers CrossEncoder for ``name``."""
+    def load():
+        from sentence_transformers import CrossEncoder
+        return CrossEncoder(name)
+    
+    return _get_or_load(f"cross-encoder:{name}", load)
+
+def _load_pretrained(name: str):
+    from transformers import AutoTokenizer, AutoModelForCausalLM
+    
+    tokenizer = AutoTokenizer.from_pretrained(name)
+    model = AutoModelForCausalLM.from_pretrained(name)
+    model.eval()
+    return tokenizer, model
+
+def _build_generation_model(name: str, tokenizer, model) -> GenerationModel:
+    from transformers import pipeline
+    from langchain.llms import HuggingFacePipeline
+    from config import Config
+    
+    pipe = pipeline(
+        "text-generation",
+        model=model,
+        tokenizer=tokenizer,
+        max_new_tokens=Config.MAX_NEW_TOKENS,
+        temperature=0.7
+    )
+    return GenerationModel(name, tokenizer, model, pipe, HuggingFacePipeline(pipeline=pipe))
+
+def get_generation_model(name: str, precision: str = "fp32") -> GenerationModel:
+    """Return the shared tokenizer/model/pipeline bundle for ``name`` at ``precision``.
+    
+    Each precision is its own registry entry. Reduced-precision models are
+    converted from a fresh fp32 load (see ``inference_precision.py``), or
+    from a copy of the fp32 model if that is already loaded, so the fp32
+    weights are not kept alive unless something else uses them.
+    """
+    def load():
+        return _build_generation_model(name, *_load_pretrained(name))
+    
+    def load_converted():
+        from inference_precision import convert_precision
+        
+        base = _models.get(_generation_key(name))
+        if base is not None:
+            import copy
+            tokenizer, model = base.tokenizer, copy.deepcopy(base.model)
+        else:
+            tokenizer, model = _load_pretrained(name)
+        model = convert_precision(model, precision)
+        model.eval()
+        return _build_generation_model(name, tokenizer, model)
+    
+    return _get_or_load(_generation_key(name, precision), load if precision == "fp32" else load_converted)
+
+def get_prefix_cache(name: str, precision: str = "fp32", max_mb: float = 512, min_tokens: int = 4):
+    """Return the shared prompt-prefix KV cache for generation model ``name``."""
+    def load():
+        from prefix_cache import PrefixKVCache
+        generator = get_generation_model(name, precision)
+        return PrefixKVCache(generator.model, generator.tokenizer, max_mb=max_mb, min_tokens=min_tokens)
+    
+    return _get_or_load(f"prefix-cache:{_generation_key(name, precision)}", load)
+
+def get_generation_scheduler(name: str, generation_kwargs: Dict[str, Any], max_batch_size: int = 8,
+                             max_wait_ms: float = 10, precision: str = "fp32", prefix_cache=None):
+    """Return the shared batching scheduler for generation model ``name``.
+    
+    Every chatbot in the process submits to the same scheduler, so prompts
+    from concurrent sessions can be batched together.
+    """
+    def load():
+        from generation_scheduler import GenerationScheduler
+        generator = get_generation_model(name, precision)
+        return GenerationScheduler(generator.tokenizer, generator.model, generation_kwargs,
+                                   max_batch_size=max_batch_size, max_wait_ms=max_wait_ms,
+                                   prefix_cache=prefix_cache)
+    
+    return _get_or_load(f"scheduler:{_generation_key(name, precision)}", load)
+
+def register_embedding_model(name: str, model):
+    """Use an already constructed encoder for ``name`` (e.g. a local stand-in)."""
+    _models[f"embedding:{name}"] = model
+
+def register_generation_model(name: str, generation_model: GenerationModel):
+    """Use an already constructed generation bundle for ``name``."""
+    _models[f"generation:{name}"] = generation_model
+
+def warm_up(embedding_model_name: str = None, generation_model_name: str = None, precision: str = None):
+    """Load the configured models and run one dummy forward pass through each.
+
+    The first real request otherwise pays for lazy initialisation inside
+    torch (allocator, kernels, thread pools). Each model is warmed once.
+    """
+    from config import Config
+    
+    embedding_model_name = embedding_model_name or Config.EMBEDDING_MODEL
+    generation_model_name = generation_model_name or Config.GENERATION_MODEL
+    precision = precision or Config.INFERENCE_PRECISION
+    generation_key = _generation_key(generation_model_name, precision)
+    if {f"embedding:{embedding_model_name}", generation_key} <= _warmed_up:
+        return
+    start_time = time.perf_counter()
+    
+    key = f"embedding:{embedding_model_name}"
+    encoder = get_embedding_model(embedding_model_name)
+    if key not in _warmed_up:
+        encoder.encode(["How many points is a three-pointer worth?"])
+        _warmed_up.add(key)
+    
+    generator = get_generation_model(generation_model_name, precision)
+    if generation_key not in _warmed_up:
+        import torch
+        
+        inputs = generator.tokenizer("Basketball is", return_tensors="pt")
+        with torch.no_grad():
+            generator.model.generate(
+                **inputs,
+                max_new_tokens=1,
+                pad_token_id=generator.tokenizer.eos_token_id
+            )
+        _warmed_up.add(generation_key)
+    
+    print(f"Models warmed up in {time.perf_counter() - start_time:.1f}s")
+
+def clear():
+    """Forget every loaded model (mainly for tests)."""
+    with _registry_lock:
+        _models.clear()
+        _warmed_up.clear()
\ No newline at end of file
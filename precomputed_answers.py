@@ -0,0 +1,122 @@
+import json
+import os
+import re
+import threading
+import time
+from typing import Dict, Any, List, Optional
+
+class PrecomputedAnswers:
+    """File-backed store of answers to canonical (quick-action/example) questions.
+
+    Each answer is saved with the IDs of the passages retrieved for it and
+    the generation model that wrote it. Vector IDs are content hashes, so an
+    answer stays valid exactly as long as retrieval for its question returns
+    the same passages from the same model; the chatbot regenerates it
+    otherwise.
+    
+    Answers are also tagged with the knowledge version they were checked
+    against, and ``get`` skips them once the index has changed until they
+    are checked again (see ``BasketballChatbot._precomputed_answer``). The
+    file is reloaded when another process saves it, so a refresh anywhere
+    reaches every session and worker.
+    """
+    
+    def __init__(self, path: str):
+        self.path = path
+        self.hits = 0
+        self._lock = threading.Lock()
+        self._entries: Dict[str, Dict[str, Any]] = {}
+        self._mtime = None  # mtime of the file the entries were loaded from or saved to
+        self._dirty = False  # Unsaved puts, which a reload must not discard
+        self._reload()
+    
+    def _file_mtime(self):
+        try:
+            return os.stat(self.path).st_mtime_ns
+        except OSError:
+            return None
+    
+    def _reload(self):
+        """Load the file if it changed since it was last read or written."""
+        if not self.path or self._dirty:
+            return
+        mtime = self._file_mtime()
+        if mtime is None or mtime == self._mtime:
+            return
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                entries = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"Ignoring unreadable precomputed answers at {self.path}: {e}")
+            return
+        with self._lock:
+            self._entries = entries
+            self._mtime = mtime
+    
+    @staticmethod
+    def key(question: str) -> str:
+        """Normalise case, whitespace and trailing punctuation so button text matches typed text."""
+        return re.sub(r"\s+", " ", question).strip().rstrip("?!. ").lower()
+    
+    def get(self, question: str, knowledge_version: Optional[str] = None) -> Optional[str]:
+        """Return the stored answer, unless it was checked against another ``knowledge_version``."""
+        self._reload()
+        entry = self._entries.get(self.key(question))
+        if entry is None:
+            return None
+        if knowledge_version is not None and entry.get('knowledge_version') != knowledge_version:
+            return None
+        self.hits += 1
+        return entry['answer']
+    
+    def is_current(self, question: str, passage_ids: List[str], model_name: str) -> bool:
+        entry = self._entries.get(self.key(question))
+        return entry is not None and entry['passage_ids'] == passage_ids and entry['model'] == model_name
+    
+    def put(self, question: str, answer: str, passage_ids: List[str], model_name: str,
+            knowledge_version: str = ""):
+        with self._lock:
+            self._dirty = True
+            self._entries[self.key(question)] = {
+                'question': question,
+                'answer': answer,
+                'passage_ids': passage_ids,
+                'model': model_name,
+                'knowledge_version': knowledge_version,
+                'created_at': time.time()
+            }
+    
+    def confirm(self, question: str, knowledge_version: str):
+        """Mark a still-current answer (see ``is_current``) as valid for ``knowledge_version``."""
+        with self._lock:
+            entry = self._entries.get(self.key(question))
+            if entry is not None and entry.get('knowledge_version') != knowledge_version:
+                entry['knowledge_version'] = knowledge_version
+                self._dirty = True
+    
+    def retain(self, questions: List[str]):
+        """Forget answers to questions that are no longer canonical."""
+        keep = {self.key(question) for question in questions}
+        with self._lock:
+            for key in list(self._entries):
+                if key not in keep:
+                    del self._entries[key]
+                    self._dirty = True
+    
+    def save(self):
+        if not self.path:
+            return
+        with self._lock:
+            # Per process, so workers saving at the same time never share a temp file
+            tmp_path = f"{self.path}.{os.getpid()}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(self._entries, f, indent=2)
+            os.replace(tmp_path, self.path)
+            self._mtime = self._file_mtime()
+            self._dirty = False
+    
+    def __contains__(self, question: str) -> bool:
+        return self.key(question) in self._entries
+    
+    def __len__(self) -> int:
+        return len(self._entries)
\ No newline at end of file
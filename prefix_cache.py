@@ -0,0 +1,125 @@
+import threading
+from collections import OrderedDict
+from typing import Dict, Any, List, Optional, Tuple
+import metrics
+
+class PrefixKVCache:
+    """LRU cache of attention key/value states for shared prompt prefixes.
+
+    A prompt is given as segments (instruction preamble, retrieved context,
+    question). The key/value states after each leading run of segments are
+    cached, so a new request only runs prefill for the segments after its
+    longest cached prefix: the preamble is shared by every prompt and the
+    context by every question that retrieved the same passages. Entries are
+    evicted least recently used first once their tensors exceed ``max_mb``.
+    """
+    
+    def __init__(self, model, tokenizer, max_mb: float = 512, min_tokens: int = 4):
+        self.model = model
+        self.tokenizer = tokenizer
+        self.max_bytes = int(max_mb * 1024 * 1024)
+        self.min_tokens = min_tokens
+        
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[Tuple[str, ...], Dict[str, Any]]" = OrderedDict()
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+    
+    def _encode(self, text: str) -> List[int]:
+        return self.tokenizer(text)['input_ids']
+    
+    @staticmethod
+    def _size(past) -> int:
+        return sum(tensor.numel() * tensor.element_size() for layer in past for tensor in layer)
+    
+    def _get(self, key: Tuple[str, ...]) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+    
+    def _put(self, key: Tuple[str, ...], ids: List[int], past):
+        size = self._size(past)
+        if size > self.max_bytes or len(ids) < self.min_tokens:
+            return
+        with self._lock:
+            if key in self._entries:
+                return
+            self._entries[key] = {'ids': ids, 'past': past, 'bytes': size}
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= evicted['bytes']
+                self.evictions += 1
+    
+    def prefix_state(self, segments: List[str]):
+        """Return ``(token_ids, past_key_values)`` for every segment but the last.
+
+        Starts from the longest cached run of leading segments and extends it
+        one segment at a time, caching each new run on the way.
+        """
+        import torch
+        
+        ids: List[int] = []
+        past = None
+        key: Tuple[str, ...] = ()
+        for segment in segments[:-1]:
+            key = key + (segment,)
+            entry = self._get(key)
+            if entry is not None:
+                self.hits += 1
+                metrics.record_cache("prefix_kv", 1)
+                ids, past = entry['ids'], entry['past']
+                continue
+            
+            self.misses += 1
+            metrics.record_cache("prefix_kv", 0, 1)
+            segment_ids = self._encode(segment)
+            if not segment_ids:
+                continue
+            with torch.no_grad():
+                output = self.model(
+                    input_ids=torch.tensor([segment_ids], dtype=torch.long),
+                    attention_mask=torch.ones((1, len(ids) + len(segment_ids)), dtype=torch.long),
+                    past_key_values=past,
+                    use_cache=True
+                )
+            ids = ids + segment_ids
+            past = output.past_key_values
+            self._put(key, ids, past)
+        return ids, past
+    
+    def generate(self, segments: List[str], **generation_kwargs) -> List[int]:
+        """Generate a continuation of ``"".join(segments)``, reusing cached prefix states.
+
+        Returns the new token IDs. Extra keyword arguments (including a
+        ``streamer``) are passed to ``model.generate``.
+        """
+        import torch
+        
+        prefix_ids, past = self.prefix_state(segments)
+        ids = prefix_ids + self._encode(segments[-1])
+        with torch.no_grad():
+            output = self.model.generate(
+                input_ids=torch.tensor([ids], dtype=torch.long),
+                attention_mask=torch.ones((1, len(ids)), dtype=torch.long),
+                past_key_values=past,
+                **generation_kwargs
+            )
+        return output[0][len(ids):].tolist()
+    
+    def generate_text(self, segments: List[str], **generation_kwargs) -> str:
+        new_ids = self.generate(segments, **generation_kwargs)
+        return self.tokenizer.decode(new_ids, skip_special_tokens=True).strip()
+    
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            'entries': len(self._entries),
+            'megabytes': self._bytes / (1024 * 1024),
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+            'evictions': self.evictions
+        }
\ No newline at end of file
@@ -0,0 +1,93 @@
+import hashlib
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+from typing import List, Dict, Any
+import model_registry
+import metrics
+
+class Reranker:
+    """Rerank retrieved passages with a cross-encoder under a time budget.
+
+    All uncached (query, passage) pairs are scored in one batched
+    ``predict`` call. Scores are kept in an LRU cache keyed by the query and
+    the passage ID (a content hash), so repeated questions rerank for free.
+    If scoring takes longer than ``time_budget_ms`` the original retrieval
+    order is returned; the batch still finishes in the background and
+    fills the cache for next time.
+    """
+    
+    def __init__(self, model_name: str, time_budget_ms: float = 200, cache_size: int = 10000,
+                 batch_size: int = 32):
+        self.model = model_registry.get_cross_encoder(model_name)
+        self.time_budget = time_budget_ms / 1000.0
+        self.cache_size = cache_size
+        self.batch_size = batch_size
+        
+        self._lock = threading.Lock()
+        self._cache: "OrderedDict[str, float]" = OrderedDict()
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="reranker")
+        self.timeouts = 0
+        self.cache_hits = 0
+        self.cache_misses = 0
+    
+    @staticmethod
+    def _key(query: str, passage: Dict[str, Any]) -> str:
+        return hashlib.sha256(f"{query}\0{passage['id']}".encode('utf-8')).hexdigest()
+    
+    def _score(self, query: str, passages: List[Dict[str, Any]], keys: List[str]):
+        pairs = [(query, f"{passage['title']}: {passage['content']}") for passage in passages]
+        scores = self.model.predict(pairs, batch_size=self.batch_size)
+        with self._lock:
+            for key, score in zip(keys, scores):
+                self._cache[key] = float(score)
+                self._cache.move_to_end(key)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+    
+    def rerank(self, query: str, passages: List[Dict[str, Any]], top_k: int) -> List[Dict[str, Any]]:
+        """Return the ``top_k`` best passages by cross-encoder score (stored as ``rerank_score``)."""
+        if not passages:
+            return []
+        
+        keys = [self._key(query, passage) for passage in passages]
+        with self._lock:
+            missing = [i for i, key in enumerate(keys) if key not in self._cache]
+            self.cache_hits += len(keys) - len(missing)
+            self.cache_misses += len(missing)
+        metrics.record_cache("rerank", len(keys) - len(missing), len(missing))
+        
+        if missing:
+            future = self._executor.submit(self._score, query, [passages[i] for i in missing],
+                                           [keys[i] for i in missing])
+            try:
+                future.result(timeout=self.time_budget)
+            except TimeoutError:
+                self.timeouts += 1
+                metrics.increment("rerank_timeouts_total")
+                print(f"Reranking exceeded {self.time_budget * 1000:.0f}ms "
+                      f"({len(missing)} pairs); keeping retrieval order")
+                return passages[:top_k]
+            except Exception as e:
+                print(f"Error reranking passages: {e}")
+                return passages[:top_k]
+        
+        with self._lock:
+            scores = [self._cache.get(key) for key in keys]
+            for key in keys:
+                if key in self._cache:
+                    self._cache.move_to_end(key)
+        if any(score is None for score in scores):
+            # Evicted by a concurrent call between scoring and reading
+            return passages[:top_k]
+        
+        ranked = sorted(zip(passages, scores), key=lambda pair: pair[1], reverse=True)[:top_k]
+        return [dict(passage, rerank_score=score) for passage, score in ranked]
+    
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.cache_hits + self.cache_misses
+        return {
+            'cache_entries': len(self._cache),
+            'cache_hit_rate': self.cache_hits / lookups if lookups else 0.0,
+            'timeouts': self.timeouts
+        }
\ No newline at end of file
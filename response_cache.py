@@ -0,0 +1,121 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import List, Optional, Dict, Any
+import numpy as np
+
+class SemanticResponseCache:
+    """Cache of generated answers looked up by question-embedding similarity.
+
+    A new question hits the cache when its embedding has cosine similarity of
+    at least ``threshold`` with a previously answered question. Entries expire
+    after ``ttl_seconds``, the least recently used entry is evicted once
+    ``max_entries`` is reached, and the whole cache is dropped whenever the
+    knowledge version it was filled under changes.
+    """
+    
+    def __init__(self, threshold: float = 0.95, ttl_seconds: float = 3600,
+                 max_entries: int = 1000, dimension: int = 384):
+        self.threshold = threshold
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        
+        self._lock = threading.Lock()
+        self._vectors = np.zeros((max_entries, dimension), dtype=np.float32)
+        self._active = np.zeros(max_entries, dtype=bool)
+        self._entries: "OrderedDict[int, Dict[str, Any]]" = OrderedDict()
+        self._knowledge_version = None
+        
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+    
+    @staticmethod
+    def _normalize(embedding: List[float]) -> np.ndarray:
+        vector = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+    
+    def _sync_version(self, knowledge_version):
+        if knowledge_version != self._knowledge_version:
+            if self._entries:
+                self.invalidations += 1
+            self._clear()
+            self._knowledge_version = knowledge_version
+    
+    def _clear(self):
+        self._entries.clear()
+        self._active[:] = False
+    
+    def _remove(self, slot: int):
+        self._entries.pop(slot, None)
+        self._active[slot] = False
+    
+    def lookup(self, embedding: List[float], knowledge_version=None) -> Optional[Dict[str, Any]]:
+        """Return the cached entry for the most similar question, or ``None``."""
+        query = self._normalize(embedding)
+        now = time.time()
+        
+        with self._lock:
+            self._sync_version(knowledge_version)
+            slots = np.flatnonzero(self._active)
+            while len(slots):
+                scores = self._vectors[slots] @ query
+                best = int(np.argmax(scores))
+                slot = int(slots[best])
+                if scores[best] < self.threshold:
+                    break
+                
+                entry = self._entries[slot]
+                if now - entry['created_at'] > self.ttl_seconds:
+                    # Expired: drop it and look for the next best match
+                    self._remove(slot)
+                    slots = np.delete(slots, best)
+                    continue
+                
+                self._entries.move_to_end(slot)
+                self.hits += 1
+                return dict(entry, similarity=float(scores[best]))
+            
+            self.misses += 1
+            return None
+    
+    def store(self, question: str, embedding: List[float], answer: str, knowledge_version=None):
+        """Remember ``answer`` for ``question``."""
+        vector = self._normalize(embedding)
+        
+        with self._lock:
+            self._sync_version(knowledge_version)
+            free = np.flatnonzero(~self._active)
+            if len(free):
+                slot = int(free[0])
+            else:
+                slot, _ = self._entries.popitem(last=False)
+                self.evictions += 1
+            
+            self._vectors[slot] = vector
+            self._active[slot] = True
+            self._entries[slot] = {
+                'question': question,
+                'answer': answer,
+                'created_at': time.time()
+            }
+    
+    def invalidate(self):
+        """Drop every cached answer."""
+        with self._lock:
+            if self._entries:
+                self.invalidations += 1
+            self._clear()
+    
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            'entries': len(self._entries),
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+            'evictions': self.evictions,
+            'invalidations': self.invalidations
+        }
\ No newline at end of file
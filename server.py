@@ -0,0 +1,370 @@
+#!/usr/bin/env python3
+"""
+Headless HTTP API for the Basketball Analysis Chatbot
+A small asyncio HTTP/1.1 server (standard library only) exposing the chatbot
+without the Streamlit UI, so it can run behind a load balancer.
+
+Endpoints:
+    GET  /health   liveness check
+    POST /ask      {"question": "..."} -> {"answer": "...", "seconds": ...}
+    POST /stream   {"question": "..."} -> answer text as a chunked stream
+    POST /search   {"query": "...", "top_k": 5} -> {"results": [...]}
+    GET  /metrics  per-stage latency histograms and counters (Prometheus text)
+    GET  /metrics.json  the same metrics plus recent request traces as JSON
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import socket
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, Optional, Tuple
+from urllib.parse import urlsplit
+from config import Config
+import metrics
+
+MAX_BODY_BYTES = 1024 * 1024
+
+REASONS = {
+    200: "OK",
+    400: "Bad Request",
+    404: "Not Found",
+    405: "Method Not Allowed",
+    413: "Payload Too Large",
+    500: "Internal Server Error",
+}
+
+class HTTPError(Exception):
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+class ChatbotServer:
+    """Serves one BasketballChatbot over HTTP.
+
+    Embedding, vector search and generation are blocking calls, so they run
+    on a thread pool and the event loop stays free to accept connections.
+    The generation step of ``/ask`` and ``/stream`` is additionally limited
+    to ``max_concurrent_generations`` at a time (at least a full batch when
+    the chatbot batches generations). Statistics, precomputed, cached and
+    templated answers and ``/search`` never wait for a generation slot.
+    """
+    
+    def __init__(self, chatbot, max_workers: int = 8, max_concurrent_generations: int = 2):
+        self.chatbot = chatbot
+        scheduler = getattr(chatbot, 'scheduler', None)
+        if scheduler is not None:
+            # Leave room for the scheduler to fill a whole batch
+            max_concurrent_generations = max(max_concurrent_generations, scheduler.max_batch_size)
+        self.max_concurrent_generations = max_concurrent_generations
+        chatbot.generation_slots = threading.BoundedSemaphore(max_concurrent_generations)
+        # Threads holding a generation slot come on top of the pool for everything else
+        self.executor = ThreadPoolExecutor(max_workers=max_workers + max_concurrent_generations,
+                                           thread_name_prefix="chatbot")
+        self.routes = {
+            ('GET', '/health'): self.handle_health,
+            ('POST', '/ask'): self.handle_ask,
+            ('POST', '/stream'): self.handle_stream,
+            ('POST', '/search'): self.handle_search,
+            ('GET', '/metrics'): self.handle_metrics,
+            ('GET', '/metrics.json'): self.handle_metrics_json,
+        }
+    
+    async def run_blocking(self, func, *args):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, func, *args)
+    
+    async def serve(self, host: str = None, port: int = None, sock: socket.socket = None):
+        """Accept connections until cancelled."""
+        if sock is not None:
+            server = await asyncio.start_server(self.handle_connection, sock=sock)
+        else:
+            server = await asyncio.start_server(self.handle_connection, host, port)
+        
+        addresses = ", ".join(str(s.getsockname()) for s in server.sockets)
+        print(f"[{os.getpid()}] Serving basketball chatbot on {addresses}")
+        async with server:
+            await server.serve_forever()
+    
+    # Connection handling
+    
+    async def handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                request = await self.read_request(reader, writer)
+                if request is None:
+                    break
+                method, path, headers, body = request
+                keep_alive = headers.get('connection', '').lower() != 'close'
+                
+                handler = self.routes.get((method, path))
+                start_time = time.perf_counter()
+                try:
+                    if handler is None:
+                        known_path = any(route_path == path for _, route_path in self.routes)
+                        raise HTTPError(405 if known_path else 404, f"No route for {method} {path}")
+                    await handler(self.parse_json(body) if method == 'POST' else {}, writer)
+                except HTTPError as e:
+                    await self.send_json(writer, e.status, {'error': e.message})
+                except ConnectionError:
+                    raise
+                except Exception as e:
+                    print(f"Error handling {method} {path}: {e}")
+                    await self.send_json(writer, 500, {'error': "Internal server error"})
+                if handler is not None:
+                    metrics.observe("http_request_seconds", time.perf_counter() - start_time, route=path)
+                
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+    
+    async def read_request(self, reader: asyncio.StreamReader,
+                           writer: asyncio.StreamWriter) -> Optional[Tuple[str, str, Dict[str, str], bytes]]:
+        request_line = await reader.readline()
+        if not request_line.strip():
+            return None
+        
+        try:
+            method, target, _ = request_line.decode('latin-1').split(' ', 2)
+        except ValueError:
+            await self.send_json(writer, 400, {'error': "Malformed request line"})
+            return None
+        
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b'\r\n', b'\n', b''):
+                break
+            name, _, value = line.decode('latin-1').partition(':')
+            headers[name.strip().lower()] = value.strip()
+        
+        try:
+            length = int(headers.get('content-length', 0) or 0)
+        except ValueError:
+            length = -1
+        if length < 0:
+            # Without a usable length the body cannot be skipped, so the connection closes
+            await self.send_json(writer, 400, {'error': "Invalid Content-Length"})
+            return None
+        if length > MAX_BODY_BYTES:
+            await self.send_json(writer, 413, {'error': "Request body too large"})
+            return None
+        body = await reader.readexactly(length) if length else b''
+        return method.upper(), urlsplit(target).path, headers, body
+    
+    @staticmethod
+    def parse_json(body: bytes) -> Dict[str, Any]:
+        try:
+            payload = json.loads(body or b'{}')
+        except ValueError:
+            raise HTTPError(400, "Request body must be JSON")
+        if not isinstance(payload, dict):
+            raise HTTPError(400, "Request body must be a JSON object")
+        return payload
+    
+    @staticmethod
+    def require_text(payload: Dict[str, Any], field: str) -> str:
+        value = payload.get(field)
+        if not isinstance(value, str) or not value.strip():
+            raise HTTPError(400, f"'{field}' must be a non-empty string")
+        return value.strip()
+    
+    async def send_json(self, writer: asyncio.StreamWriter, status: int, payload: Dict[str, Any]):
+        body = json.dumps(payload).encode('utf-8')
+        writer.write(
+            f"HTTP/1.1 {status} {REASONS[status]}\r\n"
+            f"Content-Type: application/json\r\n"
+            f"Content-Length: {len(body)}\r\n\r\n".encode('latin-1') + body
+        )
+        await writer.drain()
+    
+    async def send_text(self, writer: asyncio.StreamWriter, status: int, text: str,
+                        content_type: str = "text/plain; charset=utf-8"):
+        body = text.encode('utf-8')
+        writer.write(
+            f"HTTP/1.1 {status} {REASONS[status]}\r\n"
+            f"Content-Type: {content_type}\r\n"
+            f"Content-Length: {len(body)}\r\n\r\n".encode('latin-1') + body
+        )
+        await writer.drain()
+    
+    # Endpoints
+    
+    async def handle_health(self, payload: Dict[str, Any], writer: asyncio.StreamWriter):
+        await self.send_json(writer, 200, {
+            'status': "ok",
+            'pid': os.getpid(),
+            'knowledge_version': self.chatbot.vector_store.knowledge_version
+        })
+    
+    async def handle_ask(self, payload: Dict[str, Any], writer: asyncio.StreamWriter):
+        question = self.require_text(payload, 'question')
+        start_time = time.perf_counter()
+        answer = await self.run_blocking(self.chatbot.generate_response, question)
+        await self.send_json(writer, 200, {
+            'answer': answer,
+            'seconds': time.perf_counter() - start_time
+        })
+    
+    async def handle_stream(self, payload: Dict[str, Any], writer: asyncio.StreamWriter):
+        question = self.require_text(payload, 'question')
+        
+        writer.write(
+            b"HTTP/1.1 200 OK\r\n"
+            b"Content-Type: text/plain; charset=utf-8\r\n"
+            b"Transfer-Encoding: chunked\r\n\r\n"
+        )
+        # Set when the client goes away, which stops generation and frees its slot
+        cancelled = threading.Event()
+        try:
+            # Pull one piece at a time on the pool so decoding never blocks the loop
+            stream = self.chatbot.generate_response_stream(question, cancelled)
+            while True:
+                text = await self.run_blocking(next, stream, None)
+                if text is None:
+                    break
+                data = text.encode('utf-8')
+                if data:
+                    writer.write(f"{len(data):x}\r\n".encode('latin-1') + data + b"\r\n")
+                    await writer.drain()
+        except ConnectionError:
+            cancelled.set()
+            raise
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+        except Exception as e:
+            cancelled.set()
+            # The 200 headers are already out, so no error response can follow; dropping
+            # the connection without the final chunk tells the client the body is incomplete
+            metrics.record_error("stream")
+            print(f"Error streaming answer: {e}")
+            raise ConnectionAbortedError("stream failed") from e
+        writer.write(b"0\r\n\r\n")
+        await writer.drain()
+    
+    async def handle_search(self, payload: Dict[str, Any], writer: asyncio.StreamWriter):
+        query = self.require_text(payload, 'query')
+        top_k = payload.get('top_k', 5)
+        if not isinstance(top_k, int) or not 1 <= top_k <= 100:
+            raise HTTPError(400, "'top_k' must be an integer between 1 and 100")
+        
+        results = await self.run_blocking(self.chatbot.vector_store.search, query, top_k)
+        await self.send_json(writer, 200, {'results': results})
+    
+    async def handle_metrics(self, payload: Dict[str, Any], writer: asyncio.StreamWriter):
+        await self.send_text(writer, 200, metrics.to_prometheus(), "text/plain; version=0.0.4; charset=utf-8")
+    
+    async def handle_metrics_json(self, payload: Dict[str, Any], writer: asyncio.StreamWriter):
+        await self.send_json(writer, 200, metrics.snapshot())
+
+def create_listening_socket(host: str, port: int, reuse_port: bool = False) -> socket.socket:
+    """Bind a listening socket; with ``reuse_port`` several processes can share the port."""
+    sock = socket.socket(socket.AF_INET6 if ':' in host else socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    if reuse_port:
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+    sock.bind((host, port))
+    sock.listen(socket.SOMAXCONN)
+    sock.setblocking(False)
+    return sock
+
+def sync_knowledge_base():
+    """Embed and upsert the built-in knowledge once, before any worker starts."""
+    from basketball_knowledge import BasketballKnowledgeBase
+    from chunking import TextChunker
+    from vector_store import VectorStore
+    
+    print("Setting up basketball knowledge base...")
+    items = BasketballKnowledgeBase().get_all_basketball_knowledge()
+    chunks = TextChunker().chunk_items(items)
+    stats = VectorStore().sync_basketball_knowledge(chunks)
+    print(f"Knowledge base ready: {stats['added']} added, {stats['deleted']} deleted, "
+          f"{stats['unchanged']} unchanged")
+
+def precompute_answers():
+    """Refresh the precomputed answers once, before any worker loads them."""
+    from basketball_chatbot import BasketballChatbot
+    
+    BasketballChatbot().precompute_answers()
+
+def run_worker(host: str, port: int, threads: int, max_generations: int, reuse_port: bool):
+    """Load the models in this process and serve until interrupted."""
+    from basketball_chatbot import BasketballChatbot
+    
+    chatbot = BasketballChatbot()
+    server = ChatbotServer(chatbot, max_workers=threads, max_concurrent_generations=max_generations)
+    sock = create_listening_socket(host, port, reuse_port=reuse_port)
+    try:
+        asyncio.run(server.serve(sock=sock))
+    except KeyboardInterrupt:
+        pass
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve the basketball chatbot over HTTP")
+    parser.add_argument("--host", default=Config.SERVER_HOST, help="Interface to bind")
+    parser.add_argument("--port", type=int, default=Config.SERVER_PORT, help="Port to bind")
+    parser.add_argument("--workers", type=int, default=Config.SERVER_WORKERS,
+                        help="Worker processes sharing the port (each loads its own models)")
+    parser.add_argument("--threads", type=int, default=Config.SERVER_THREADS,
+                        help="Thread pool size per worker for embedding, search and generation")
+    parser.add_argument("--max-generations", type=int, default=Config.SERVER_MAX_CONCURRENT_GENERATIONS,
+                        help="Max concurrent generations per worker")
+    parser.add_argument("--skip-setup", action="store_true", help="Do not sync the knowledge base on start")
+    args = parser.parse_args()
+    
+    print("🏀 Basketball Chatbot API")
+    print("=" * 50)
+    
+    if not args.skip_setup:
+        sync_knowledge_base()
+    
+    if args.workers <= 1:
+        # The worker runs in this process, so it reuses the models loaded here
+        precompute_answers()
+        run_worker(args.host, args.port, args.threads, args.max_generations, reuse_port=False)
+        return
+    
+    if not hasattr(socket, "SO_REUSEPORT"):
+        print("❌ Multiple workers need SO_REUSEPORT, which this platform does not support")
+        return
+    
+    import multiprocessing
+    
+    # Spawned (not forked) so no torch or tokenizer state is shared between workers;
+    # the kernel balances incoming connections across the sockets bound with SO_REUSEPORT
+    context = multiprocessing.get_context("spawn")
+    # In a child, so this process doesn't hold its own copy of the models while the workers run
+    precompute = context.Process(target=precompute_answers, name="chatbot-precompute")
+    precompute.start()
+    precompute.join()
+    
+    workers = [
+        context.Process(
+            target=run_worker,
+            args=(args.host, args.port, args.threads, args.max_generations, True),
+            name=f"chatbot-worker-{i}"
+        )
+        for i in range(args.workers)
+    ]
+    for worker in workers:
+        worker.start()
+    
+    try:
+        for worker in workers:
+            worker.join()
+    except KeyboardInterrupt:
+        for worker in workers:
+            worker.terminate()
+        for worker in workers:
+            worker.join()
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
@@ -81,19 +81,23 @@ def create_env_file():
         return False
 
 def test_setup():
-    """Test the setup by importing modules."""
+    """Test the setup by importing modules.
+    
+    Third-party packages are only located, not imported: importing torch,
+    transformers or streamlit would add seconds to setup without testing
+    anything our own modules don't.
+    """
     print("\n🧪 Testing setup...")
     
     try:
-        # Test basic imports
-        import streamlit
-        print("✅ Streamlit imported successfully")
-        
-        import transformers
-        print("✅ Transformers imported successfully")
+        # Check the main dependencies are installed
+        from importlib.util import find_spec
         
-        import langchain
-        print("✅ LangChain imported successfully")
+        for module, name in (("streamlit", "Streamlit"), ("transformers", "Transformers"),
+                             ("langchain", "LangChain")):
+            if find_spec(module) is None:
+                raise ImportError(f"No module named '{module}'")
+            print(f"✅ {name} installed")
         
         # Test our modules
         from config import Config
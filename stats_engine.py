@@ -0,0 +1,419 @@
+"""
+Vectorised basketball statistics for numeric questions
+Box-score tables (one row per player per game) are aggregated with pandas
+into player, team and league season tables. Every rate is then computed as a
+whole-column NumPy operation: FG%, 3P%, FT%, eFG%, TS%, usage, per-36,
+possessions, pace and per-100-possession (pace-adjusted) stats.
+
+``StatsEngine.answer`` recognises questions about these metrics, such as how a
+metric is calculated, a worked example with the numbers given in the
+question, a player's season value or a season leaderboard. It returns exact
+answers without calling the language model, and ``None`` for anything else.
+"""
+
+import glob
+import re
+from typing import Dict, Any, List, Optional, Tuple
+import numpy as np
+
+KEY_COLUMNS = ["SEASON", "GAME_ID", "TEAM", "PLAYER"]
+COUNTING_STATS = ["MIN", "PTS", "FGM", "FGA", "FG3M", "FG3A", "FTM", "FTA",
+                  "OREB", "DREB", "REB", "AST", "STL", "BLK", "TOV", "PF"]
+REQUIRED_STATS = ["MIN", "PTS", "FGM", "FGA", "FTA"]
+
+# Common alternative headers (e.g. nba_api / Basketball-Reference exports)
+COLUMN_ALIASES = {
+    "PLAYER_NAME": "PLAYER", "NAME": "PLAYER",
+    "TEAM_ABBREVIATION": "TEAM", "TM": "TEAM",
+    "GAME": "GAME_ID", "GAMEID": "GAME_ID",
+    "YEAR": "SEASON", "SEASON_ID": "SEASON",
+    "MP": "MIN", "MINUTES": "MIN",
+    "FG": "FGM", "3P": "FG3M", "3PM": "FG3M", "3PA": "FG3A", "FT": "FTM",
+    "ORB": "OREB", "DRB": "DREB", "TRB": "REB", "TO": "TOV",
+}
+
+PER_36_STATS = {"PTS": "points", "REB": "rebounds", "AST": "assists",
+                "STL": "steals", "BLK": "blocks", "TOV": "turnovers"}
+
+# Column, label, formula, explanation, question aliases (most specific first), kind
+METRICS = [
+    ("EFG_PCT", "effective field goal percentage (eFG%)", "eFG% = (FGM + 0.5 × 3PM) / FGA",
+     "field goal percentage that counts a made three as 1.5 made twos",
+     ("effective field goal", "efg"), "pct"),
+    ("TS_PCT", "true shooting percentage (TS%)", "TS% = PTS / (2 × (FGA + 0.44 × FTA))",
+     "points per shooting possession, counting twos, threes and free throws "
+     "(0.44 × FTA estimates the possessions used by free throws)",
+     ("true shooting", "ts%", "ts %"), "pct"),
+    ("FG3_PCT", "three-point percentage (3P%)", "3P% = 3PM / 3PA",
+     "three-pointers made divided by three-pointers attempted",
+     ("three-point percentage", "three point percentage", "3-point percentage", "3p%", "3pt%"), "pct"),
+    ("FT_PCT", "free throw percentage (FT%)", "FT% = FTM / FTA",
+     "free throws made divided by free throws attempted",
+     ("free throw percentage", "free-throw percentage", "ft%"), "pct"),
+    ("FG_PCT", "field goal percentage (FG%)", "FG% = FGM / FGA",
+     "field goals made divided by field goals attempted",
+     ("field goal percentage", "field-goal percentage", "shooting percentage", "fg%"), "pct"),
+    ("USG_PCT", "usage rate (USG%)",
+     "USG% = 100 × (FGA + 0.44 × FTA + TOV) × (Team MIN / 5) / (MIN × (Team FGA + 0.44 × Team FTA + Team TOV))",
+     "share of the team's possessions a player used while on the floor",
+     ("usage rate", "usage percentage", "usage", "usg"), "pct"),
+    ("PER_36", "per-36-minute stats", "Per-36 = stat × 36 / MIN",
+     "a player's production scaled to 36 minutes, so players with different minutes can be compared",
+     ("per 36", "per-36", "per36"), "per36"),
+    ("PER_100", "pace-adjusted stats (per 100 possessions)",
+     "Per-100 = stat × 100 / possessions played, where possessions played = Team Poss × MIN / (Team MIN / 5)",
+     "production per 100 possessions, which removes the effect of how fast a team plays",
+     ("per 100", "per-100", "pace-adjusted", "pace adjusted"), "per100"),
+    ("PACE", "pace", "Pace = 48 × (Team Poss + Opp Poss) / (2 × Team MIN / 5), Poss ≈ FGA + 0.44 × FTA − OREB + TOV",
+     "possessions a team plays per 48 minutes",
+     ("pace",), "pace"),
+]
+
+# Questions are only taken away from retrieval when they ask for a calculation,
+# a definition of the metric itself or a ranking; advice such as "how can I
+# improve my FT%" goes to the model
+DEFINITION_PATTERN = re.compile(
+    r"\b(calculat\w*|comput\w*|formulas?|defin\w*|how (?:is|are) .+ (?:measured|determined))\b", re.I
+)
+# "What is <metric>?" with nothing but the metric after "what is"
+WHAT_IS_TEMPLATE = (r"^\s*(?:what(?:'s| is| are| does)|explain)\s+(?:the\s+|an?\s+)?(?:{alias})"
+                    r"(?:\s+(?:percentage|rate|stats?|statistics))?(?:\s+mean)?\s*[?.!]*\s*$")
+LEADER_PATTERN = re.compile(r"\b(who|which (?:players?|teams?)|leaders?|led|leads|leading|highest|lowest|"
+                            r"fastest|slowest|rank\w*)\b", re.I)
+SEASON_PATTERN = re.compile(r"\b((?:19|20)\d{2})(?:\s*[-/]\s*(\d{2,4}))?\b")
+MADE_OF_PATTERN = re.compile(r"(\d+)\s*(?:of|for|/|out of|-for-)\s*(\d+)", re.I)
+
+def _ratio(numerator, denominator):
+    """Element-wise division that yields NaN instead of inf where the denominator is 0."""
+    denominator = np.asarray(denominator, dtype=float)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(denominator != 0, np.asarray(numerator, dtype=float) / denominator, np.nan)
+
+def possessions(frame):
+    """Estimated possessions: FGA + 0.44 × FTA − OREB + TOV (vectorised over rows)."""
+    return frame["FGA"] + 0.44 * frame["FTA"] - frame["OREB"] + frame["TOV"]
+
+def add_shooting_metrics(frame):
+    """Add FG%, 3P%, FT%, eFG% and TS% columns (as fractions) in place."""
+    frame["FG_PCT"] = _ratio(frame["FGM"], frame["FGA"])
+    frame["FG3_PCT"] = _ratio(frame["FG3M"], frame["FG3A"])
+    frame["FT_PCT"] = _ratio(frame["FTM"], frame["FTA"])
+    frame["EFG_PCT"] = _ratio(frame["FGM"] + 0.5 * frame["FG3M"], frame["FGA"])
+    frame["TS_PCT"] = _ratio(frame["PTS"], 2 * (frame["FGA"] + 0.44 * frame["FTA"]))
+    return frame
+
+def _parse_minutes(column):
+    """Minutes as floats, accepting ``"MM:SS"`` strings."""
+    import pandas as pd
+    
+    # pandas 3 reads text columns as ``str``, not ``object``, so test for numbers instead
+    if pd.api.types.is_numeric_dtype(column):
+        return pd.to_numeric(column, errors='coerce').fillna(0.0)
+    parts = column.astype(str).str.split(":", n=1, expand=True)
+    minutes = pd.to_numeric(parts[0], errors='coerce').fillna(0.0)
+    if parts.shape[1] > 1:
+        minutes += pd.to_numeric(parts[1], errors='coerce').fillna(0.0) / 60
+    return minutes
+
+def normalize_box_scores(frame):
+    """Return a copy of ``frame`` with canonical column names and numeric counting stats."""
+    import pandas as pd
+    
+    frame = frame.rename(columns=lambda name: str(name).strip().upper())
+    frame = frame.rename(columns={k: v for k, v in COLUMN_ALIASES.items() if v not in frame.columns})
+    missing = [column for column in KEY_COLUMNS + REQUIRED_STATS if column not in frame.columns]
+    if missing:
+        raise ValueError(f"Box scores are missing columns: {', '.join(missing)}")
+    
+    frame = frame.copy()
+    frame["MIN"] = _parse_minutes(frame["MIN"])
+    for column in COUNTING_STATS:
+        if column == "MIN":
+            continue
+        if column in frame.columns:
+            frame[column] = pd.to_numeric(frame[column], errors='coerce').fillna(0.0)
+        elif column == "REB" and {"OREB", "DREB"} <= set(frame.columns):
+            frame["REB"] = frame["OREB"] + frame["DREB"]
+        else:
+            frame[column] = 0.0
+    for column in KEY_COLUMNS:
+        frame[column] = frame[column].astype(str).str.strip()
+    return frame[KEY_COLUMNS + COUNTING_STATS]
+
+def build_season_tables(box_scores) -> Dict[str, Any]:
+    """Aggregate player-game rows into ``{'players', 'teams', 'league'}`` season tables.
+
+    Team-game totals are joined back onto each player's games, so usage and
+    possessions played use the team totals of the games the player was in.
+    """
+    team_games = box_scores.groupby(["SEASON", "GAME_ID", "TEAM"], as_index=False)[COUNTING_STATS].sum()
+    team_games["POSS"] = possessions(team_games)
+    
+    # Opponent totals are the game totals minus the team's own; a game with only
+    # one team listed counts the team's possessions for both sides
+    game = team_games.groupby(["SEASON", "GAME_ID"])
+    teams_in_game = game["TEAM"].transform("size")
+    team_games["OPP_POSS"] = np.where(teams_in_game > 1, game["POSS"].transform("sum") - team_games["POSS"],
+                                      team_games["POSS"])
+    team_games["OPP_PTS"] = game["PTS"].transform("sum") - team_games["PTS"]
+    
+    teams = team_games.groupby(["SEASON", "TEAM"], as_index=False).agg(
+        GP=("GAME_ID", "nunique"), **{column: (column, "sum") for column in COUNTING_STATS + ["POSS", "OPP_POSS", "OPP_PTS"]}
+    )
+    add_shooting_metrics(teams)
+    teams["PACE"] = 48 * _ratio(teams["POSS"] + teams["OPP_POSS"], 2 * teams["MIN"] / 5)
+    teams["ORTG"] = 100 * _ratio(teams["PTS"], teams["POSS"])
+    teams["DRTG"] = 100 * _ratio(teams["OPP_PTS"], teams["OPP_POSS"])
+    
+    team_totals = team_games[["SEASON", "GAME_ID", "TEAM", "MIN", "FGA", "FTA", "TOV", "POSS"]].rename(
+        columns={"MIN": "TM_MIN", "FGA": "TM_FGA", "FTA": "TM_FTA", "TOV": "TM_TOV", "POSS": "TM_POSS"}
+    )
+    player_games = box_scores.merge(team_totals, on=["SEASON", "GAME_ID", "TEAM"], how="left")
+    player_games["PLAYS"] = player_games["FGA"] + 0.44 * player_games["FTA"] + player_games["TOV"]
+    player_games["TM_PLAYS"] = player_games["TM_FGA"] + 0.44 * player_games["TM_FTA"] + player_games["TM_TOV"]
+    # Team possessions while the player was on the floor
+    player_games["ON_POSS"] = player_games["TM_POSS"] * _ratio(player_games["MIN"], player_games["TM_MIN"] / 5)
+    # Team plays while the player was on the floor (the usage denominator)
+    player_games["ON_PLAYS"] = player_games["TM_PLAYS"] * _ratio(player_games["MIN"], player_games["TM_MIN"] / 5)
+    
+    players = player_games.groupby(["SEASON", "PLAYER", "TEAM"], as_index=False).agg(
+        GP=("GAME_ID", "nunique"), **{column: (column, "sum") for column in COUNTING_STATS + ["PLAYS", "ON_PLAYS", "ON_POSS"]}
+    )
+    add_shooting_metrics(players)
+    players["USG_PCT"] = _ratio(players["PLAYS"], players["ON_PLAYS"])
+    for column in PER_36_STATS:
+        players[f"{column}_PER36"] = 36 * _ratio(players[column], players["MIN"])
+        players[f"{column}_PER100"] = 100 * _ratio(players[column], players["ON_POSS"])
+    players = players.merge(teams[["SEASON", "TEAM", "PACE"]], on=["SEASON", "TEAM"], how="left")
+    
+    league = teams.groupby("SEASON", as_index=False)[COUNTING_STATS + ["POSS", "OPP_POSS"]].sum()
+    add_shooting_metrics(league)
+    league["PACE"] = 48 * _ratio(league["POSS"] + league["OPP_POSS"], 2 * league["MIN"] / 5)
+    return {'players': players, 'teams': teams, 'league': league}
+
+def _format_value(kind: str, value: float) -> str:
+    if value != value:  # NaN
+        return "n/a"
+    if kind == "pct":
+        return f"{value * 100:.1f}%"
+    return f"{value:.1f}"
+
+class StatsEngine:
+    """Answers numeric basketball questions from box scores and known formulas.
+
+    Tables are built once, when the engine is created, so answering is a
+    lookup or a ``nlargest`` over precomputed columns. Without box scores the
+    engine still explains formulas and works through numbers given in the
+    question.
+    """
+    
+    def __init__(self, box_scores=None, box_score_paths: Optional[str] = None,
+                 leaderboard_size: int = 5, leader_min_minutes_share: float = 0.25):
+        self.leaderboard_size = leaderboard_size
+        self.leader_min_minutes_share = leader_min_minutes_share
+        self.tables: Dict[str, Any] = {}
+        self._player_names: List[Tuple[str, str]] = []
+        
+        if box_scores is None and box_score_paths:
+            box_scores = self.read_box_scores(box_score_paths)
+        if box_scores is not None and len(box_scores):
+            self.load(box_scores)
+    
+    @staticmethod
+    def read_box_scores(pattern: str):
+        """Read and concatenate every CSV matching ``pattern`` (``None`` if there are none)."""
+        paths = sorted(glob.glob(pattern))
+        if not paths:
+            return None
+        import pandas as pd
+        
+        return pd.concat([pd.read_csv(path) for path in paths], ignore_index=True)
+    
+    def load(self, box_scores):
+        """(Re)build the season tables from player-game box-score rows."""
+        self.tables = build_season_tables(normalize_box_scores(box_scores))
+        players = self.tables['players']
+        names = sorted(players["PLAYER"].unique(), key=len, reverse=True)
+        self._player_names = [(name.lower(), name) for name in names]
+        print(f"Loaded box scores: {len(players)} player seasons, "
+              f"{players['SEASON'].nunique()} seasons, {len(self.tables['teams'])} team seasons")
+    
+    # Question routing
+    
+    @staticmethod
+    def find_metric(question: str) -> Optional[tuple]:
+        lowered = question.lower()
+        for metric in METRICS:
+            if any(re.search(rf"(?<!\w){re.escape(alias)}(?!\w)", lowered) for alias in metric[4]):
+                return metric
+        return None
+    
+    def find_player(self, question: str) -> Optional[str]:
+        lowered = question.lower()
+        for lowered_name, name in self._player_names:
+            if re.search(rf"(?<!\w){re.escape(lowered_name)}(?!\w)", lowered):
+                return name
+        # Unambiguous last name
+        matches = {name for lowered_name, name in self._player_names
+                   if len(lowered_name.split()) > 1
+                   and re.search(rf"(?<!\w){re.escape(lowered_name.split()[-1])}(?!\w)", lowered)}
+        return matches.pop() if len(matches) == 1 else None
+    
+    def find_season(self, question: str, seasons) -> Optional[str]:
+        """The season in ``seasons`` named by the question (``"2023-24"``, ``"2024"``...), else ``None``."""
+        seasons = sorted(seasons, reverse=True)
+        for match in SEASON_PATTERN.finditer(question):
+            year = match.group(1)
+            for season in seasons:
+                if season.startswith(year):
+                    return season
+            # A lone year can also name the season ending in it ("2024" for "2023-24")
+            if not match.group(2):
+                for season in seasons:
+                    if re.fullmatch(rf"{int(year) - 1}\s*[-/]\s*(?:{year}|{year[-2:]})", season):
+                        return season
+        return None
+    
+    def answer(self, question: str) -> Optional[str]:
+        """Return an exact answer to a numeric statistics question, or ``None``."""
+        metric = self.find_metric(question)
+        if metric is None:
+            return None
+        
+        computed = self.compute_from_question(metric, question)
+        if computed:
+            return computed
+        
+        if self.tables:
+            player = self.find_player(question)
+            if player:
+                return self.player_answer(metric, player, question)
+            if LEADER_PATTERN.search(question):
+                return self.leaderboard_answer(metric, question)
+        
+        if DEFINITION_PATTERN.search(question) or self.asks_what_is(metric, question):
+            return self.definition_answer(metric)
+        return None
+    
+    @staticmethod
+    def asks_what_is(metric: tuple, question: str) -> bool:
+        """True for "What is <metric>?" / "What does <metric> mean?" and nothing more."""
+        lowered = question.lower()
+        return any(re.match(WHAT_IS_TEMPLATE.format(alias=re.escape(alias)), lowered) for alias in metric[4])
+    
+    # Answers
+    
+    @staticmethod
+    def definition_answer(metric: tuple) -> str:
+        column, label, formula, explanation, _, _ = metric
+        examples = {
+            "FG_PCT": "For example, 8 made field goals on 15 attempts is 8 / 15 = 53.3%.",
+            "FG3_PCT": "For example, 3 made threes on 8 attempts is 3 / 8 = 37.5%.",
+            "FT_PCT": "For example, 7 made free throws on 8 attempts is 7 / 8 = 87.5%.",
+            "EFG_PCT": "For example, 8 of 15 with 3 threes is (8 + 1.5) / 15 = 63.3%.",
+            "TS_PCT": "For example, 25 points on 18 FGA and 6 FTA is 25 / (2 × 20.64) = 60.6%.",
+            "PER_36": "For example, 18 points in 27 minutes is 18 × 36 / 27 = 24.0 points per 36.",
+        }
+        text = f"{label[0].upper()}{label[1:]}: {formula} — {explanation}."
+        return f"{text} {examples[column]}" if column in examples else text
+    
+    @staticmethod
+    def compute_from_question(metric: tuple, question: str) -> Optional[str]:
+        """Work through a metric with the numbers given in the question, if there are enough."""
+        column, label, formula = metric[0], metric[1], metric[2]
+        # Seasons ("2022/2023", "2023-24") are not made/attempted pairs
+        lowered = SEASON_PATTERN.sub(" ", question.lower())
+        
+        if column in ("FG_PCT", "FG3_PCT", "FT_PCT"):
+            match = MADE_OF_PATTERN.search(lowered)
+            if match:
+                made, attempts = int(match.group(1)), int(match.group(2))
+                if attempts and made <= attempts:
+                    return f"{made} / {attempts} = {made / attempts * 100:.1f}% {label} ({formula})."
+        
+        def number_before(words: str) -> Optional[float]:
+            found = re.search(rf"(\d+(?:\.\d+)?)\s*(?:{words})", lowered)
+            return float(found.group(1)) if found else None
+        
+        if column == "TS_PCT":
+            points = number_before(r"points|pts")
+            fga = number_before(r"field goal attempts|fga|shots|shot attempts")
+            fta = number_before(r"free throw attempts|fta|free throws")
+            if points is not None and fga is not None:
+                fta = fta or 0.0
+                shots = 2 * (fga + 0.44 * fta)
+                if shots:
+                    return (f"{points:g} / (2 × ({fga:g} + 0.44 × {fta:g})) = {points / shots * 100:.1f}% "
+                            f"{label} ({formula}).")
+        
+        if column == "PER_36":
+            minutes = number_before(r"minutes|mins|min\b")
+            for stat, name in PER_36_STATS.items():
+                value = number_before(name)
+                if value is not None and minutes:
+                    return (f"{value:g} {name} in {minutes:g} minutes = {value * 36 / minutes:.1f} {name} "
+                            f"per 36 minutes ({formula}).")
+        return None
+    
+    def _season_rows(self, frame, question: str):
+        """Rows of the season the question names, else of the latest season."""
+        season = self.find_season(question, frame["SEASON"].unique())
+        if season is None:
+            named = SEASON_PATTERN.search(question)
+            if named:
+                # A season the box scores don't cover
+                return frame.iloc[0:0], named.group(0)
+            season = frame["SEASON"].max()
+        return frame[frame["SEASON"] == season], season
+    
+    def player_answer(self, metric: tuple, player: str, question: str) -> str:
+        column, label, formula, _, _, kind = metric
+        rows, season = self._season_rows(self.tables['players'][self.tables['players']["PLAYER"] == player], question)
+        if rows.empty:
+            return f"No box scores for {player} in {season}."
+        
+        lines = []
+        for _, row in rows.iterrows():
+            prefix = f"{player}, {season} ({row['TEAM']}, {int(row['GP'])} games, {row['MIN']:.0f} minutes)"
+            if kind in ("per36", "per100"):
+                suffix = "PER36" if kind == "per36" else "PER100"
+                unit = "per 36 minutes" if kind == "per36" else "per 100 possessions"
+                values = ", ".join(f"{_format_value('', row[f'{stat}_{suffix}'])} {name}"
+                                   for stat, name in PER_36_STATS.items())
+                lines.append(f"{prefix}: {values} {unit}.")
+            elif kind == "pace":
+                lines.append(f"{prefix}: team pace {_format_value('', row['PACE'])} possessions per 48 minutes.")
+            else:
+                lines.append(f"{prefix}: {label} {_format_value(kind, row[column])}.")
+        return " ".join(lines) + f" ({formula})"
+    
+    def leaderboard_answer(self, metric: tuple, question: str) -> str:
+        column, label, formula, _, _, kind = metric
+        if kind == "pace":
+            rows, season = self._season_rows(self.tables['teams'], question)
+            ascending = bool(re.search(r"\b(lowest|slowest|worst)\b", question, re.I))
+            ranked = rows.sort_values("PACE", ascending=ascending).head(self.leaderboard_size)
+            entries = [f"{i}. {row['TEAM']} {_format_value('', row['PACE'])}"
+                       for i, (_, row) in enumerate(ranked.iterrows(), start=1)]
+            if not entries:
+                return f"No box scores for {season}."
+            return f"{'Slowest' if ascending else 'Fastest'} pace, {season}: " + ", ".join(entries) + f" ({formula})."
+        
+        if kind in ("per36", "per100"):
+            stat = next((s for s, name in PER_36_STATS.items() if name.rstrip("s") in question.lower()), "PTS")
+            column = f"{stat}_{'PER36' if kind == 'per36' else 'PER100'}"
+            label = f"{PER_36_STATS[stat]} {'per 36 minutes' if kind == 'per36' else 'per 100 possessions'}"
+            kind = ""
+        
+        rows, season = self._season_rows(self.tables['players'], question)
+        min_minutes = self.leader_min_minutes_share * rows["MIN"].max() if len(rows) else 0
+        qualified = rows[(rows["MIN"] >= min_minutes) & rows[column].notna()]
+        ascending = bool(re.search(r"\b(lowest|worst)\b", question, re.I))
+        ranked = qualified.nsmallest(self.leaderboard_size, column) if ascending \
+            else qualified.nlargest(self.leaderboard_size, column)
+        entries = [f"{i}. {row['PLAYER']} ({row['TEAM']}) {_format_value(kind, row[column])}"
+                   for i, (_, row) in enumerate(ranked.iterrows(), start=1)]
+        if not entries:
+            return f"No qualifying players for {label} in {season}."
+        return (f"{'Lowest' if ascending else 'Highest'} {label}, {season} "
+                f"(min {min_minutes:.0f} minutes): " + ", ".join(entries) + f". ({formula})")
\ No newline at end of file
@@ -6,6 +6,7 @@ This script tests the basic functionality of the chatbot.
 
 import sys
 import os
+from contextlib import contextmanager
 
 def test_imports():
     """Test if all required modules can be imported."""
@@ -27,6 +28,59 @@ def test_imports():
         print(f"❌ Import error: {e}")
         return False
 
+# Seconds each entry point may take to import, in a fresh interpreter
+IMPORT_TIME_BUDGETS = {
+    'config': 0.5,
+    'basketball_knowledge': 0.5,
+    'demo': 0.5,
+    'basketball_chatbot': 1.5,
+    'vector_store': 1.5,
+    'ingestion': 1.5,
+    'server': 1.5,
+}
+
+# Libraries that must only be imported once a model or index is actually used
+HEAVY_MODULES = ("torch", "transformers", "langchain", "pinecone", "sentence_transformers", "streamlit")
+
+def test_import_time():
+    """Test that entry points import within budget without loading heavy libraries."""
+    print("\n⏱️ Testing import time...")
+    
+    import subprocess
+    
+    script = ("import sys, time\n"
+              "start = time.perf_counter()\n"
+              "import {module}\n"
+              "elapsed = time.perf_counter() - start\n"
+              "loaded = [name for name in {heavy!r} if name in sys.modules]\n"
+              "print('IMPORT', elapsed, ','.join(loaded))\n")
+    
+    within_budget = True
+    for module, budget in IMPORT_TIME_BUDGETS.items():
+        result = subprocess.run(
+            [sys.executable, "-c", script.format(module=module, heavy=HEAVY_MODULES)],
+            capture_output=True, text=True, cwd=os.path.dirname(os.path.abspath(__file__))
+        )
+        report = [line for line in result.stdout.splitlines() if line.startswith("IMPORT ")]
+        if result.returncode != 0 or not report:
+            error = result.stderr.strip().splitlines()[-1:] or ["no output"]
+            print(f"❌ {module} failed to import: {error[0]}")
+            within_budget = False
+            continue
+        
+        _, elapsed, loaded = (report[-1].split(" ") + [""])[:3]
+        elapsed = float(elapsed)
+        if loaded:
+            print(f"❌ {module} imports {loaded.replace(',', ', ')} at module level")
+            within_budget = False
+        elif elapsed > budget:
+            print(f"❌ {module} took {elapsed:.2f}s to import (budget {budget:.1f}s)")
+            within_budget = False
+        else:
+            print(f"✅ {module} imported in {elapsed * 1000:.0f}ms (budget {budget:.1f}s)")
+    
+    return within_budget
+
 def test_knowledge_base():
     """Test the basketball knowledge base."""
     print("\n📚 Testing knowledge base...")
@@ -103,7 +157,8 @@ def test_vector_store():
         from config import Config
         config = Config()
         
-        if not config.PINECONE_API_KEY or not config.PINECONE_ENVIRONMENT:
+        uses_pinecone = config.VECTOR_BACKEND.lower() == "pinecone"
+        if uses_pinecone and (not config.PINECONE_API_KEY or not config.PINECONE_ENVIRONMENT):
             print("⚠️ Pinecone not configured, skipping vector store test")
             return True
         
@@ -123,6 +178,463 @@ def test_vector_store():
         print(f"❌ Vector store error: {e}")
         return False
 
+def test_local_backend():
+    """Test the in-process NumPy vector backend (no network required)."""
+    print("\n🗂️ Testing local vector backend...")
+    
+    try:
+        import os
+        import tempfile
+        from config import Config
+        from vector_backends import LocalBackend
+        
+        config = Config()
+        dimension = config.VECTOR_DIMENSION
+        
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, "index.npz")
+            backend = LocalBackend(config, path=path)
+            
+            vectors = []
+            for i in range(5):
+                values = [0.0] * dimension
+                values[i] = 1.0
+                vectors.append({'id': f"item-{i}", 'values': values, 'metadata': {'title': f"Item {i}"}})
+            backend.upsert(vectors)
+            
+            query = [0.0] * dimension
+            query[2] = 1.0
+            matches = backend.query(query, top_k=2)
+            if matches[0]['id'] != "item-2" or len(matches) != 2:
+                print(f"❌ Unexpected top match: {matches}")
+                return False
+            print(f"✅ Exact top-k search: {matches[0]['id']} (score {matches[0]['score']:.2f})")
+            
+            backend.delete(["item-0"])
+            backend.persist()
+            reloaded = LocalBackend(config, path=path)
+            if len(reloaded) != 4 or reloaded.query(query, top_k=1)[0]['id'] != "item-2":
+                print("❌ Index did not survive save/load")
+                return False
+            print(f"✅ Save/load round trip: {len(reloaded)} vectors")
+        
+        return True
+        
+    except Exception as e:
+        print(f"❌ Local backend error: {e}")
+        return False
+
+def test_stats_engine():
+    """Test the vectorised statistics engine on a small box-score table."""
+    print("\n📊 Testing statistics engine...")
+    
+    try:
+        import io
+        import pandas as pd
+        from stats_engine import StatsEngine
+        
+        rows = []
+        for game in ("G1", "G2"):
+            rows.append({'SEASON': "2023-24", 'GAME_ID': game, 'TEAM': "BOS", 'PLAYER': "Jayson Tatum",
+                         'MIN': "36:00", 'PTS': 30, 'FGM': 10, 'FGA': 20, 'FG3M': 4, 'FG3A': 9,
+                         'FTM': 6, 'FTA': 8, 'OREB': 1, 'DREB': 7, 'AST': 5, 'TOV': 3})
+            rows.append({'SEASON': "2023-24", 'GAME_ID': game, 'TEAM': "MIA", 'PLAYER': "Bam Adebayo",
+                         'MIN': "34:00", 'PTS': 20, 'FGM': 8, 'FGA': 14, 'FG3M': 0, 'FG3A': 0,
+                         'FTM': 4, 'FTA': 5, 'OREB': 3, 'DREB': 8, 'AST': 3, 'TOV': 2})
+        # Through CSV, as box scores are loaded: an all-"MM:SS" column is read as text
+        engine = StatsEngine(pd.read_csv(io.StringIO(pd.DataFrame(rows).to_csv(index=False))))
+        
+        tatum = engine.tables['players'].set_index("PLAYER").loc["Jayson Tatum"]
+        expected = {'FG_PCT': 0.5, 'EFG_PCT': 0.6, 'TS_PCT': 60 / (2 * (40 + 0.44 * 16)), 'PTS_PER36': 30.0}
+        for column, value in expected.items():
+            if not abs(tatum[column] - value) <= 1e-9:  # also fails on NaN
+                print(f"❌ {column} is {tatum[column]}, expected {value}")
+                return False
+        print(f"✅ Season metrics: FG% {tatum['FG_PCT']:.3f}, eFG% {tatum['EFG_PCT']:.3f}, "
+              f"TS% {tatum['TS_PCT']:.3f}")
+        
+        answers = {
+            "What's the FG% on 8 of 15?": "53.3%",
+            "What is Jayson Tatum's true shooting percentage?": "63.8%",
+            "Who has the highest effective field goal percentage?": "1. Jayson Tatum",
+            "How do you calculate field goal percentage?": "FGM / FGA",
+        }
+        for question, snippet in answers.items():
+            answer = engine.answer(question) or ""
+            if snippet not in answer:
+                print(f"❌ {question!r} answered {answer!r}")
+                return False
+        passed_through = [
+            "What is a pick and roll?",
+            "How can I work on improving my free throw percentage?",
+            "What is the best drill to raise my shooting percentage?",
+            "What is a good three-point percentage for a guard?",
+        ]
+        for question in passed_through:
+            answer = engine.answer(question)
+            if answer is not None:
+                print(f"❌ {question!r} was taken by the stats engine: {answer!r}")
+                return False
+        # Without box scores a season is not read as "2022 of 2023"
+        if StatsEngine().answer("What was Jayson Tatum's FG% in 2022/2023?") is not None:
+            print("❌ Season span was read as made/attempted shots")
+            return False
+        print(f"✅ Numeric questions routed ({len(answers)} answered, {len(passed_through) + 1} passed through)")
+        
+        return True
+        
+    except Exception as e:
+        print(f"❌ Statistics engine error: {e}")
+        return False
+
+def test_shared_embedding_cache():
+    """Test that caches sharing one directory see each other's rows and clears."""
+    print("\n💾 Testing shared embedding cache...")
+    
+    try:
+        import tempfile
+        import numpy as np
+        from embedding_cache import EmbeddingCache
+        
+        vectors = {'alpha': [1.0, 0.0, 0.0], 'beta': [0.0, 1.0, 0.0], 'gamma': [0.0, 0.0, 1.0]}
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            # No memory tier, so every read comes from the shared files
+            first = EmbeddingCache("test-model", tmp_dir, max_memory_items=0)
+            second = EmbeddingCache("test-model", tmp_dir, max_memory_items=0)
+            first.put_many(["alpha"], np.asarray([vectors['alpha']]))
+            second.put_many(["beta"], np.asarray([vectors['beta']]))
+            first.put_many(["gamma", "beta"], np.asarray([vectors['gamma'], vectors['beta']]))
+            
+            reopened = EmbeddingCache("test-model", tmp_dir, max_memory_items=0)
+            for cache in (first, second, reopened):
+                for text, expected in vectors.items():
+                    vector = cache.get_many([text])[0]
+                    if vector is None or not np.allclose(vector, expected):
+                        print(f"❌ {text!r} read back as {vector}")
+                        return False
+            if reopened.stats()['disk_items'] != 3:
+                print(f"❌ Expected 3 disk rows, found {reopened.stats()['disk_items']}")
+                return False
+            print("✅ Interleaved writers: every key reads back its own vector")
+            
+            # Rows numbered before another process cleared the files must not be reused
+            first.clear()
+            first.put_many(["delta"], np.asarray([[0.5, 0.5, 0.0]]))
+            stale = second.get_many(["alpha"])[0]
+            if stale is not None:
+                print(f"❌ 'alpha' survived another process's clear as {stale}")
+                return False
+            if not np.allclose(second.get_many(["delta"])[0], [0.5, 0.5, 0.0]):
+                print("❌ 'delta' was not read back after the clear")
+                return False
+            print("✅ A clear in one cache reaches the other")
+        
+        return True
+        
+    except Exception as e:
+        print(f"❌ Embedding cache error: {e}")
+        return False
+
+@contextmanager
+def offline_models(texts):
+    """Use the offline stand-in models and an in-memory index, restoring Config afterwards."""
+    from config import Config
+    from local_models import use_offline_models
+    
+    saved = {name: value for name, value in vars(Config).items() if name.isupper()}
+    try:
+        use_offline_models(texts)
+        yield
+    finally:
+        for name, value in saved.items():
+            setattr(Config, name, value)
+
+def test_sync_idempotence():
+    """Test that syncing unchanged knowledge writes nothing and a changed item is replaced."""
+    print("\n🔁 Testing knowledge base sync...")
+    
+    try:
+        from basketball_knowledge import BasketballKnowledgeBase
+        
+        knowledge = BasketballKnowledgeBase().get_all_basketball_knowledge()
+        edited = dict(knowledge[0], content=knowledge[0]['content'] + " Rules vary between leagues.")
+        
+        with offline_models([f"{item['title']} {item['content']}" for item in knowledge + [edited]]):
+            from vector_store import VectorStore
+            
+            vector_store = VectorStore()
+            first = vector_store.sync_basketball_knowledge(knowledge)
+            second = vector_store.sync_basketball_knowledge(knowledge)
+            if first['added'] != len(knowledge) or second['added'] or second['deleted']:
+                print(f"❌ Second sync was not a no-op: {second}")
+                return False
+            if second['unchanged'] != len(knowledge):
+                print(f"❌ Expected {len(knowledge)} unchanged items, got {second['unchanged']}")
+                return False
+            print(f"✅ Second sync: 0 added, 0 deleted, {second['unchanged']} unchanged")
+            
+            changed = vector_store.sync_basketball_knowledge([edited] + knowledge[1:])
+            if changed['added'] != 1 or changed['deleted'] != 1:
+                print(f"❌ Editing one item should replace one vector: {changed}")
+                return False
+            print("✅ Editing one item replaces exactly one vector")
+        
+        return True
+        
+    except Exception as e:
+        print(f"❌ Sync error: {e}")
+        return False
+
+def test_chunking():
+    """Test that long items are split into overlapping chunks that keep their parent ID."""
+    print("\n✂️ Testing chunking...")
+    
+    try:
+        from chunking import TextChunker
+        from vector_store import knowledge_id
+        
+        sentences = [f"Possession {i} ended with a made basket by the home team." for i in range(30)]
+        item = {'title': "Game log", 'content': " ".join(sentences), 'source': "test"}
+        chunker = TextChunker(chunk_size=40, chunk_overlap=10)
+        chunks = list(chunker.chunk_items([item]))
+        
+        if len(chunks) < 2:
+            print(f"❌ Expected several chunks, got {len(chunks)}")
+            return False
+        if any(chunk['parent_id'] != knowledge_id(item) or chunk['chunk_index'] != i or chunk['source'] != "test"
+               for i, chunk in enumerate(chunks)):
+            print("❌ Chunks lost their parent_id, chunk_index or parent metadata")
+            return False
+        budget = chunker.chunk_size - chunker.count_tokens(f"{item['title']}: ")
+        if any(chunker.count_tokens(chunk['content']) > budget for chunk in chunks):
+            print("❌ A chunk exceeds the token budget")
+            return False
+        for previous, chunk in zip(chunks, chunks[1:]):
+            words, next_words = previous['content'].split(), chunk['content'].split()
+            shared = max((n for n in range(1, len(words)) if words[-n:] == next_words[:n]), default=0)
+            if not shared or chunker.count_tokens(" ".join(words[-shared:])) > chunker.chunk_overlap:
+                print(f"❌ Chunk {chunk['chunk_index']} does not start with a bounded overlap")
+                return False
+        print(f"✅ {len(chunks)} chunks, each overlapping the previous one")
+        
+        with offline_models([f"{chunk['title']} {chunk['content']}" for chunk in chunks]):
+            from vector_store import VectorStore
+            
+            vector_store = VectorStore()
+            vector_store.add_basketball_knowledge(chunks)
+            results = vector_store.search("Possession 17 made basket", top_k=3)
+            if not results or any(result['parent_id'] != knowledge_id(item) for result in results):
+                print(f"❌ Search results lost the parent_id: {results}")
+                return False
+            print("✅ Search results carry the parent item's ID")
+        
+        return True
+        
+    except Exception as e:
+        print(f"❌ Chunking error: {e}")
+        return False
+
+def test_lexical_fast_path():
+    """Test that a decisive term match is answered without calling the encoder."""
+    print("\n⚡ Testing lexical fast path...")
+    
+    try:
+        from basketball_knowledge import BasketballKnowledgeBase
+        from config import Config
+        
+        knowledge = BasketballKnowledgeBase().get_all_basketball_knowledge()
+        question = "point guard primary ball handler playmaker"
+        
+        with offline_models([f"{item['title']} {item['content']}" for item in knowledge] + [question]):
+            from basketball_chatbot import BasketballChatbot
+            
+            # The response cache looks questions up by embedding, so the fast path needs it off
+            Config.RESPONSE_CACHE_ENABLED = False
+            Config.PRECOMPUTE_ANSWERS = False
+            chatbot = BasketballChatbot()
+            chatbot.vector_store.sync_basketball_knowledge(knowledge)
+            if not chatbot.vector_store._is_decisive(
+                    chatbot.vector_store._ensure_lexical_index().search(question, 2)):
+                print(f"❌ {question!r} is not a decisive term match")
+                return False
+            
+            encoded = []
+            encode = chatbot.vector_store._encode
+            chatbot.vector_store._encode = lambda texts: encoded.append(texts) or encode(texts)
+            answer = chatbot.generate_response(question)
+            if encoded or answer == chatbot.FALLBACK_RESPONSE:
+                print(f"❌ Decisive question called the encoder {len(encoded)} time(s)")
+                return False
+            print("✅ Decisive question answered without the encoder")
+        
+        return True
+        
+    except Exception as e:
+        print(f"❌ Lexical fast path error: {e}")
+        return False
+
+def test_precomputed_revalidation():
+    """Test that precomputed answers come back after an index write once revalidated."""
+    print("\n♻️ Testing precomputed answer revalidation...")
+    
+    try:
+        from basketball_knowledge import BasketballKnowledgeBase
+        from config import Config
+        
+        knowledge = BasketballKnowledgeBase().get_all_basketball_knowledge()
+        extra = {'title': "Arena trivia", 'content': "The oldest arena in the league opened decades ago."}
+        
+        with offline_models([f"{item['title']} {item['content']}" for item in knowledge + [extra]]
+                            + Config.CANONICAL_QUESTIONS):
+            from basketball_chatbot import BasketballChatbot
+            
+            Config.PRECOMPUTE_ANSWERS = True
+            chatbot = BasketballChatbot()
+            chatbot.vector_store.sync_basketball_knowledge(knowledge)
+            chatbot.precompute_answers()
+            question = next(question for question in Config.CANONICAL_QUESTIONS
+                            if question in chatbot.precomputed_answers)
+            
+            chatbot.vector_store.add_basketball_knowledge([extra])
+            version = chatbot.vector_store.knowledge_version
+            if chatbot.precomputed_answers.get(question, version) is not None:
+                print("❌ Precomputed answer was served after an index write without a check")
+                return False
+            
+            chatbot.generate_response(question)
+            if chatbot.revalidation is None:
+                print("❌ A stale precomputed answer did not start a revalidation")
+                return False
+            chatbot.revalidation.join(timeout=60)
+            if chatbot.precomputed_answers.get(question, version) is None:
+                print("❌ Precomputed answer did not come back after revalidation")
+                return False
+            print("✅ Stale precomputed answers are revalidated in the background")
+        
+        return True
+        
+    except Exception as e:
+        print(f"❌ Precomputed answer error: {e}")
+        return False
+
+def test_streaming_scheduler():
+    """Test that streamed answers go through the batching scheduler and match batched ones."""
+    print("\n📡 Testing streaming through the scheduler...")
+    
+    try:
+        from basketball_knowledge import BasketballKnowledgeBase
+        from config import Config
+        
+        knowledge = BasketballKnowledgeBase().get_all_basketball_knowledge()
+        question = "explain zone defense strategies"
+        
+        with offline_models([f"{item['title']} {item['content']}" for item in knowledge] + [question]):
+            from basketball_chatbot import BasketballChatbot
+            
+            Config.RESPONSE_CACHE_ENABLED = False
+            Config.PRECOMPUTE_ANSWERS = False
+            Config.GENERATION_BATCHING = True
+            chatbot = BasketballChatbot()
+            chatbot.vector_store.sync_basketball_knowledge(knowledge)
+            
+            prompts_before = chatbot.scheduler.stats()['prompts']
+            streamed = "".join(chatbot.generate_response_stream(question)).strip()
+            if chatbot.scheduler.stats()['prompts'] != prompts_before + 1:
+                print("❌ Streamed answer bypassed the scheduler")
+                return False
+            if streamed != chatbot.generate_response(question):
+                print(f"❌ Streamed answer {streamed!r} differs from the batched one")
+                return False
+            print("✅ Streamed answer was generated by the scheduler")
+        
+        return True
+        
+    except Exception as e:
+        print(f"❌ Streaming error: {e}")
+        return False
+
+def test_ingestion_survives_refresh():
+    """Test that refreshing the knowledge base keeps bulk-ingested records."""
+    print("\n📥 Testing ingestion and refresh...")
+    
+    try:
+        import json
+        import tempfile
+        from basketball_knowledge import BasketballKnowledgeBase
+        from chunking import TextChunker
+        from ingestion import IngestionCheckpoint, ingest_file
+        
+        knowledge = BasketballKnowledgeBase().get_all_basketball_knowledge()
+        records = [{'title': f"Game recap {i}", 'content': f"The home team won game {i} on a late three."}
+                   for i in range(5)]
+        
+        with offline_models([f"{item['title']} {item['content']}" for item in knowledge + records]), \
+                tempfile.TemporaryDirectory() as tmp_dir:
+            from vector_store import VectorStore
+            
+            vector_store = VectorStore()
+            chunker = TextChunker()
+            vector_store.sync_basketball_knowledge(chunker.chunk_items(knowledge))
+            
+            path = os.path.join(tmp_dir, "recaps.jsonl")
+            with open(path, "w", encoding="utf-8") as f:
+                f.writelines(json.dumps(record) + "\n" for record in records)
+            checkpoint = IngestionCheckpoint(os.path.join(tmp_dir, "checkpoint.json"))
+            ingest_file(path, "jsonl", vector_store, chunker, checkpoint, batch_size=2)
+            
+            stats = vector_store.sync_basketball_knowledge(chunker.chunk_items(knowledge))
+            ingested = [item for item in vector_store.iter_knowledge()
+                        if item['source'].startswith("ingestion:")]
+            if stats['deleted'] or len(ingested) != len(records):
+                print(f"❌ Refresh deleted {stats['deleted']} items; {len(ingested)} ingested records left")
+                return False
+            print(f"✅ Refresh kept all {len(ingested)} ingested records (0 deleted)")
+        
+        return True
+        
+    except Exception as e:
+        print(f"❌ Ingestion error: {e}")
+        return False
+
+def test_shared_knowledge_version():
+    """Test that a write through one vector store invalidates another store on the same index."""
+    print("\n🔄 Testing shared knowledge version...")
+    
+    try:
+        import tempfile
+        from config import Config
+        
+        first = {'title': "Zone defense", 'content': "Defenders guard an area instead of a man."}
+        second = {'title': "Shot clock", 'content': "The offense has 24 seconds to attempt a shot."}
+        
+        with offline_models([f"{item['title']} {item['content']}" for item in (first, second)]), \
+                tempfile.TemporaryDirectory() as tmp_dir:
+            from vector_store import VectorStore
+            
+            Config.LOCAL_INDEX_PATH = os.path.join(tmp_dir, "index.npz")
+            Config.KNOWLEDGE_VERSION_CHECK_SECONDS = 0.0
+            writer, reader = VectorStore(), VectorStore()
+            writer.add_basketball_knowledge([first])
+            
+            version = reader.knowledge_version
+            reader.search("zone defense", top_k=1)
+            writer.add_basketball_knowledge([second])
+            
+            if reader.knowledge_version == version or reader.knowledge_version != writer.knowledge_version:
+                print("❌ Reader did not see the writer's version")
+                return False
+            results = reader.search("shot clock seconds", top_k=1)
+            if not results or results[0]['title'] != "Shot clock":
+                print(f"❌ Reader did not reload the index: {results}")
+                return False
+            print("✅ Writes in one store reach another store's version and search")
+        
+        return True
+        
+    except Exception as e:
+        print(f"❌ Knowledge version error: {e}")
+        return False
+
 def main():
     """Main test function."""
     print("🏀 Basketball Analysis Chatbot - Test Suite")
@@ -130,10 +642,21 @@ def main():
     
     tests = [
         ("Imports", test_imports),
+        ("Import Time", test_import_time),
         ("Configuration", test_config),
         ("Knowledge Base", test_knowledge_base),
         ("Basic Chatbot", test_chatbot_basic),
-        ("Vector Store", test_vector_store)
+        ("Vector Store", test_vector_store),
+        ("Local Vector Backend", test_local_backend),
+        ("Shared Embedding Cache", test_shared_embedding_cache),
+        ("Sync Idempotence", test_sync_idempotence),
+        ("Chunking", test_chunking),
+        ("Lexical Fast Path", test_lexical_fast_path),
+        ("Streaming Through Scheduler", test_streaming_scheduler),
+        ("Ingestion Survives Refresh", test_ingestion_survives_refresh),
+        ("Precomputed Answer Revalidation", test_precomputed_revalidation),
+        ("Shared Knowledge Version", test_shared_knowledge_version),
+        ("Statistics Engine", test_stats_engine)
     ]
     
     passed = 0
@@ -0,0 +1,661 @@
+import hashlib
+import json
+import os
+import threading
+import uuid
+from typing import List, Dict, Any, Iterator, Optional
+import numpy as np
+from config import Config
+
+def matches_filter(metadata: Dict[str, Any], metadata_filter: Optional[Dict[str, Any]]) -> bool:
+    """Evaluate a Pinecone-style metadata filter against one metadata dict.
+    
+    Supports bare equality plus ``$eq``, ``$ne``, ``$in``, ``$nin``, ``$gt``,
+    ``$gte``, ``$lt``, ``$lte``, ``$exists``, ``$and`` and ``$or``.
+    """
+    if not metadata_filter:
+        return True
+    
+    for field, condition in metadata_filter.items():
+        if field == '$and':
+            if not all(matches_filter(metadata, clause) for clause in condition):
+                return False
+            continue
+        if field == '$or':
+            if not any(matches_filter(metadata, clause) for clause in condition):
+                return False
+            continue
+        
+        if not isinstance(condition, dict):
+            condition = {'$eq': condition}
+        value = metadata.get(field)
+        for operator, operand in condition.items():
+            if operator == '$exists':
+                ok = (field in metadata) == bool(operand)
+            elif field not in metadata:
+                ok = operator in ('$ne', '$nin')
+            elif operator == '$eq':
+                ok = value == operand
+            elif operator == '$ne':
+                ok = value != operand
+            elif operator == '$in':
+                ok = value in operand
+            elif operator == '$nin':
+                ok = value not in operand
+            elif operator == '$gt':
+                ok = value > operand
+            elif operator == '$gte':
+                ok = value >= operand
+            elif operator == '$lt':
+                ok = value < operand
+            elif operator == '$lte':
+                ok = value <= operand
+            else:
+                raise ValueError(f"Unsupported filter operator: {operator}")
+            if not ok:
+                return False
+    
+    return True
+
+class VectorBackend:
+    """Interface for the vector index that sits behind VectorStore.
+
+    Vectors are passed around in the Pinecone upsert format
+    (``{'id', 'values', 'metadata'}``) and query matches come back as
+    ``{'id', 'score', 'metadata'}`` dicts, so VectorStore does not need to
+    know which backend it is talking to.
+    """
+    
+    def upsert(self, vectors: List[Dict[str, Any]]):
+        """Insert or replace vectors."""
+        raise NotImplementedError
+    
+    def query(self, vector: List[float], top_k: int) -> List[Dict[str, Any]]:
+        """Return the ``top_k`` most similar vectors, best first."""
+        raise NotImplementedError
+    
+    def delete(self, ids: List[str]):
+        """Delete vectors by ID."""
+        raise NotImplementedError
+    
+    def iter_vectors(self, page_size: int = 1000,
+                     metadata_filter: Optional[Dict[str, Any]] = None) -> Iterator[List[Dict[str, Any]]]:
+        """Yield pages of at most ``page_size`` stored vectors as ``{'id', 'metadata'}`` dicts."""
+        raise NotImplementedError
+    
+    def delete_by_filter(self, metadata_filter: Dict[str, Any]):
+        """Delete every vector whose metadata matches ``metadata_filter``."""
+        raise NotImplementedError
+    
+    def delete_all(self):
+        """Delete every vector in the index (or the configured namespace)."""
+        raise NotImplementedError
+    
+    def delete_legacy(self, metadata_filter: Optional[Dict[str, Any]] = None) -> int:
+        """Delete vectors that ``iter_vectors`` cannot see because they predate it; returns how many."""
+        return 0
+    
+    def persist(self):
+        """Flush the index to durable storage, if the backend needs it."""
+    
+    def version(self) -> str:
+        """Token that changes whenever any process changes the index (compare for equality only)."""
+        return ""
+    
+    def bump_version(self):
+        """Record that this process changed the index, so ``version`` changes for everyone."""
+
+class PineconeBackend(VectorBackend):
+    """Vector backend that talks to a hosted Pinecone index.
+    
+    Pod-based Pinecone indexes have no scan API, so every vector is tagged
+    with two metadata buckets derived from its (hash) ID: ``id_bucket``
+    (first two hex digits, 256 values) and ``id_subbucket`` (first four, 65536
+    values). ``iter_vectors`` walks the buckets with filtered queries, each
+    bounded to one page, and only drops to sub-buckets when a bucket is
+    larger than a page.
+    """
+    
+    # Pinecone caps top_k at 1000 when metadata is returned
+    MAX_PAGE_SIZE = 1000
+    # Marker vector whose metadata holds the index version shared by all processes
+    VERSION_ID = "__knowledge_version__"
+    
+    def __init__(self, config: Config):
+        self.config = config
+        self.namespace = config.PINECONE_NAMESPACE
+        self._initialize_pinecone()
+    
+    def _initialize_pinecone(self):
+        """Initialize Pinecone client and index."""
+        import pinecone
+        
+        try:
+            pinecone.init(
+                api_key=self.config.PINECONE_API_KEY,
+                environment=self.config.PINECONE_ENVIRONMENT
+            )
+            
+            # Check if index exists, if not create it
+            if self.config.PINECONE_INDEX_NAME not in pinecone.list_indexes():
+                pinecone.create_index(
+                    name=self.config.PINECONE_INDEX_NAME,
+                    dimension=self.config.VECTOR_DIMENSION,
+                    metric=self.config.METRIC
+                )
+                print(f"Created Pinecone index: {self.config.PINECONE_INDEX_NAME}")
+            
+            self.index = pinecone.Index(self.config.PINECONE_INDEX_NAME)
+            print(f"Connected to Pinecone index: {self.config.PINECONE_INDEX_NAME}")
+            
+        except Exception as e:
+            print(f"Error initializing Pinecone: {e}")
+            raise
+    
+    @staticmethod
+    def _buckets(vector_id: str) -> Dict[str, int]:
+        try:
+            return {'id_bucket': int(vector_id[:2], 16), 'id_subbucket': int(vector_id[:4], 16)}
+        except ValueError:
+            # Not a hex ID; fall back to a stable hash of the ID
+            digest = hashlib.sha256(vector_id.encode('utf-8')).hexdigest()
+            return {'id_bucket': int(digest[:2], 16), 'id_subbucket': int(digest[:4], 16)}
+    
+    def upsert(self, vectors: List[Dict[str, Any]]):
+        tagged = [
+            dict(vector, metadata={**vector.get('metadata', {}), **self._buckets(vector['id'])})
+            for vector in vectors
+        ]
+        self.index.upsert(vectors=tagged, namespace=self.namespace)
+    
+    def query(self, vector: List[float], top_k: int) -> List[Dict[str, Any]]:
+        results = self.index.query(
+            vector=vector,
+            top_k=top_k + 1,  # in case the version marker is among the matches
+            include_metadata=True,
+            namespace=self.namespace
+        )
+        return [
+            {'id': match.id, 'score': match.score, 'metadata': match.metadata or {}}
+            for match in results.matches if match.id != self.VERSION_ID
+        ][:top_k]
+    
+    def delete(self, ids: List[str]):
+        self.index.delete(ids=ids, namespace=self.namespace)
+    
+    def _scan(self, bucket_filter: Dict[str, Any], metadata_filter: Optional[Dict[str, Any]],
+              top_k: int) -> List[Dict[str, Any]]:
+        combined = {'$and': [bucket_filter, metadata_filter]} if metadata_filter else bucket_filter
+        # Any fixed non-zero vector works; cosine indexes reject the zero vector
+        probe = [1.0] + [0.0] * (self.config.VECTOR_DIMENSION - 1)
+        results = self.index.query(
+            vector=probe,
+            top_k=top_k,
+            include_metadata=True,
+            filter=combined,
+            namespace=self.namespace
+        )
+        return [{'id': match.id, 'metadata': match.metadata or {}} for match in results.matches]
+    
+    def iter_vectors(self, page_size: int = 1000,
+                     metadata_filter: Optional[Dict[str, Any]] = None) -> Iterator[List[Dict[str, Any]]]:
+        page_size = min(page_size, self.MAX_PAGE_SIZE)
+        
+        for bucket in range(256):
+            page = self._scan({'id_bucket': {'$eq': bucket}}, metadata_filter, page_size)
+            if len(page) < page_size:
+                if page:
+                    yield page
+                continue
+            
+            # Bucket is bigger than a page: walk its 256 sub-buckets instead
+            for subbucket in range(bucket * 256, (bucket + 1) * 256):
+                page = self._scan({'id_subbucket': {'$eq': subbucket}}, metadata_filter, page_size)
+                if len(page) == page_size:
+                    print(f"Warning: sub-bucket {subbucket} holds more than {page_size} vectors; "
+                          f"enumeration may be incomplete")
+                if page:
+                    yield page
+    
+    def delete_by_filter(self, metadata_filter: Dict[str, Any]):
+        try:
+            self.index.delete(filter=metadata_filter, namespace=self.namespace)
+        except Exception as e:
+            # Some index types do not support delete-by-filter; enumerate instead
+            print(f"Filtered delete not supported ({e}); deleting page by page")
+            for page in self.iter_vectors(metadata_filter=metadata_filter):
+                self.delete([vector['id'] for vector in page])
+    
+    def delete_all(self):
+        self.index.delete(delete_all=True, namespace=self.namespace)
+    
+    def version(self) -> str:
+        vectors = self.index.fetch(ids=[self.VERSION_ID], namespace=self.namespace).vectors
+        marker = vectors.get(self.VERSION_ID)
+        return str((marker.metadata or {}).get('version', "")) if marker else ""
+    
+    def bump_version(self):
+        probe = [1.0] + [0.0] * (self.config.VECTOR_DIMENSION - 1)
+        self.upsert([{
+            'id': self.VERSION_ID,
+            'values': probe,
+            'metadata': {'type': 'index_version', 'version': uuid.uuid4().hex}
+        }])
+    
+    def delete_legacy(self, metadata_filter: Optional[Dict[str, Any]] = None) -> int:
+        """Delete vectors written without ``id_bucket`` tags (the old random uuid4 IDs).
+        
+        Bucket scans never return them, so they are found with an
+        ``$exists`` query instead and deleted a page at a time.
+        """
+        untagged = {'id_bucket': {'$exists': False}}
+        deleted = set()
+        while True:
+            ids = [vector['id'] for vector in self._scan(untagged, metadata_filter, self.MAX_PAGE_SIZE)]
+            # Deletes are eventually consistent; stop once a page holds nothing new
+            new_ids = [vector_id for vector_id in ids if vector_id not in deleted]
+            if not new_ids:
+                return len(deleted)
+            self.delete(new_ids)
+            deleted.update(new_ids)
+
+class LocalBackend(VectorBackend):
+    """In-process exact cosine index backed by a NumPy matrix.
+
+    Vectors are L2-normalised on insert and kept in one contiguous float32
+    matrix, so a query is a single matrix-vector product followed by an
+    ``argpartition`` for the top-k. The index is saved to ``path`` as an
+    ``.npz`` file and reloaded on start-up, and again by ``version`` when
+    another process has saved a newer file.
+    """
+    
+    def __init__(self, config: Config, path: Optional[str] = None):
+        self.config = config
+        self.dimension = config.VECTOR_DIMENSION
+        self.path = path if path is not None else config.LOCAL_INDEX_PATH
+        self._lock = threading.RLock()
+        self._stamp: Optional[str] = None  # Stamp of the file the in-memory index matches
+        self._dirty = False  # Changed since the last save or load
+        self._writes = 0  # Version of an index without a file
+        self._reset()
+        
+        if self.path and os.path.exists(self.path):
+            self.load(self.path)
+            print(f"Loaded local vector index from {self.path} ({len(self)} vectors)")
+        else:
+            print("Created empty local vector index")
+    
+    def _reset(self):
+        self._vectors = np.zeros((0, self.dimension), dtype=np.float32)
+        self._ids: List[str] = []
+        self._metadata: List[Dict[str, Any]] = []
+        self._rows: Dict[str, int] = {}
+    
+    def __len__(self) -> int:
+        return len(self._ids)
+    
+    @staticmethod
+    def _normalize(matrix: np.ndarray) -> np.ndarray:
+        norms = np.linalg.norm(matrix, axis=-1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return matrix / norms
+    
+    def _reserve(self, size: int):
+        """Grow the backing matrix geometrically so upserts stay amortised O(1)."""
+        capacity = self._vectors.shape[0]
+        if size <= capacity:
+            return
+        new_capacity = max(size, capacity * 2, 64)
+        grown = np.zeros((new_capacity, self.dimension), dtype=np.float32)
+        grown[:len(self._ids)] = self._vectors[:len(self._ids)]
+        self._vectors = grown
+    
+    def upsert(self, vectors: List[Dict[str, Any]]):
+        if not vectors:
+            return
+        
+        values = np.asarray([vector['values'] for vector in vectors], dtype=np.float32)
+        values = self._normalize(values)
+        
+        with self._lock:
+            self._dirty = True
+            self._reserve(len(self._ids) + len(vectors))
+            touched = []
+            for vector, row_values in zip(vectors, values):
+                row = self._rows.get(vector['id'])
+                if row is None:
+                    row = len(self._ids)
+                    self._rows[vector['id']] = row
+                    self._ids.append(vector['id'])
+                    self._metadata.append(vector.get('metadata', {}))
+                else:
+                    self._unindex_row(row)
+                    self._metadata[row] = vector.get('metadata', {})
+                self._vectors[row] = row_values
+                touched.append(row)
+            self._index_rows(np.asarray(touched, dtype=np.int64))
+    
+    def query(self, vector: List[float], top_k: int) -> List[Dict[str, Any]]:
+        query = self._normalize(np.asarray(vector, dtype=np.float32))
+        
+        with self._lock:
+            size = len(self._ids)
+            if size == 0 or top_k <= 0:
+                return []
+            
+            scores = self._vectors[:size] @ query
+            return self._top_k(np.arange(size), scores, top_k)
+    
+    def _top_k(self, rows: np.ndarray, scores: np.ndarray, top_k: int) -> List[Dict[str, Any]]:
+        """Turn candidate rows and their scores into ranked matches."""
+        if top_k < len(rows):
+            candidates = np.argpartition(-scores, top_k - 1)[:top_k]
+        else:
+            candidates = np.arange(len(rows))
+        ranked = candidates[np.argsort(-scores[candidates], kind='stable')]
+        
+        return [
+            {
+                'id': self._ids[rows[i]],
+                'score': float(scores[i]),
+                'metadata': self._metadata[rows[i]]
+            }
+            for i in ranked
+        ]
+    
+    def delete(self, ids: List[str]):
+        with self._lock:
+            self._dirty = True
+            for vector_id in ids:
+                row = self._rows.pop(vector_id, None)
+                if row is None:
+                    continue
+                self._unindex_row(row)
+                
+                # Move the last row into the hole to keep the matrix dense
+                last = len(self._ids) - 1
+                if row != last:
+                    moved_id = self._ids[last]
+                    self._vectors[row] = self._vectors[last]
+                    self._ids[row] = moved_id
+                    self._metadata[row] = self._metadata[last]
+                    self._rows[moved_id] = row
+                    self._move_row(last, row)
+                self._ids.pop()
+                self._metadata.pop()
+    
+    # Hooks for subclasses that keep an auxiliary structure over the rows
+    def _index_rows(self, rows: np.ndarray):
+        """Called after ``rows`` were inserted or overwritten."""
+    
+    def _unindex_row(self, row: int):
+        """Called before ``row`` is overwritten or deleted."""
+    
+    def _move_row(self, source: int, target: int):
+        """Called after the vector at ``source`` was moved to ``target``."""
+    
+    def iter_vectors(self, page_size: int = 1000,
+                     metadata_filter: Optional[Dict[str, Any]] = None) -> Iterator[List[Dict[str, Any]]]:
+        with self._lock:
+            snapshot = list(zip(self._ids, self._metadata))
+        
+        page = []
+        for vector_id, metadata in snapshot:
+            if matches_filter(metadata, metadata_filter):
+                page.append({'id': vector_id, 'metadata': metadata})
+                if len(page) >= page_size:
+                    yield page
+                    page = []
+        if page:
+            yield page
+    
+    def delete_by_filter(self, metadata_filter: Dict[str, Any]):
+        with self._lock:
+            ids = [
+                vector_id for vector_id, metadata in zip(self._ids, self._metadata)
+                if matches_filter(metadata, metadata_filter)
+            ]
+            self.delete(ids)
+    
+    def delete_all(self):
+        with self._lock:
+            self._dirty = True
+            self._reset()
+    
+    def save(self, path: str):
+        """Save vectors, IDs and metadata to an ``.npz`` file."""
+        with self._lock:
+            tmp_path = f"{path}.{os.getpid()}.tmp.npz"
+            np.savez(tmp_path, **self._state_arrays())
+            os.replace(tmp_path, path)
+            if path == self.path:
+                self._stamp = self._file_stamp()
+                self._dirty = False
+    
+    def load(self, path: str):
+        """Replace the in-memory index with the contents of ``path``."""
+        # Stamped before reading: if the file is replaced meanwhile, the next check reloads again
+        stamp = self._file_stamp() if path == self.path else None
+        with np.load(path, allow_pickle=False) as data:
+            arrays = {name: data[name] for name in data.files}
+        
+        with self._lock:
+            self._load_state(arrays)
+            if path == self.path:
+                self._stamp = stamp
+                self._dirty = False
+    
+    def _state_arrays(self) -> Dict[str, np.ndarray]:
+        size = len(self._ids)
+        return {
+            'vectors': self._vectors[:size],
+            'ids': np.asarray(self._ids, dtype=str),
+            'metadata': np.asarray(json.dumps(self._metadata))
+        }
+    
+    def _load_state(self, arrays: Dict[str, np.ndarray]):
+        ids = [str(vector_id) for vector_id in arrays['ids']]
+        vectors = np.ascontiguousarray(arrays['vectors'], dtype=np.float32)
+        if not ids:
+            vectors = np.zeros((0, self.dimension), dtype=np.float32)
+        self._vectors = vectors
+        self._ids = ids
+        self._metadata = json.loads(str(arrays['metadata']))
+        self._rows = {vector_id: row for row, vector_id in enumerate(ids)}
+    
+    def persist(self):
+        if self.path:
+            self.save(self.path)
+    
+    def _file_stamp(self) -> Optional[str]:
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return None
+        return f"{stat.st_mtime_ns}-{stat.st_size}"
+    
+    def version(self) -> str:
+        """The index file's stamp, reloading the file first if another process saved it.
+
+        Unsaved changes of this process are never thrown away; its next save
+        wins. Until then, and without a file, the version also counts this
+        process's writes.
+        """
+        if not self.path:
+            return str(self._writes)
+        stamp = self._file_stamp()
+        if stamp is not None and stamp != self._stamp and not self._dirty:
+            self.load(self.path)
+            print(f"Reloaded local vector index from {self.path} ({len(self)} vectors)")
+        if self._dirty:
+            return f"{self._stamp or ''}+{self._writes}"
+        return self._stamp or ""
+    
+    def bump_version(self):
+        self._writes += 1
+
+class IVFBackend(LocalBackend):
+    """Approximate cosine index using an inverted file (IVF) over k-means cells.
+    
+    Vectors are stored exactly as in LocalBackend, but each row is also
+    assigned to its nearest of ``nlist`` centroids. A query only scores the
+    rows in the ``nprobe`` cells closest to it, so cost grows with
+    ``nprobe / nlist`` of the corpus instead of all of it. Raising
+    ``nprobe`` trades latency for recall; ``nprobe == nlist`` is exact.
+    
+    Until the index holds ``IVF_TRAIN_FACTOR * nlist`` vectors there is too
+    little data to train centroids, so queries fall back to the exact scan.
+    After training, new vectors are inserted incrementally into their
+    nearest cell; call ``train()`` again to re-fit centroids after the
+    corpus has drifted a lot.
+    """
+    
+    def __init__(self, config: Config, path: Optional[str] = None,
+                 nlist: Optional[int] = None, nprobe: Optional[int] = None):
+        self.nlist = nlist if nlist is not None else config.IVF_NLIST
+        self.nprobe = nprobe if nprobe is not None else config.IVF_NPROBE
+        self.train_factor = config.IVF_TRAIN_FACTOR
+        super().__init__(config, path=path)
+    
+    def _reset(self):
+        super()._reset()
+        self._centroids: Optional[np.ndarray] = None
+        self._assignments = np.zeros(0, dtype=np.int32)
+        self._cells: List[set] = []
+        self._cell_cache: Dict[int, np.ndarray] = {}
+    
+    @property
+    def is_trained(self) -> bool:
+        return self._centroids is not None
+    
+    def train(self, iterations: int = 10, sample_size: Optional[int] = None, seed: int = 0):
+        """Fit ``nlist`` centroids with spherical k-means and reassign every row."""
+        with self._lock:
+            size = len(self._ids)
+            if size == 0:
+                return
+            
+            rng = np.random.default_rng(seed)
+            nlist = min(self.nlist, size)
+            sample_size = sample_size or max(nlist * 64, 10000)
+            sample_rows = rng.choice(size, size=min(size, sample_size), replace=False)
+            sample = self._vectors[sample_rows]
+            
+            centroids = sample[rng.choice(len(sample), size=nlist, replace=False)].copy()
+            for _ in range(iterations):
+                labels = np.argmax(sample @ centroids.T, axis=1)
+                sums = np.zeros_like(centroids)
+                np.add.at(sums, labels, sample)
+                counts = np.bincount(labels, minlength=nlist)
+                
+                # Re-seed empty cells from random samples so no centroid is wasted
+                empty = counts == 0
+                if empty.any():
+                    sums[empty] = sample[rng.choice(len(sample), size=int(empty.sum()))]
+                centroids = self._normalize(sums)
+            
+            self._centroids = np.ascontiguousarray(centroids, dtype=np.float32)
+            self._assign_all()
+    
+    def _assign_all(self):
+        size = len(self._ids)
+        self._cells = [set() for _ in range(len(self._centroids))]
+        self._cell_cache = {}
+        self._assignments = np.zeros(self._vectors.shape[0], dtype=np.int32)
+        
+        # Assign in blocks to bound the size of the temporary score matrix
+        for start in range(0, size, 8192):
+            rows = np.arange(start, min(start + 8192, size))
+            self._assign(rows)
+    
+    def _assign(self, rows: np.ndarray):
+        labels = np.argmax(self._vectors[rows] @ self._centroids.T, axis=1)
+        self._assignments[rows] = labels
+        for row, label in zip(rows.tolist(), labels.tolist()):
+            self._cells[label].add(row)
+            self._cell_cache.pop(label, None)
+    
+    def _reserve(self, size: int):
+        super()._reserve(size)
+        if self._assignments.shape[0] < self._vectors.shape[0]:
+            grown = np.zeros(self._vectors.shape[0], dtype=np.int32)
+            grown[:len(self._assignments)] = self._assignments
+            self._assignments = grown
+    
+    def _index_rows(self, rows: np.ndarray):
+        if self.is_trained:
+            self._assign(rows)
+        elif len(self._ids) >= self.train_factor * self.nlist:
+            self.train()
+    
+    def _unindex_row(self, row: int):
+        if self.is_trained:
+            label = int(self._assignments[row])
+            self._cells[label].discard(row)
+            self._cell_cache.pop(label, None)
+    
+    def _move_row(self, source: int, target: int):
+        if self.is_trained:
+            label = int(self._assignments[source])
+            self._cells[label].discard(source)
+            self._cells[label].add(target)
+            self._assignments[target] = label
+            self._cell_cache.pop(label, None)
+    
+    def _cell_rows(self, label: int) -> np.ndarray:
+        rows = self._cell_cache.get(label)
+        if rows is None:
+            rows = np.fromiter(self._cells[label], dtype=np.int64, count=len(self._cells[label]))
+            self._cell_cache[label] = rows
+        return rows
+    
+    def query(self, vector: List[float], top_k: int, nprobe: Optional[int] = None) -> List[Dict[str, Any]]:
+        if not self.is_trained:
+            return super().query(vector, top_k)
+        
+        query = self._normalize(np.asarray(vector, dtype=np.float32))
+        nprobe = min(nprobe or self.nprobe, len(self._centroids))
+        
+        with self._lock:
+            if not self._ids or top_k <= 0:
+                return []
+            
+            centroid_scores = self._centroids @ query
+            if nprobe < len(centroid_scores):
+                probe = np.argpartition(-centroid_scores, nprobe - 1)[:nprobe]
+            else:
+                probe = np.arange(len(centroid_scores))
+            
+            rows = np.concatenate([self._cell_rows(int(label)) for label in probe])
+            if len(rows) == 0:
+                return []
+            scores = self._vectors[rows] @ query
+            return self._top_k(rows, scores, top_k)
+    
+    def _state_arrays(self) -> Dict[str, np.ndarray]:
+        arrays = super()._state_arrays()
+        if self.is_trained:
+            arrays['centroids'] = self._centroids
+        return arrays
+    
+    def _load_state(self, arrays: Dict[str, np.ndarray]):
+        super()._load_state(arrays)
+        self._centroids = None
+        self._assignments = np.zeros(self._vectors.shape[0], dtype=np.int32)
+        if 'centroids' in arrays:
+            self._centroids = np.ascontiguousarray(arrays['centroids'], dtype=np.float32)
+            self._assign_all()
+
+BACKENDS = {
+    'pinecone': PineconeBackend,
+    'local': LocalBackend,
+    'ivf': IVFBackend,
+}
+
+def create_backend(config: Config) -> VectorBackend:
+    """Instantiate the vector backend named by ``Config.VECTOR_BACKEND``."""
+    name = config.VECTOR_BACKEND.lower()
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown vector backend '{config.VECTOR_BACKEND}'. "
+                         f"Choose one of: {', '.join(sorted(BACKENDS))}")
+    return BACKENDS[name](config)
\ No newline at end of file
@@ -1,152 +1,485 @@
-import pinecone
-from sentence_transformers import SentenceTransformer
-from typing import List, Dict, Any
-import uuid
+import numpy as np
+from typing import List, Dict, Any, Iterable, Iterator, Optional
+from itertools import islice
+import hashlib
+import threading
+import time
 from config import Config
+import model_registry
+import metrics
+from vector_backends import create_backend
+from embedding_cache import EmbeddingCache
+from lexical_index import BM25Index
+
+# ``source`` metadata of the items in basketball_knowledge.py; ingested records
+# are tagged with their file instead (see ingestion.py)
+BUILTIN_SOURCE = "builtin"
+
+def batched(items: Iterable[Any], size: int) -> Iterator[List[Any]]:
+    """Yield successive lists of at most ``size`` items from any iterable."""
+    iterator = iter(items)
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+def knowledge_id(item: Dict[str, str]) -> str:
+    """Return a deterministic vector ID derived from an item's title and content."""
+    digest = hashlib.sha256(f"{item['title']}\0{item['content']}".encode('utf-8'))
+    return digest.hexdigest()[:32]
+
+def reciprocal_rank_fusion(rankings: List[List[Dict[str, Any]]], k: int = 60) -> List[Dict[str, Any]]:
+    """Fuse ranked match lists by summing ``1 / (k + rank)`` for every list an ID appears in.
+
+    Returns ``{'id', 'fused_score', 'matches'}`` dicts, best first, where
+    ``matches`` holds the match from each input list (``None`` if absent).
+    """
+    fused: Dict[str, Dict[str, Any]] = {}
+    for position, ranking in enumerate(rankings):
+        for rank, match in enumerate(ranking, start=1):
+            entry = fused.setdefault(match['id'], {
+                'id': match['id'],
+                'fused_score': 0.0,
+                'matches': [None] * len(rankings)
+            })
+            entry['fused_score'] += 1.0 / (k + rank)
+            entry['matches'][position] = match
+    return sorted(fused.values(), key=lambda entry: entry['fused_score'], reverse=True)
 
 class VectorStore:
-    """Class to manage Pinecone vector database operations."""
+    """Class to manage vector database operations.
+    
+    The index itself is provided by a pluggable backend selected with
+    ``Config.VECTOR_BACKEND`` (see ``vector_backends.py``).
+    """
     
     def __init__(self):
         self.config = Config()
-        self.embedding_model = SentenceTransformer(self.config.EMBEDDING_MODEL)
-        self._initialize_pinecone()
+        self.embedding_model = model_registry.get_embedding_model(self.config.EMBEDDING_MODEL)
+        self.index = create_backend(self.config)
+        # Last index version seen (see ``knowledge_version``) and when it was read
+        self._knowledge_version = None
+        self._version_checked_at = 0.0
+        self.embedding_cache = None
+        if self.config.EMBEDDING_CACHE_DIR:
+            self.embedding_cache = EmbeddingCache(
+                self.config.EMBEDDING_MODEL,
+                self.config.EMBEDDING_CACHE_DIR,
+                max_memory_items=self.config.EMBEDDING_CACHE_MEMORY_ITEMS,
+                dtype=self.config.EMBEDDING_CACHE_DTYPE
+            )
+        # BM25 twin of the vector index, built lazily from it on first hybrid search
+        self.lexical_index = None
+        self._lexical_index_built = False
+        self._lexical_lock = threading.Lock()
+        if self.config.HYBRID_SEARCH:
+            self.lexical_index = BM25Index(k1=self.config.BM25_K1, b=self.config.BM25_B)
+    
+    @property
+    def knowledge_version(self) -> str:
+        """Version of the index contents, shared by every process using the index.
+        
+        Caches built on search results are keyed on it. It changes on every
+        write, including writes by other sessions, server workers or
+        ``ingestion.py``, which are noticed within
+        ``KNOWLEDGE_VERSION_CHECK_SECONDS``.
+        """
+        return self._check_knowledge_version()
     
-    def _initialize_pinecone(self):
-        """Initialize Pinecone client and index."""
+    def _check_knowledge_version(self) -> str:
+        now = time.monotonic()
+        if (self._knowledge_version is not None
+                and now - self._version_checked_at < self.config.KNOWLEDGE_VERSION_CHECK_SECONDS):
+            return self._knowledge_version
         try:
-            pinecone.init(
-                api_key=self.config.PINECONE_API_KEY,
-                environment=self.config.PINECONE_ENVIRONMENT
-            )
-            
-            # Check if index exists, if not create it
-            if self.config.PINECONE_INDEX_NAME not in pinecone.list_indexes():
-                pinecone.create_index(
-                    name=self.config.PINECONE_INDEX_NAME,
-                    dimension=self.config.VECTOR_DIMENSION,
-                    metric=self.config.METRIC
-                )
-                print(f"Created Pinecone index: {self.config.PINECONE_INDEX_NAME}")
-            
-            self.index = pinecone.Index(self.config.PINECONE_INDEX_NAME)
-            print(f"Connected to Pinecone index: {self.config.PINECONE_INDEX_NAME}")
-            
+            version = self.index.version()
         except Exception as e:
-            print(f"Error initializing Pinecone: {e}")
-            raise
+            print(f"Error checking knowledge version: {e}")
+            return self._knowledge_version or ""
+        if version != self._knowledge_version:
+            if self._knowledge_version is not None:
+                # Rebuilt from the backend on the next hybrid search
+                self._lexical_index_built = False
+            self._knowledge_version = version
+        self._version_checked_at = now
+        return version
+    
+    def _record_write(self):
+        """Publish a write to the shared version, so other processes drop their caches."""
+        self.index.bump_version()
+        self._knowledge_version = self.index.version()
+        self._version_checked_at = time.monotonic()
     
+    @metrics.timed("create_embeddings")
     def create_embeddings(self, texts: List[str]) -> List[List[float]]:
-        """Create embeddings for a list of texts."""
+        """Create embeddings for a list of texts.
+        
+        Texts already in the embedding cache skip the encoder; only the
+        misses are encoded, in a single batched call.
+        """
         try:
-            embeddings = self.embedding_model.encode(texts)
-            return embeddings.tolist()
+            if self.embedding_cache is None:
+                return self._encode(texts).tolist()
+            
+            cached = self.embedding_cache.get_many(texts)
+            missing = [i for i, vector in enumerate(cached) if vector is None]
+            metrics.record_cache("embedding", len(texts) - len(missing), len(missing))
+            
+            if missing:
+                missing_texts = [texts[i] for i in missing]
+                encoded = self._encode(missing_texts)
+                self.embedding_cache.put_many(missing_texts, encoded)
+                for i, vector in zip(missing, encoded):
+                    cached[i] = vector
+            
+            return np.asarray(cached, dtype=np.float32).tolist()
         except Exception as e:
             print(f"Error creating embeddings: {e}")
             raise
     
-    def add_basketball_knowledge(self, knowledge_items: List[Dict[str, str]]):
-        """Add basketball knowledge items to the vector database."""
+    def _encode(self, texts: List[str]) -> np.ndarray:
+        """Run the SentenceTransformer encoder on a batch of texts."""
+        return self.embedding_model.encode(
+            texts,
+            batch_size=self.config.EMBEDDING_BATCH_SIZE
+        )
+    
+    def add_basketball_knowledge(self, knowledge_items: Iterable[Dict[str, str]],
+                                 persist: bool = True) -> Dict[str, float]:
+        """Add basketball knowledge items to the vector database.
+        
+        Items are encoded EMBEDDING_BATCH_SIZE at a time and the resulting
+        vectors are streamed into UPSERT_BATCH_SIZE upserts, so any iterable
+        (including a generator) can be ingested without materialising it.
+        Vector IDs are content hashes, so re-adding an item overwrites it.
+        Pass ``persist=False`` when adding many batches and call ``persist``
+        once at the end; local indexes rewrite their whole file on every save.
+        """
         try:
-            vectors = []
+            start_time = time.perf_counter()
+            total_items = 0
+            pending = []
             
-            for item in knowledge_items:
+            for batch in batched(knowledge_items, self.config.EMBEDDING_BATCH_SIZE):
                 # Combine title and content for embedding
-                text = f"{item['title']}: {item['content']}"
-                embedding = self.create_embeddings([text])[0]
+                texts = [f"{item['title']}: {item['content']}" for item in batch]
+                embeddings = self.create_embeddings(texts)
                 
-                vector = {
-                    'id': str(uuid.uuid4()),
-                    'values': embedding,
-                    'metadata': {
-                        'title': item['title'],
-                        'content': item['content'],
-                        'type': 'basketball_knowledge'
-                    }
-                }
-                vectors.append(vector)
+                for item, text, embedding in zip(batch, texts, embeddings):
+                    vector_id = knowledge_id(item)
+                    metadata = self._metadata_for(item)
+                    pending.append({
+                        'id': vector_id,
+                        'values': embedding,
+                        'metadata': metadata
+                    })
+                    if self._lexical_index_built:
+                        self.lexical_index.add(vector_id, text, metadata)
+                    
+                    if len(pending) >= self.config.UPSERT_BATCH_SIZE:
+                        self.index.upsert(pending)
+                        pending = []
+                
+                total_items += len(batch)
+            
+            if pending:
+                self.index.upsert(pending)
+            if persist:
+                self.index.persist()
+            if total_items:
+                self._record_write()
             
-            # Insert vectors in batches
-            batch_size = 100
-            for i in range(0, len(vectors), batch_size):
-                batch = vectors[i:i + batch_size]
-                self.index.upsert(vectors=batch)
+            elapsed = time.perf_counter() - start_time
+            items_per_second = total_items / elapsed if elapsed > 0 else 0.0
+            print(f"Added {total_items} basketball knowledge items to vector database "
+                  f"in {elapsed:.2f}s ({items_per_second:.1f} items/sec)")
             
-            print(f"Added {len(vectors)} basketball knowledge items to vector database")
+            return {
+                'items': total_items,
+                'seconds': elapsed,
+                'items_per_second': items_per_second
+            }
             
         except Exception as e:
             print(f"Error adding basketball knowledge: {e}")
             raise
     
-    def search_similar(self, query: str, top_k: int = 5) -> List[Dict[str, Any]]:
-        """Search for similar basketball knowledge based on a query."""
+    @staticmethod
+    def _metadata_for(item: Dict[str, Any]) -> Dict[str, Any]:
+        """Build vector metadata, keeping extra scalar fields such as chunk info."""
+        metadata = {
+            key: value for key, value in item.items()
+            if key not in ('title', 'content') and isinstance(value, (str, int, float, bool))
+        }
+        metadata.update({
+            'title': item['title'],
+            'content': item['content'],
+            'type': 'basketball_knowledge'
+        })
+        return metadata
+    
+    def persist(self):
+        """Flush the index to durable storage (see ``add_basketball_knowledge``)."""
+        self.index.persist()
+        self._record_write()
+    
+    def sync_basketball_knowledge(self, knowledge_items: Iterable[Dict[str, str]],
+                                  source: str = BUILTIN_SOURCE) -> Dict[str, float]:
+        """Make the indexed items of ``source`` match ``knowledge_items`` with the fewest writes.
+        
+        Items whose content hash is already indexed are skipped, new or
+        changed items are embedded and upserted, and indexed items of the
+        same ``source`` that are no longer present are deleted. Items from
+        other sources, such as ingested documents, are never touched. A
+        built-in sync also removes built-in items stored under the old
+        random IDs, which the backend can no longer enumerate.
+        """
         try:
-            # Create embedding for the query
-            query_embedding = self.create_embeddings([query])[0]
+            start_time = time.perf_counter()
+            source_filter = {'source': {'$eq': source}}
+            indexed_ids = {item['id'] for item in self.iter_knowledge(metadata_filter=source_filter)}
+            seen_ids = set()
             
-            # Search in Pinecone
-            results = self.index.query(
-                vector=query_embedding,
-                top_k=top_k,
-                include_metadata=True
-            )
+            def new_items():
+                for item in knowledge_items:
+                    vector_id = knowledge_id(item)
+                    if vector_id in seen_ids:
+                        continue
+                    seen_ids.add(vector_id)
+                    if vector_id not in indexed_ids:
+                        yield dict(item, source=source)
+            
+            added = self.add_basketball_knowledge(new_items())['items']
+            
+            stale_ids = list(indexed_ids - seen_ids)
+            for batch in batched(stale_ids, 1000):
+                self.index.delete(batch)
+            if self._lexical_index_built:
+                self.lexical_index.remove(stale_ids)
             
-            # Format results
-            formatted_results = []
-            for match in results.matches:
-                formatted_results.append({
-                    'id': match.id,
-                    'score': match.score,
-                    'title': match.metadata.get('title', ''),
-                    'content': match.metadata.get('content', ''),
-                    'type': match.metadata.get('type', '')
-                })
+            # Before content-hash IDs only the built-in knowledge was ever indexed
+            legacy = 0
+            if source == BUILTIN_SOURCE:
+                legacy = self.index.delete_legacy({'type': {'$eq': 'basketball_knowledge'}})
+                if legacy:
+                    print(f"Deleted {legacy} knowledge items stored under legacy random IDs")
             
-            return formatted_results
+            deleted = len(stale_ids) + legacy
+            if deleted:
+                self.index.persist()
+                self._record_write()
+            
+            elapsed = time.perf_counter() - start_time
+            unchanged = len(seen_ids) - added
+            print(f"Synced basketball knowledge: {added} added, {deleted} deleted, "
+                  f"{unchanged} unchanged ({elapsed:.2f}s)")
+            
+            return {
+                'added': added,
+                'deleted': deleted,
+                'unchanged': unchanged,
+                'seconds': elapsed
+            }
             
         except Exception as e:
+            print(f"Error syncing basketball knowledge: {e}")
+            raise
+    
+    @metrics.timed("search_similar")
+    def search_similar(self, query: str, top_k: int = 5,
+                       query_embedding: Optional[List[float]] = None) -> List[Dict[str, Any]]:
+        """Search for similar basketball knowledge based on a query.
+        
+        Pass ``query_embedding`` when the caller already embedded the query
+        to skip a second encoder call.
+        """
+        try:
+            # Create embedding for the query
+            if query_embedding is None:
+                query_embedding = self.create_embeddings([query])[0]
+            
+            # Search the vector index
+            with metrics.stage("vector_query"):
+                matches = self.index.query(query_embedding, top_k)
+            
+            return [self._format_match(match) for match in matches]
+            
+        except Exception as e:
+            metrics.record_error("search_similar")
             print(f"Error searching vector database: {e}")
             return []
     
-    def get_all_knowledge(self) -> List[Dict[str, Any]]:
-        """Retrieve all basketball knowledge from the vector database."""
+    @staticmethod
+    def _format_match(match: Dict[str, Any]) -> Dict[str, Any]:
+        metadata = match['metadata']
+        return {
+            'id': match['id'],
+            'score': match['score'],
+            'title': metadata.get('title', ''),
+            'content': metadata.get('content', ''),
+            'type': metadata.get('type', ''),
+            'parent_id': metadata.get('parent_id', match['id'])
+        }
+    
+    def search(self, query: str, top_k: int = 5,
+               query_embedding: Optional[List[float]] = None) -> List[Dict[str, Any]]:
+        """Search with the retrieval mode selected by ``Config.HYBRID_SEARCH``."""
+        if self.lexical_index is not None:
+            return self.search_hybrid(query, top_k, query_embedding)
+        return self.search_similar(query, top_k, query_embedding)
+    
+    def _ensure_lexical_index(self) -> BM25Index:
+        """Build the BM25 index from the stored vectors the first time it is needed."""
+        self._check_knowledge_version()
+        if self._lexical_index_built:
+            return self.lexical_index
+        
+        with self._lexical_lock:
+            if not self._lexical_index_built:
+                start_time = time.perf_counter()
+                self.lexical_index.clear()
+                knowledge_filter = {'type': {'$eq': 'basketball_knowledge'}}
+                for page in self.index.iter_vectors(self.config.ENUMERATION_PAGE_SIZE, knowledge_filter):
+                    for vector in page:
+                        metadata = vector['metadata']
+                        text = f"{metadata.get('title', '')}: {metadata.get('content', '')}"
+                        self.lexical_index.add(vector['id'], text, metadata)
+                self._lexical_index_built = True
+                print(f"Built lexical index over {len(self.lexical_index)} items "
+                      f"in {time.perf_counter() - start_time:.2f}s")
+        return self.lexical_index
+    
+    def _is_decisive(self, lexical_matches: List[Dict[str, Any]]) -> bool:
+        """True when the best term match contains every query word and clearly beats the runner-up."""
+        if not self.config.LEXICAL_FAST_PATH or not lexical_matches:
+            return False
+        best = lexical_matches[0]
+        if best['coverage'] < 1.0:
+            return False
+        if len(lexical_matches) == 1:
+            return True
+        return best['score'] >= self.config.LEXICAL_DECISIVE_RATIO * lexical_matches[1]['score']
+    
+    @metrics.timed("search_hybrid")
+    def search_hybrid(self, query: str, top_k: int = 5,
+                      query_embedding: Optional[List[float]] = None) -> List[Dict[str, Any]]:
+        """Search with BM25 and dense retrieval, fused by reciprocal rank.
+        
+        ``score`` stays the cosine similarity to the query, with the BM25
+        score in ``lexical_score`` and the fusion score in ``fused_score``.
+        Items found only by BM25 are scored against their cached embeddings.
+        When no query embedding is supplied and the term match is decisive
+        (see ``_is_decisive``), the BM25 ranking is returned without calling
+        the encoder and ``score`` is ``None``.
+        """
         try:
-            # Fetch all vectors (this might be expensive for large datasets)
-            results = self.index.query(
-                vector=[0] * self.config.VECTOR_DIMENSION,  # Dummy vector
-                top_k=10000,  # Large number to get all
-                include_metadata=True
-            )
+            candidates = max(top_k, self.config.HYBRID_CANDIDATES)
+            with metrics.stage("lexical_search"):
+                lexical_matches = self._ensure_lexical_index().search(query, candidates)
             
-            formatted_results = []
-            for match in results.matches:
-                if match.metadata.get('type') == 'basketball_knowledge':
-                    formatted_results.append({
-                        'id': match.id,
-                        'title': match.metadata.get('title', ''),
-                        'content': match.metadata.get('content', ''),
-                        'type': match.metadata.get('type', '')
-                    })
+            if query_embedding is None and self._is_decisive(lexical_matches):
+                metrics.increment("lexical_fast_path_total")
+                results = []
+                for rank, match in enumerate(lexical_matches[:top_k], start=1):
+                    result = self._format_match(dict(match, score=None))
+                    result['lexical_score'] = match['score']
+                    result['fused_score'] = 1.0 / (self.config.RRF_K + rank)
+                    results.append(result)
+                return results
+            
+            if query_embedding is None:
+                query_embedding = self.create_embeddings([query])[0]
+            with metrics.stage("vector_query"):
+                dense_matches = self.index.query(query_embedding, candidates)
             
-            return formatted_results
+            results = []
+            for entry in reciprocal_rank_fusion([dense_matches, lexical_matches], self.config.RRF_K)[:top_k]:
+                dense_match, lexical_match = entry['matches']
+                result = self._format_match(dense_match or dict(lexical_match, score=None))
+                result['lexical_score'] = lexical_match['score'] if lexical_match else 0.0
+                result['fused_score'] = entry['fused_score']
+                results.append(result)
+            
+            lexical_only = [result for result in results if result['score'] is None]
+            if lexical_only:
+                vectors = np.asarray(self.create_embeddings(
+                    [f"{result['title']}: {result['content']}" for result in lexical_only]
+                ), dtype=np.float32)
+                query_vector = np.asarray(query_embedding, dtype=np.float32)
+                norms = np.linalg.norm(vectors, axis=1) * np.linalg.norm(query_vector)
+                norms[norms == 0] = 1.0
+                for result, score in zip(lexical_only, vectors @ query_vector / norms):
+                    result['score'] = float(score)
+            
+            return results
             
+        except Exception as e:
+            metrics.record_error("search_hybrid")
+            print(f"Error running hybrid search: {e}")
+            return []
+    
+    def iter_knowledge(self, page_size: Optional[int] = None,
+                       metadata_filter: Optional[Dict[str, Any]] = None) -> Iterator[Dict[str, Any]]:
+        """Stream stored basketball knowledge one item at a time.
+        
+        The backend is paged ``page_size`` vectors at a time, so memory use is
+        bounded by a single page regardless of index size.
+        """
+        knowledge_filter = {'type': {'$eq': 'basketball_knowledge'}}
+        if metadata_filter:
+            knowledge_filter = {'$and': [knowledge_filter, metadata_filter]}
+        
+        for page in self.index.iter_vectors(page_size or self.config.ENUMERATION_PAGE_SIZE,
+                                            knowledge_filter):
+            for vector in page:
+                metadata = vector['metadata']
+                yield {
+                    'id': vector['id'],
+                    'title': metadata.get('title', ''),
+                    'content': metadata.get('content', ''),
+                    'type': metadata.get('type', ''),
+                    'source': metadata.get('source', '')
+                }
+    
+    def get_all_knowledge(self) -> List[Dict[str, Any]]:
+        """Retrieve all basketball knowledge from the vector database.
+        
+        This materialises the whole index; prefer ``iter_knowledge`` for
+        large indexes.
+        """
+        try:
+            return list(self.iter_knowledge())
         except Exception as e:
             print(f"Error retrieving all knowledge: {e}")
             return []
     
+    def delete_by_filter(self, metadata_filter: Dict[str, Any]):
+        """Delete every vector whose metadata matches ``metadata_filter``."""
+        try:
+            self.index.delete_by_filter(metadata_filter)
+            self.index.persist()
+            if self._lexical_index_built:
+                self.lexical_index.remove_by_filter(metadata_filter)
+            self._record_write()
+            print(f"Deleted vectors matching {metadata_filter}")
+        except Exception as e:
+            print(f"Error deleting by filter: {e}")
+            raise
+    
     def delete_all_knowledge(self):
         """Delete all basketball knowledge from the vector database."""
+        self.delete_by_filter({'type': {'$eq': 'basketball_knowledge'}})
+    
+    def clear_index(self):
+        """Delete every vector in the index (or the configured Pinecone namespace)."""
         try:
-            # Get all knowledge IDs
-            all_knowledge = self.get_all_knowledge()
-            ids_to_delete = [item['id'] for item in all_knowledge]
-            
-            if ids_to_delete:
-                self.index.delete(ids=ids_to_delete)
-                print(f"Deleted {len(ids_to_delete)} basketball knowledge items")
-            else:
-                print("No basketball knowledge items to delete")
-                
+            self.index.delete_all()
+            self.index.persist()
+            if self._lexical_index_built:
+                self.lexical_index.clear()
+            self._record_write()
+            print("Cleared vector index")
         except Exception as e:
-            print(f"Error deleting basketball knowledge: {e}")
+            print(f"Error clearing vector index: {e}")
             raise 
\ No newline at end of file